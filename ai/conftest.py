@@ -0,0 +1,20 @@
+# ai/conftest.py
+# ================================================================
+# 역할
+# - ai/ 아래 pytest 공통 설정
+#   · rag / llm_runtime 모듈을 ai/ 기준으로 import (from rag.filters import ...)
+#   · 직접 실행하는 수동 점검 스크립트는 수집에서 제외
+#
+# 실행:
+#   cd ai
+#   python -m pytest -q
+#   (chromadb/sentence_transformers 등이 없으면 해당 테스트는 skip)
+# ================================================================
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+collect_ignore = [
+    "llm_runtime/test_llm.py",    # 실제 LLM 호출(.env 필요)
+    "stt-tts-sample/tts_test.py",  # edge-tts 네트워크 호출
+]
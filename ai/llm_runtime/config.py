@@ -19,5 +19,15 @@ class Settings(BaseModel):
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     openai_base_url: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    # 호출 1건 타임아웃(초, 동시 호출 제한 대기 포함)
+    llm_timeout_s: float = float(os.getenv("LLM_TIMEOUT_S", "12"))
+    # 동시에 보낼 수 있는 최대 요청 수(초과분은 대기)
+    llm_max_inflight: int = int(os.getenv("LLM_MAX_INFLIGHT", "8"))
+    # 공용 HTTP 커넥션 풀 크기
+    llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    llm_max_keepalive: int = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+    # 같은 프롬프트 동시 요청을 호출 1번으로 합침(완료 후 grace 초 동안 결과 재사용)
+    llm_coalesce: bool = os.getenv("LLM_COALESCE", "true").lower() == "true"
+    llm_coalesce_grace_s: float = float(os.getenv("LLM_COALESCE_GRACE_S", "2"))
 
 settings = Settings()
@@ -5,29 +5,162 @@
 # - GPT-4o-mini (또는 지정된 모델)과의 대화 기능 제공
 # - 모든 LLM 관련 호출을 이 파일로 통합
 # - 다른 프로젝트(예: STT/TTS, RAG 등)에서 import 하여 사용
+#
+# ⚡ 비동기 + 커넥션 풀:
+# - achat(): async 엔드포인트용(이벤트 루프를 막지 않음)
+# - chat():  기존 동기 호출부용 래퍼(같은 풀/동시 호출 제한을 공유)
+# - 전용 이벤트 루프 스레드 1개가 AsyncOpenAI(httpx 커넥션 풀)와 세마포어를 소유
+#   → 어느 스레드/이벤트 루프에서 부르든 프로세스 전체 동시 요청 수는 LLM_MAX_INFLIGHT 이하
+# - 호출별 타임아웃(기본 LLM_TIMEOUT_S, 세마포어 대기 포함) 초과 시 TimeoutError
+# - LLM_COALESCE=true: 정규화 프롬프트(모델/파라미터 포함)가 같은 동시 요청은 upstream 1번만 호출
+#   (singleflight.SingleFlight, 완료 후 LLM_COALESCE_GRACE_S초 동안 결과 재사용)
 # ================================================================
 
-from openai import OpenAI
-from typing import List, Dict, Any
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from typing import List, Dict, Any, Optional
+
+import httpx
+from openai import AsyncOpenAI
 from .config import settings
+from .singleflight import SingleFlight
 
 # ------------------------------------------------
-# 🔗 OpenAI 클라이언트 초기화
+# 🔗 전용 이벤트 루프 + 풀링된 AsyncOpenAI 클라이언트 (최초 호출 시 기동)
 # ------------------------------------------------
-_client = OpenAI(
-    api_key=settings.openai_api_key,
-    base_url=settings.openai_base_url
-)
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_client: Optional[AsyncOpenAI] = None
+_sem: Optional[asyncio.Semaphore] = None
+_init_lock = threading.Lock()
+
+_flight = SingleFlight("llm", grace_s=settings.llm_coalesce_grace_s)
+
+_stats = {"calls": 0, "errors": 0, "timeouts": 0, "in_flight": 0, "waiting": 0,
+          "total_ms": 0.0, "max_ms": 0.0}
+
+
+def _runtime() -> asyncio.AbstractEventLoop:
+    global _loop, _client, _sem
+    if _loop is not None:
+        return _loop
+    with _init_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True).start()
+
+            async def _init():
+                http = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.llm_max_connections,
+                        max_keepalive_connections=settings.llm_max_keepalive,
+                    ),
+                    timeout=httpx.Timeout(settings.llm_timeout_s, connect=5.0),
+                )
+                return (
+                    AsyncOpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url,
+                                http_client=http, max_retries=1),
+                    asyncio.Semaphore(settings.llm_max_inflight),
+                )
+
+            _client, _sem = asyncio.run_coroutine_threadsafe(_init(), loop).result()
+            _loop = loop
+    return _loop
+
+
+async def _complete(model: str, messages: List[Dict[str, str]], temperature: float,
+                    max_tokens: int, timeout: float) -> str:
+    """전용 루프에서 실행: 세마포어 대기 + 요청 전체를 timeout 안에"""
+    t0 = time.perf_counter()
+
+    async def _call():
+        _stats["waiting"] += 1
+        try:
+            await _sem.acquire()
+        finally:
+            _stats["waiting"] -= 1
+        _stats["in_flight"] += 1
+        try:
+            remaining = max(0.1, timeout - (time.perf_counter() - t0))
+            resp = await _client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=remaining,
+            )
+            return resp.choices[0].message.content.strip()
+        finally:
+            _stats["in_flight"] -= 1
+            _sem.release()
+
+    _stats["calls"] += 1
+    try:
+        return await asyncio.wait_for(_call(), timeout)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        raise TimeoutError(f"LLM call exceeded {timeout}s")
+    except Exception:
+        _stats["errors"] += 1
+        raise
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        _stats["total_ms"] += ms
+        _stats["max_ms"] = max(_stats["max_ms"], ms)
+
+
+def _prompt_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+    """정규화 프롬프트 키: NFKC + 공백 정리(앞뒤 제거, 연속 공백 1개)"""
+    norm = [(m.get("role"), re.sub(r"\s+", " ", unicodedata.normalize("NFKC", m.get("content") or "")).strip())
+            for m in messages]
+    raw = json.dumps([model, temperature, max_tokens, norm], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
 
 # ------------------------------------------------
 # 💬 Chat 함수 (LLM 대화용)
 # ------------------------------------------------
+async def achat(messages: List[Dict[str, str]],
+                model: str | None = None,
+                temperature: float = 0.7,
+                max_tokens: int = 256,
+                timeout: float | None = None) -> str:
+    """
+    chat()의 비동기 버전. FastAPI async 엔드포인트에서는 이 함수를 await 하세요.
+
+    Args:
+        messages, model, temperature, max_tokens: chat()과 동일
+        timeout: 호출 1건 타임아웃(초, 동시 호출 제한 대기 포함). 기본 LLM_TIMEOUT_S
+
+    Raises:
+        TimeoutError: timeout 초과
+    """
+    model = model or settings.openai_model
+
+    def _run():
+        fut = asyncio.run_coroutine_threadsafe(
+            _complete(model, messages, temperature, max_tokens, timeout or settings.llm_timeout_s),
+            _runtime(),
+        )
+        return asyncio.wrap_future(fut)
+
+    if not settings.llm_coalesce:
+        return await _run()
+    return await _flight.ado(_prompt_key(model, messages, temperature, max_tokens), _run)
+
+
 def chat(messages: List[Dict[str, str]],
          model: str | None = None,
          temperature: float = 0.7,
-         max_tokens: int = 256) -> str:
+         max_tokens: int = 256,
+         timeout: float | None = None) -> str:
     """
     GPT-4o-mini 모델에 채팅 요청을 보내고, 텍스트 응답을 반환합니다.
+    (동기 래퍼: 현재 스레드를 막고 기다림. 이벤트 루프 안에서는 achat()을 사용)
 
     Args:
         messages: OpenAI chat 형식의 메시지 리스트
@@ -35,15 +168,33 @@ def chat(messages: List[Dict[str, str]],
         model: 사용할 모델명 (기본값은 .env에 설정된 모델)
         temperature: 창의성 정도 (0=보수적, 1=창의적)
         max_tokens: 최대 생성 토큰 수
+        timeout: 호출 1건 타임아웃(초). 기본 LLM_TIMEOUT_S
 
     Returns:
         str: LLM이 생성한 답변 텍스트
     """
     model = model or settings.openai_model
-    resp = _client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature,
-        max_tokens=max_tokens
-    )
-    return resp.choices[0].message.content.strip()
+
+    def _run():
+        fut = asyncio.run_coroutine_threadsafe(
+            _complete(model, messages, temperature, max_tokens, timeout or settings.llm_timeout_s),
+            _runtime(),
+        )
+        return fut.result()  # _complete가 timeout을 강제하므로 여기서는 결과만 기다림
+
+    if not settings.llm_coalesce:
+        return _run()
+    return _flight.do(_prompt_key(model, messages, temperature, max_tokens), _run)
+
+
+def llm_stats() -> Dict[str, Any]:
+    """동시 호출/대기/오류/타임아웃 통계"""
+    s = dict(_stats)
+    done = s["calls"] - s["in_flight"] - s["waiting"]
+    s["avg_ms"] = round(s.pop("total_ms") / done, 1) if done > 0 else 0.0
+    s["max_ms"] = round(s["max_ms"], 1)
+    s["max_inflight"] = settings.llm_max_inflight
+    s["max_connections"] = settings.llm_max_connections
+    s["timeout_s"] = settings.llm_timeout_s
+    s["coalesce"] = {"enabled": settings.llm_coalesce, **_flight.stats()}
+    return s
@@ -0,0 +1,196 @@
+# ================================================================
+# singleflight.py
+# ------------------------------------------------
+# 🧩 역할:
+# - 같은 키로 동시에 들어온 요청을 upstream 호출 1번으로 합침(single-flight)
+#   · 첫 요청(leader)만 fn()을 실행, 나머지(follower)는 같은 결과/예외를 공유
+#   · 완료 후 grace_s초 동안은 같은 키 요청에 방금 결과를 그대로 반환(성공 결과만)
+# - do(): 동기 호출부용 / ado(): async 호출부용
+#   → 둘 다 concurrent.futures.Future를 공유하므로 스레드/이벤트 루프가 섞여도 한 번만 호출
+#   → ado()의 fn()은 별도 task로 돌고 호출자는 shield로 기다림: 어느 호출자(leader 포함)가 취소돼도
+#     자기 대기만 끝나고 upstream 호출/다른 호출자는 그대로 진행(follower에게는 fn()의 실제 예외만 전달)
+# - stream(): 스트리밍 응답용. leader의 iterable을 백그라운드 스레드에서 한 번만 돌리고
+#   모든 호출자가 같은 항목을 처음부터 받음(늦게 합류해도 지금까지 나온 항목부터 재생 후 실시간)
+#   (같은 key를 do()/stream()에 섞어 쓰지 말 것)
+# - 합쳐진 요청 비율 등 통계 제공(stats)
+# - 사용처: llm_client.chat/achat(정규화 프롬프트 키), rag /chat·/chat/stream(정규화 질의 + 인덱스 버전 키)
+# ================================================================
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class _Broadcast:
+    """leader 스트림 항목을 모아 두고 구독자마다 처음부터 재생"""
+
+    def __init__(self):
+        self._items: List[Any] = []
+        self._done = False
+        self._exc: Optional[BaseException] = None
+        self._cond = threading.Condition()
+
+    def push(self, item: Any) -> None:
+        with self._cond:
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def close(self, exc: Optional[BaseException] = None) -> None:
+        with self._cond:
+            self._done, self._exc = True, exc
+            self._cond.notify_all()
+
+    def __iter__(self) -> Iterator:
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self._items) and not self._done:
+                    self._cond.wait()
+                batch = self._items[i:]
+                done, exc = self._done, self._exc
+            yield from batch
+            i += len(batch)
+            if not batch and done:
+                if exc is not None:
+                    raise exc
+                return
+
+
+class SingleFlight:
+    def __init__(self, name: str, grace_s: float = 2.0, max_recent: int = 1024):
+        self.name = name
+        self.grace_s = grace_s
+        self.max_recent = max_recent
+        self._inflight: Dict[str, Future] = {}
+        self._recent: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # key → (만료 시각, 결과)
+        self._lock = threading.Lock()
+        self._tasks: set = set()  # ado() leader task 강한 참조(완료 전 GC 방지)
+        self.requests = 0
+        self.leaders = 0          # 실제 upstream 호출 수
+        self.joined = 0           # 진행 중인 호출에 합류
+        self.grace_hits = 0       # 완료 직후 grace 창에서 재사용
+        self.errors = 0
+
+    # ---- 내부 ----
+    def _join_locked(self, key: str) -> Tuple[Optional[Future], bool]:
+        """(기다릴/결과가 든 Future, leader 여부)"""
+        self.requests += 1
+        now = time.monotonic()
+        hit = self._recent.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                self.grace_hits += 1
+                fut: Future = Future()
+                fut.set_result(hit[1])
+                return fut, False
+            del self._recent[key]
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.joined += 1
+            return fut, False
+        fut = self._inflight[key] = Future()
+        self.leaders += 1
+        return fut, True
+
+    def _release(self, key: str, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if exc is None and self.grace_s > 0:
+                self._recent[key] = (time.monotonic() + self.grace_s, result)
+                self._recent.move_to_end(key)
+                while len(self._recent) > self.max_recent:
+                    self._recent.popitem(last=False)
+            elif exc is not None:
+                self.errors += 1
+
+    def _finish(self, key: str, fut: Future, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        self._release(key, result, exc)
+        if exc is None:
+            fut.set_result(result)
+        else:
+            fut.set_exception(exc)
+
+    # ---- 퍼블릭 API ----
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """동기: 같은 key의 진행 중/방금 끝난 호출이 있으면 그 결과, 없으면 fn()"""
+        with self._lock:
+            fut, leader = self._join_locked(key)
+        if not leader:
+            return fut.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, fut, exc=e)
+            raise
+        self._finish(key, fut, result)
+        return result
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """비동기: do()와 같지만 follower는 이벤트 루프를 막지 않고 기다림"""
+        with self._lock:
+            fut, leader = self._join_locked(key)
+        if not leader:
+            # wrap_future는 대기 취소를 공유 Future까지 전파하므로 shield로 끊음
+            return await asyncio.shield(asyncio.wrap_future(fut))
+        task = asyncio.ensure_future(fn())
+        self._tasks.add(task)
+
+        def settle(t: "asyncio.Future") -> None:
+            self._tasks.discard(t)
+            if t.cancelled():  # task 자체가 취소된 경우(이벤트 루프 종료 등)만
+                self._finish(key, fut, exc=asyncio.CancelledError())
+            elif t.exception() is not None:
+                self._finish(key, fut, exc=t.exception())
+            else:
+                self._finish(key, fut, t.result())
+
+        task.add_done_callback(settle)
+        return await asyncio.shield(task)
+
+    def stream(self, key: str, fn: Callable[[], Iterable]) -> Iterator:
+        """
+        스트리밍: 같은 key의 진행 중/방금 끝난 스트림이 있으면 그 항목을 처음부터, 없으면 fn()을 leader로 실행.
+        fn()은 백그라운드 스레드에서 끝까지 돌므로 leader 호출자가 먼저 끊겨도 follower는 계속 받음.
+        fn()이 중간에 실패하면 모든 호출자가 받은 항목 뒤에 같은 예외를 받음.
+        """
+        with self._lock:
+            fut, leader = self._join_locked(key)
+        if not leader:
+            yield from fut.result()
+            return
+        bc = _Broadcast()
+        fut.set_result(bc)
+
+        def pump():
+            try:
+                for item in fn():
+                    bc.push(item)
+            except BaseException as e:
+                self._release(key, exc=e)
+                bc.close(e)
+            else:
+                self._release(key, bc)
+                bc.close()
+
+        threading.Thread(target=pump, name=f"singleflight-{self.name}", daemon=True).start()
+        yield from bc
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            coalesced = self.joined + self.grace_hits
+            return {
+                "name": self.name,
+                "grace_s": self.grace_s,
+                "requests": self.requests,
+                "upstream_calls": self.leaders,
+                "coalesced": coalesced,
+                "coalesced_inflight": self.joined,
+                "coalesced_grace": self.grace_hits,
+                "coalesced_ratio": round(coalesced / self.requests, 4) if self.requests else 0.0,
+                "errors": self.errors,
+                "in_flight": len(self._inflight),
+                "recent": len(self._recent),
+            }
@@ -0,0 +1,103 @@
+# ai/llm_runtime/test_llm_client.py
+# ================================================================
+# 역할
+# - 비동기 LLM 클라이언트의 동시 호출 제한/타임아웃 확인
+#   · chat()(스레드)과 achat()(이벤트 루프)이 같은 세마포어 → 프로세스 전체 in-flight ≤ LLM_MAX_INFLIGHT
+#   · 타임아웃은 세마포어 대기 포함, 초과 시 TimeoutError + timeouts 통계
+#   · LLM_COALESCE=true면 같은 프롬프트 동시 요청은 upstream 1번
+# - AsyncOpenAI 대신 지연만 흉내 내는 completions 객체를 전용 루프에 설치(네트워크 없음)
+# ================================================================
+import asyncio, threading, time, types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+llm_client = pytest.importorskip("llm_runtime.llm_client")
+
+
+class _SlowCompletions:
+    """동시에 몇 건이 upstream에 걸려 있는지 기록"""
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = self.peak = self.calls = 0
+
+    async def create(self, model, messages, temperature, max_tokens, timeout):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            text = f" {messages[-1]['content']} 답변 "
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=text))])
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def runtime(monkeypatch):
+    """전용 루프 스레드 + 가짜 client + 세마포어(limit) 설치"""
+    loop = asyncio.new_event_loop()
+    t = threading.Thread(target=loop.run_forever, daemon=True)
+    t.start()
+    upstream = _SlowCompletions()
+
+    def install(limit, coalesce=False, delay=0.05):
+        upstream.delay = delay
+
+        async def make_sem():
+            return asyncio.Semaphore(limit)
+
+        sem = asyncio.run_coroutine_threadsafe(make_sem(), loop).result()
+        fake = types.SimpleNamespace(chat=types.SimpleNamespace(completions=upstream))
+        monkeypatch.setattr(llm_client, "_loop", loop)
+        monkeypatch.setattr(llm_client, "_client", fake)
+        monkeypatch.setattr(llm_client, "_sem", sem)
+        monkeypatch.setattr(llm_client, "_stats", {k: 0 for k in llm_client._stats})
+        monkeypatch.setattr(llm_client.settings, "llm_coalesce", coalesce)
+        monkeypatch.setattr(llm_client.settings, "llm_max_inflight", limit)
+        return upstream
+
+    yield install
+    loop.call_soon_threadsafe(loop.stop)
+    t.join(2)
+
+
+def _msg(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_threads_and_event_loop_share_the_limit(runtime):
+    upstream = runtime(limit=3)
+
+    async def async_side():
+        return await asyncio.gather(*(llm_client.achat(_msg(f"a{i}")) for i in range(6)))
+
+    with ThreadPoolExecutor(6) as pool:
+        sync = [pool.submit(llm_client.chat, _msg(f"s{i}")) for i in range(6)]
+        async_out = asyncio.run(async_side())
+        sync_out = [f.result(5) for f in sync]
+
+    assert sync_out == [f"s{i} 답변" for i in range(6)]
+    assert async_out == [f"a{i} 답변" for i in range(6)]
+    assert upstream.calls == 12 and upstream.peak == 3
+    st = llm_client.llm_stats()
+    assert (st["calls"], st["in_flight"], st["waiting"], st["errors"]) == (12, 0, 0, 0)
+
+
+def test_timeout_counts_semaphore_wait(runtime):
+    runtime(limit=1, delay=0.4)
+    with ThreadPoolExecutor(2) as pool:
+        slow = pool.submit(llm_client.chat, _msg("먼저"), timeout=2)
+        time.sleep(0.05)
+        with pytest.raises(TimeoutError):
+            llm_client.chat(_msg("대기만 하다 끝남"), timeout=0.1)
+        assert slow.result(3) == "먼저 답변"
+    assert llm_client.llm_stats()["timeouts"] == 1
+
+
+def test_same_prompt_is_coalesced(runtime):
+    upstream = runtime(limit=4, coalesce=True, delay=0.1)
+    with ThreadPoolExecutor(5) as pool:
+        outs = list(pool.map(lambda s: llm_client.chat(_msg(s)), ["휴학  기간", "휴학 기간", " 휴학 기간 "] * 2))
+    assert len(set(outs)) == 1 and outs[0].replace("  ", " ").strip() == "휴학 기간 답변"
+    assert upstream.calls == 1
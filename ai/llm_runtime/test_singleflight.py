@@ -0,0 +1,165 @@
+# ai/llm_runtime/test_singleflight.py
+# ================================================================
+# 역할
+# - SingleFlight 합치기 확인
+#   · do(): 동시 요청은 upstream 1번, 완료 후 grace 창 재사용, 예외는 공유하되 캐시하지 않음
+#   · ado(): leader/follower 어느 쪽이 취소돼도 upstream과 다른 호출자는 그대로, do()와 섞여도 1번
+#   · stream(): 늦게 합류한 호출자도 처음부터 재생, 중간 실패는 받은 항목 뒤 같은 예외
+# ================================================================
+import asyncio, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm_runtime.singleflight import SingleFlight
+
+
+class _Upstream:
+    """gate가 열릴 때까지 붙잡혀 있는 upstream 호출(호출 수 기록)"""
+    def __init__(self, result="답변", exc=None):
+        self.result, self.exc = result, exc
+        self.gate = threading.Event()
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        assert self.gate.wait(5)
+        if self.exc is not None:
+            raise self.exc
+        return self.result
+
+
+def _wait_joined(sf, n):
+    deadline = time.monotonic() + 5
+    while sf.stats()["coalesced_inflight"] < n:
+        assert time.monotonic() < deadline, sf.stats()
+        time.sleep(0.005)
+
+
+def test_concurrent_do_calls_upstream_once():
+    sf, up = SingleFlight("t", grace_s=0), _Upstream()
+    with ThreadPoolExecutor(8) as pool:
+        futs = [pool.submit(sf.do, "휴학", up) for _ in range(8)]
+        _wait_joined(sf, 7)
+        up.gate.set()
+        assert [f.result(5) for f in futs] == ["답변"] * 8
+    st = sf.stats()
+    assert (up.calls, st["upstream_calls"], st["coalesced_ratio"], st["in_flight"]) == (1, 1, 0.875, 0)
+
+
+def test_grace_window_reuses_then_expires():
+    sf, up = SingleFlight("t", grace_s=0.1), _Upstream()
+    up.gate.set()
+    assert sf.do("k", up) == sf.do("k", up) == "답변"
+    assert up.calls == 1 and sf.stats()["coalesced_grace"] == 1
+    time.sleep(0.15)
+    sf.do("k", up)
+    assert up.calls == 2 and sf.stats()["recent"] == 1
+
+
+def test_errors_are_shared_but_not_cached():
+    sf, up = SingleFlight("t", grace_s=5), _Upstream(exc=TimeoutError("LLM timeout"))
+    with ThreadPoolExecutor(3) as pool:
+        futs = [pool.submit(sf.do, "k", up) for _ in range(3)]
+        _wait_joined(sf, 2)
+        up.gate.set()
+        for f in futs:
+            with pytest.raises(TimeoutError, match="LLM timeout"):
+                f.result(5)
+    up.exc = None
+    assert sf.do("k", up) == "답변" and up.calls == 2
+    assert sf.stats()["errors"] == 1
+
+
+def test_cancelled_async_leader_does_not_cancel_followers():
+    sf, calls = SingleFlight("t", grace_s=0), []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "공유 결과"
+
+    async def main():
+        leader = asyncio.create_task(sf.ado("k", upstream))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(sf.ado("k", upstream)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(main()) == ["공유 결과"] * 3
+    assert calls == [1] and sf.stats()["errors"] == 0
+
+
+def test_cancelled_follower_leaves_leader_running():
+    sf = SingleFlight("t", grace_s=0)
+
+    async def upstream():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def main():
+        leader = asyncio.create_task(sf.ado("k", upstream))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(sf.ado("k", upstream))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader, follower.cancelled()
+
+    assert asyncio.run(main()) == (42, True)
+
+
+def test_async_follower_joins_thread_leader():
+    sf, up = SingleFlight("t", grace_s=0), _Upstream(result="스레드 결과")
+
+    async def never_called():
+        raise AssertionError("follower must not call upstream")
+
+    with ThreadPoolExecutor(1) as pool:
+        leader = pool.submit(sf.do, "k", up)
+        while sf.stats()["in_flight"] == 0:
+            time.sleep(0.005)
+        threading.Timer(0.05, up.gate.set).start()
+        assert asyncio.run(sf.ado("k", never_called)) == "스레드 결과"
+        assert leader.result(5) == "스레드 결과"
+
+
+def test_stream_replays_from_start_for_late_joiner():
+    sf = SingleFlight("t", grace_s=0)
+    step = threading.Semaphore(0)
+
+    def tokens():
+        for t in ["휴학은 ", "개강 ", "전 ", "2주"]:
+            step.acquire()
+            yield t
+
+    first = sf.stream("k", tokens)
+    step.release()
+    assert next(first) == "휴학은 "
+    step.release()
+    assert next(first) == "개강 "
+    late = sf.stream("k", lambda: iter(["쓰이면 안 됨"]))
+    assert next(late) == "휴학은 "
+    step.release()
+    step.release()
+    assert list(late) == ["개강 ", "전 ", "2주"]
+    first.close()  # leader 호출자가 먼저 끊겨도 upstream은 끝까지 돈 상태
+    assert sf.stats()["upstream_calls"] == 1
+
+
+def test_stream_failure_reaches_every_subscriber():
+    sf = SingleFlight("t", grace_s=5)
+
+    def broken():
+        yield "장학금은 "
+        raise ConnectionError("stream reset")
+
+    got = []
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            for item in sf.stream("k", broken):
+                got.append(item)
+    assert got == ["장학금은 ", "장학금은 "]
+    assert sf.stats()["upstream_calls"] == 2 and sf.stats()["errors"] == 2
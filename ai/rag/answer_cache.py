@@ -0,0 +1,148 @@
+# ai/rag/answer_cache.py
+# ================================================================
+# 역할
+# - /rag/chat 답변 시맨틱 캐시: (질의 임베딩, 답변, 출처, 인덱스 버전) 저장
+#   · 새 질의 임베딩과 코사인 유사도가 임계값 이상이고 인덱스 버전이 같으면 저장된 답변 반환
+#     (방금 답한 질문의 표현만 바뀐 질문은 LLM 호출 없이 응답)
+#   · 필터/top_k가 다르면 다른 키(scope)로 취급
+# - 인덱스 버전 = version_fn() 결과
+#   · collection/built_at(전체 재빌드)가 바뀌면 전부 무효
+#   · 증분 반영 시 바뀐 dataset 버전만 올라감 → 그 dataset을 출처로 쓴 답변만 무효
+# - 최대 항목 수(LRU) / TTL / hit rate 통계
+#
+# 환경변수
+# - ANSWER_CACHE=true|false
+# - ANSWER_CACHE_SIZE=512
+# - ANSWER_CACHE_TTL_S=3600
+# - ANSWER_CACHE_THRESHOLD=0.95     (코사인 유사도 기준)
+# ================================================================
+from __future__ import annotations
+
+import os, threading, time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "true").lower() == "true"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", "3600"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+
+class _Entry:
+    __slots__ = ("scope", "vec", "answer", "datasets", "collection", "built_at", "versions",
+                 "created", "used", "hits")
+
+    def __init__(self, scope, vec, answer, datasets, state):
+        self.scope = scope
+        self.vec = vec
+        self.answer = answer
+        self.datasets = datasets
+        self.collection = state.get("collection")
+        self.built_at = state.get("built_at", 0)
+        # 출처 dataset별 저장 당시 버전
+        self.versions = {d: (state.get("datasets") or {}).get(d, 0) for d in datasets}
+        self.created = self.used = time.monotonic()
+        self.hits = 0
+
+    def valid_for(self, state: Dict) -> bool:
+        if self.collection != state.get("collection") or self.built_at != state.get("built_at", 0):
+            return False
+        cur = state.get("datasets") or {}
+        return all(cur.get(d, 0) == v for d, v in self.versions.items())
+
+
+class SemanticAnswerCache:
+    def __init__(self, version_fn: Callable[[], Dict], max_entries: int = ANSWER_CACHE_SIZE,
+                 ttl_s: float = ANSWER_CACHE_TTL_S, threshold: float = ANSWER_CACHE_THRESHOLD):
+        self.version_fn = version_fn
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.threshold = threshold
+        self._entries: List[_Entry] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0         # 버전 변경으로 버린 항목
+        self.expired = 0
+        self.evictions = 0
+        self.invalidated = 0   # invalidate()로 버린 항목
+
+    @staticmethod
+    def _unit(vec) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32).ravel()
+        return v / max(float(np.linalg.norm(v)), 1e-12)
+
+    def _prune_locked(self, state: Dict) -> None:
+        now = time.monotonic()
+        keep = []
+        for e in self._entries:
+            if self.ttl_s and now - e.created > self.ttl_s:
+                self.expired += 1
+            elif not e.valid_for(state):
+                self.stale += 1
+            else:
+                keep.append(e)
+        self._entries = keep
+
+    def lookup(self, vec, scope: str) -> Optional[Dict]:
+        """유사 질의 답변이 있으면 {"answer": ..., "similarity": ...}"""
+        if self.max_entries <= 0:
+            return None
+        q = self._unit(vec)
+        state = self.version_fn()
+        with self._lock:
+            self._prune_locked(state)
+            cands = [e for e in self._entries if e.scope == scope and e.vec.shape == q.shape]
+            if cands:
+                sims = np.vstack([e.vec for e in cands]) @ q
+                b = int(np.argmax(sims))
+                if sims[b] >= self.threshold:
+                    e = cands[b]
+                    e.used = time.monotonic()
+                    e.hits += 1
+                    self.hits += 1
+                    return {"answer": e.answer, "similarity": round(float(sims[b]), 4)}
+            self.misses += 1
+            return None
+
+    def put(self, vec, scope: str, answer: Dict, datasets: Iterable[str]) -> None:
+        if self.max_entries <= 0:
+            return
+        state = self.version_fn()
+        entry = _Entry(scope, self._unit(vec), answer, sorted({d for d in datasets if d}), state)
+        with self._lock:
+            self._entries.append(entry)
+            if len(self._entries) > self.max_entries:
+                # 마지막 사용 시각이 가장 오래된 항목 제거
+                self._entries.sort(key=lambda e: e.used)
+                drop = len(self._entries) - self.max_entries
+                self._entries = self._entries[drop:]
+                self.evictions += drop
+
+    def invalidate(self, dataset: Optional[str] = None) -> int:
+        """dataset을 출처로 쓴 답변만(None이면 전부) 삭제, 삭제 수 반환"""
+        with self._lock:
+            before = len(self._entries)
+            self._entries = [] if dataset is None else [e for e in self._entries if dataset not in e.datasets]
+            n = before - len(self._entries)
+            self.invalidated += n
+            return n
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": ANSWER_CACHE,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "stale": self.stale,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidated": self.invalidated,
+            }
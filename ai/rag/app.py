@@ -1,26 +1,54 @@
 # app.py
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from datetime import datetime, timedelta
 from pymongo import MongoClient
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
 from langchain_openai import ChatOpenAI
 import os
 from dotenv import load_dotenv
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict
 from pydantic import BaseModel
 import time
+import json
 import traceback
 
 from . import config  # 설정 파일 임포트
 from . import qa      # qa 모듈 임포트
-from .store import get_client, get_collection
+from .store import get_client, get_collection, active_collection_name
+from .embed_cache import cache_stats
+from .query_cache import query_cache_stats
+from .microbatch import batcher_stats
+from .filters import FilterError, compile_filters, partition_values
+from .np_index import load_index, index_stats
+from .answer_cache import ANSWER_CACHE, SemanticAnswerCache
+from .auto_index import index_state, on_reindex, bump_dataset_versions
+from .ingest import EMBEDDER_KEY, ingest_mongo_all, export_np_index
+from .retriever import encode_query, encode_queries, retrieve
+from .models import model_stats
+from .faq import FAQ_ANSWERS, FAQ_K, FaqStore, build_faq
+from .query_cache import normalize_query
+from llm_runtime.singleflight import SingleFlight
 
 # .env 파일 로드
 load_dotenv()
 
+class ActiveRetriever(BaseRetriever):
+    """
+    rag.retriever.retrieve()를 LangChain 리트리버로 감쌈(qa.answer의 RetrievalQA용)
+    → ingest가 쓰는 활성 컬렉션 + 같은 임베더(query LRU/마이크로 배칭/NumPy 검색 포함)로 검색
+    """
+    k: int = 6
+    where: Optional[Dict] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [
+            Document(page_content=c["text"] or "", metadata={**c["meta"], "_id": c["id"], "score": c["score"]})
+            for c in retrieve(query, k=self.k, filters=self.where)
+        ]
+
 app = FastAPI(title="RAG Backend", version="1.1")
 
 # ------------------------------
@@ -32,16 +60,7 @@ try:
     db = client[config.MONGO_DB]
     collection = db[config.MONGO_COLL]
 
-    # LangChain 구성요소
-    embedding = HuggingFaceEmbeddings(model_name=config.EMBEDDING_MODEL_NAME)
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=config.CHUNK_SIZE,
-        chunk_overlap=config.CHUNK_OVERLAP
-    )
-    vectorstore = Chroma(
-        persist_directory=config.CHROMA_DIR,
-        embedding_function=embedding
-    )
+    # 임베더는 rag.models 레지스트리에서 첫 질의 때 1번 로드(ingest/retriever와 공유)
     llm = ChatOpenAI(model="gpt-4-turbo")
 
 except Exception as e:
@@ -54,70 +73,123 @@ except Exception as e:
 class RagChatReq(BaseModel):
     query: str
     top_k: int = 6
-    filters: Optional[Dict[str, List[str]]] = None
+    # 예: {"dataset": ["규정집"], "updated_from": "2024-03-01"} → filters.compile_filters로 where 절 변환
+    filters: Optional[Dict[str, Any]] = None
 
-# ------------------------------
-# 3️⃣ JSON 평탄화 함수
-# ------------------------------
-def flatten_json(data, prefix=""):
-    texts = []
-    if isinstance(data, dict):
-        for k, v in data.items():
-            texts.extend(flatten_json(v, f"{prefix}{k}: "))
-    elif isinstance(data, list):
-        for i, item in enumerate(data):
-            texts.extend(flatten_json(item, f"{prefix}[{i}] "))
-    else:
-        if data not in [None, ""]:
-            texts.append(f"{prefix}{data}")
-    return texts
+# 시맨틱 답변 캐시(인덱스 버전 = 활성 컬렉션 + manifest의 dataset별 버전)
+answer_cache = SemanticAnswerCache(index_state)
+
+def _filter_datasets(where: Optional[Dict]) -> List[str]:
+    vals, _ = partition_values(where, "dataset")
+    return [str(v) for v in vals or []]
+
+# chat_logs 상위 의도 사전 계산 답변(재인덱싱 후 자동 재계산)
+faq_store = FaqStore(index_state, model=EMBEDDER_KEY)
+
+def _answer(q: str, k: int, where: Optional[Dict]) -> Dict:
+    return qa.answer(
+        query=q,
+        retriever=ActiveRetriever(k=k, where=where),
+        llm=llm
+    )
+
+faq_store.set_job(lambda: build_faq(
+    answer_fn=lambda q: _answer(q, FAQ_K, None),
+    embed_fn=encode_queries,
+    version_fn=index_state,
+    model=EMBEDDER_KEY,
+))
+if FAQ_ANSWERS:
+    on_reindex(lambda _res: faq_store.rebuild())
+
+# 같은 질문이 한꺼번에 몰릴 때(공지 직후 등) 검색 + LLM 호출을 1번으로 합침
+rag_flight = SingleFlight("rag", grace_s=config.RAG_COALESCE_GRACE_S)
+
+def _flight_key(kind: str, q: str, k: int, where: Optional[Dict]) -> str:
+    """키 = 정규화 질의 + top_k + where + 인덱스 버전(재인덱싱 전후 답변은 섞지 않음)"""
+    return json.dumps([kind, normalize_query(q), k, where, index_state()], sort_keys=True, ensure_ascii=False)
+
+def _coalesced(q: str, k: int, where: Optional[Dict], fn) -> Dict:
+    """/chat: fn은 leader만 실행"""
+    if not config.RAG_COALESCE:
+        return fn()
+    return dict(rag_flight.do(_flight_key("chat", q, k, where), fn))  # 호출자마다 latency_ms를 붙이므로 사본
+
+def _coalesced_stream(q: str, k: int, where: Optional[Dict], fn):
+    """/chat/stream: fn(검색 + LLM 스트림)은 leader만 실행, 모든 호출자가 같은 sources/토큰을 받음"""
+    if not config.RAG_COALESCE:
+        return fn()
+    return rag_flight.stream(_flight_key("stream", q, k, where), fn)
+
+def _where(req: RagChatReq) -> Optional[Dict]:
+    try:
+        return compile_filters(req.filters)
+    except FilterError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filters: {e}")
 
 # ------------------------------
-# 4️⃣ FastAPI Endpoints
+# 3️⃣ FastAPI Endpoints
 # ------------------------------
 
 @app.post("/ingest")
 def update_vector_db(days: int = 1, force_reingest: bool = False):
     """
-    MongoDB 문서를 벡터DB에 업데이트합니다.
+    MongoDB 문서를 벡터DB(활성 컬렉션)에 업데이트합니다. ingest.ingest_mongo_all과 같은 청크/임베딩/diff upsert 경로.
     - force_reingest=True: 모든 문서를 강제로 다시 인덱싱합니다.
     - force_reingest=False: 최근 N일 이내 변경된 문서만 증분 인덱싱합니다.
     """
     since = datetime.utcnow() - timedelta(days=days)
     query = {} if force_reingest else {config.MONGO_UPDATED_FIELD: {"$gte": since}}
 
-    # 모든 컬렉션을 순회하며 문서를 찾음
-    all_docs = []
-    for coll_name in db.list_collection_names():
-        if coll_name.startswith('system.'):
-            continue
-        collection = db[coll_name]
-        docs = list(collection.find(query))
-        all_docs.extend(docs)
+    # 모든 컬렉션을 순회(워터마크 대신 days 기준으로 읽음)
+    names = [c for c in db.list_collection_names() if not c.startswith('system.')]
+    res = ingest_mongo_all(query=query, collections=names, full=True)
+    per_coll = {r["collection"]: r.get("added", 0) + r.get("updated", 0) + r.get("removed", 0)
+                for r in res.get("mongo_collections", [])}
+    changed = sum(per_coll.values())
 
-    if not all_docs:
+    if not res.get("mongo_total"):
         return {"message": "No documents to update based on the given criteria."}
 
-    new_docs = []
-    ids_to_delete = []
-    for doc in all_docs:
-        doc_id = str(doc["_id"])
-        ids_to_delete.append(doc_id)
-        
-        flat_text = "\n".join(flatten_json(doc))
-        for chunk in splitter.split_text(flat_text):
-            new_docs.append(
-                Document(page_content=chunk, metadata={"_id": doc_id})
-            )
+    if changed:
+        res["np_index"] = export_np_index()
+        # 증분 반영(auto_index)과 같은 manifest 버전 갱신 → 모든 워커의 답변 캐시/FAQ가 해당 dataset만 무효화
+        bump_dataset_versions([c for c, n in per_coll.items() if n])
+        if FAQ_ANSWERS:
+            faq_store.schedule_rebuild()
+
+    return {"message": f"{changed} chunks updated from {res['mongo_total']} documents",
+            "collection": active_collection_name(), **res}
+
+def _cached_answer(q: str, k: int, where: Optional[Dict]):
+    """FAQ 사전 계산 답변 → 시맨틱 답변 캐시 순으로 조회, (답변 또는 None, 질의 벡터, 캐시 scope)"""
+    qvec, scope = None, None
+    # 자주 묻는 질문이면 미리 계산한 답변 반환(검색/LLM 생략)
+    if FAQ_ANSWERS and where is None and k == FAQ_K:
+        qvec = encode_query(q)
+        hit = faq_store.lookup(qvec)
+        if hit is not None:
+            return {**hit["answer"], "cached": True, "faq": hit["question"], "similarity": hit["similarity"]}, qvec, scope
 
-    if ids_to_delete:
-        vectorstore.delete(ids=ids_to_delete)
+    # 같은 필터/top_k 범위에서 의미가 같은 질문이면 캐시된 답변 반환
+    if ANSWER_CACHE:
+        if qvec is None:
+            qvec = encode_query(q)
+        scope = json.dumps({"k": k, "where": where}, sort_keys=True, ensure_ascii=False)
+        hit = answer_cache.lookup(qvec, scope)
+        if hit is not None:
+            return {**hit["answer"], "cached": True, "similarity": hit["similarity"]}, qvec, scope
+    return None, qvec, scope
 
-    if new_docs:
-        vectorstore.add_documents(documents=new_docs)
-        vectorstore.persist()
+def _remember(qvec, scope: Optional[str], where: Optional[Dict], result: Dict) -> None:
+    if scope is None:
+        return
+    datasets = {s.get("dataset") for s in result.get("sources", [])}
+    datasets |= set(_filter_datasets(where))
+    answer_cache.put(qvec, scope, dict(result), datasets)
 
-    return {"message": f"{len(new_docs)} chunks updated from {len(all_docs)} documents"}
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 @app.post("/chat")
 def rag_chat(req: RagChatReq):
@@ -128,19 +200,23 @@ def rag_chat(req: RagChatReq):
     if not q:
         raise HTTPException(status_code=400, detail="Empty query")
 
+    where = _where(req)
     t0 = time.perf_counter()
     try:
         k = max(1, min(8, req.top_k or 6))
-        retriever = vectorstore.as_retriever(
-            search_kwargs={"k": k, "filter": req.filters}
-        )
-        
-        result = qa.answer(
-            query=q,
-            retriever=retriever,
-            llm=llm
-        )
-        
+
+        cached, qvec, scope = _cached_answer(q, k, where)
+        if cached is not None:
+            cached["latency_ms"] = int((time.perf_counter() - t0) * 1000)
+            return cached
+
+        def run() -> Dict:
+            res = _answer(q, k, where)
+            _remember(qvec, scope, where, res)  # 답변 캐시 저장도 leader 1번만
+            return res
+
+        result = _coalesced(q, k, where, run)
+
         latency_ms = int((time.perf_counter() - t0) * 1000)
         result["latency_ms"] = latency_ms
         return result
@@ -150,31 +226,102 @@ def rag_chat(req: RagChatReq):
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"RAG failed: {e}")
 
+@app.post("/chat/stream")
+def rag_chat_stream(req: RagChatReq):
+    """
+    /chat의 스트리밍 버전(Server-Sent Events)
+    - event: sources → 검색된 출처(검색 직후, LLM 호출 전)
+    - event: token   → 답변 토큰(LLM에서 도착하는 대로)
+    - event: done    → 전체 답변 + latency_ms / ttft_ms(첫 토큰까지)
+    - event: error   → 실패(이미 보낸 토큰은 partial)
+    캐시/FAQ 적중 시 sources → token(전체 답변 1회) → done(cached=true)
+    캐시 미스 시 같은 질의의 동시 스트림은 검색/LLM 호출 1번을 공유(늦게 온 호출자는 지금까지 토큰부터 재생)
+    """
+    q = (req.query or "").strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Empty query")
+
+    where = _where(req)
+    t0 = time.perf_counter()
+    k = max(1, min(8, req.top_k or 6))
+
+    def ms() -> int:
+        return int((time.perf_counter() - t0) * 1000)
+
+    def events():
+        try:
+            cached, qvec, scope = _cached_answer(q, k, where)
+            if cached is not None:
+                yield _sse("sources", {"sources": cached.get("sources", [])})
+                ttft_ms = ms()
+                yield _sse("token", {"text": cached.get("answer", "")})
+                done = {key: v for key, v in cached.items() if key != "sources"}
+                yield _sse("done", {**done, "latency_ms": ms(), "ttft_ms": ttft_ms})
+                return
+        except Exception as e:
+            yield _sse("error", {"detail": f"RAG failed: {e}"})
+            return
+
+        def produce():
+            # leader 1번만: 검색 → ("sources", ...) → ("token", ...)* → 답변 캐시 저장
+            docs = ActiveRetriever(k=k, where=where).invoke(q)
+            sources = qa.format_sources(docs)
+            yield "sources", sources
+            toks: List[str] = []
+            for tok in qa.stream_answer(q, docs, llm):
+                toks.append(tok)
+                yield "token", tok
+            _remember(qvec, scope, where,
+                      {"answer": "".join(toks).strip() or "답변을 생성할 수 없습니다.", "sources": sources})
+
+        sources, parts, ttft_ms = None, [], None
+        try:
+            for kind, val in _coalesced_stream(q, k, where, produce):
+                if kind == "sources":
+                    sources = val
+                    yield _sse("sources", {"sources": val, "retrieval_ms": ms()})
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = ms()
+                parts.append(val)
+                yield _sse("token", {"text": val})
+        except Exception as e:
+            if sources is None:
+                yield _sse("error", {"detail": f"RAG failed: {e}"})
+            else:
+                yield _sse("error", {"detail": f"LLM failed: {e}", "partial": "".join(parts)})
+            return
+
+        answer = "".join(parts).strip() or "답변을 생성할 수 없습니다."
+        yield _sse("done", {"answer": answer, "latency_ms": ms(), "ttft_ms": ttft_ms})
+
+    # 프록시(nginx 등)가 응답을 모아 보내지 않도록 버퍼링 해제
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/preview")
 def rag_preview(req: RagChatReq):
     """
     RAG 검색 결과 미리보기 (stt-tts-sample/app.py에서 가져옴)
     """
+    where = _where(req)
     try:
         k = max(1, min(20, req.top_k or 6))
-        retriever = vectorstore.as_retriever(
-            search_kwargs={"k": k, "filter": req.filters}
-        )
-        chunks = retriever.get_relevant_documents(req.query)
-        
+        chunks = retrieve(req.query, k=k, filters=where)
+
         return {"chunks": [
-            {"page": c.metadata.get("page"),
-             "source_type": c.metadata.get("source_type"),
-             "title": c.metadata.get("title"),
-             "dataset": c.metadata.get("dataset"),
-             "score": c.metadata.get("score", 0), # Langchain Document는 score를 직접 제공하지 않음
-             "text": c.page_content[:500]}
+            {"page": c["meta"].get("page"),
+             "source_type": c["meta"].get("source_type"),
+             "title": c["meta"].get("title"),
+             "dataset": c["meta"].get("dataset"),
+             "score": c["score"],
+             "text": (c["text"] or "")[:500]}
         for c in chunks]}
     except Exception as e:
         raise HTTPException(500, f"Preview failed: {e}")
 
 # ------------------------------
-# 5️⃣ Health & Debug Endpoints
+# 4️⃣ Health & Debug Endpoints
 # ------------------------------
 
 @app.get("/health")
@@ -216,6 +363,77 @@ def rag_debug_mongo():
         out["trace"] = traceback.format_exc(limit=3)
     return out
 
+@app.get("/debug/models")
+def rag_debug_models():
+    """
+    로드된 모델(레지스트리)별 로드 시간/상주 메모리 증가량, 프로세스 RSS 확인
+    """
+    return {"embedder": EMBEDDER_KEY, **model_stats()}
+
+@app.get("/debug/embed-cache")
+def rag_debug_embed_cache():
+    """
+    임베딩 캐시 hit/miss/항목 수 확인
+    """
+    return cache_stats()
+
+@app.get("/debug/query-cache")
+def rag_debug_query_cache():
+    """
+    질의 임베딩 LRU 캐시 hit rate/크기 확인
+    """
+    return query_cache_stats()
+
+@app.get("/debug/query-batcher")
+def rag_debug_query_batcher():
+    """
+    질의 임베딩 마이크로 배처 배치 크기 분포/큐 대기 시간 확인
+    """
+    return batcher_stats()
+
+@app.get("/debug/answer-cache")
+def rag_debug_answer_cache():
+    """
+    시맨틱 답변 캐시 hit rate/크기/무효화 수 확인
+    """
+    return answer_cache.stats()
+
+@app.post("/debug/answer-cache/invalidate")
+def rag_debug_answer_cache_invalidate(dataset: Optional[str] = None):
+    """
+    dataset을 출처로 쓴 캐시 답변 삭제(dataset 생략 시 전체)
+    """
+    return {"invalidated": answer_cache.invalidate(dataset), "dataset": dataset}
+
+@app.get("/debug/faq")
+def rag_debug_faq():
+    """
+    사전 계산 FAQ 답변 목록/hit rate/마지막 재계산 결과 확인
+    """
+    return faq_store.stats()
+
+@app.post("/debug/faq/rebuild")
+def rag_debug_faq_rebuild():
+    """
+    chat_logs 마이닝 + FAQ 답변 재계산 예약(백그라운드)
+    """
+    return {"scheduled": faq_store.schedule_rebuild()}
+
+@app.get("/debug/coalesce")
+def rag_debug_coalesce():
+    """
+    /rag/chat·/rag/chat/stream 동시 동일 질의 합치기(single-flight) 통계: upstream 호출 수/합쳐진 요청 비율
+    """
+    return {"enabled": config.RAG_COALESCE, **rag_flight.stats()}
+
+@app.get("/debug/np-index")
+def rag_debug_np_index():
+    """
+    NumPy 검색 인덱스(export본) 버전/행 수/파티션(dataset별 행 수) 확인
+    """
+    load_index()
+    return index_stats()
+
 @app.get("/debug/count")
 def rag_debug_count():
     """
@@ -223,7 +441,8 @@ def rag_debug_count():
     """
     try:
         cli = get_client(config.CHROMA_DIR)
-        col = get_collection(cli, name=config.COLLECTION_NAME)
-        return {"chroma_dir": config.CHROMA_DIR, "collection": config.COLLECTION_NAME, "count": col.count()}
+        name = active_collection_name()
+        col = get_collection(cli, name=name)
+        return {"chroma_dir": config.CHROMA_DIR, "collection": name, "count": col.count()}
     except Exception as e:
         return {"error": str(e)}
@@ -3,7 +3,13 @@
 # 목적
 # - 질의 전에 벡터 인덱스(Chroma)가 준비됐는지 확인
 # - (옵션) PDF/Mongo 변경 감지 후 필요한 경우에만 재인덱싱
-# - force=True로 강제 재인덱싱
+# - force=True로 강제 재인덱싱 (비활성 A/B 컬렉션에 재빌드 후 포인터 교체 → 무중단)
+# - manifest를 소스 단위로 비교해 바뀐 PDF/Mongo 컬렉션만 재인덱싱,
+#   사라진 소스는 청크 삭제
+# - on_reindex(fn): 재인덱싱(전체/증분) 완료 후 백그라운드로 fn(result) 호출
+#   (FAQ 답변 사전 계산 등 인덱스 버전에 묶인 산출물 갱신용)
+# - bump_dataset_versions(datasets): 이 모듈 밖에서 인덱스를 바꾼 경로(/ingest 등)도
+#   manifest의 dataset 버전을 올려 모든 워커의 답변 캐시/FAQ가 index_state()로 무효화되게 함
 #
 # 환경변수
 # - AUTO_INDEX_ON_QUERY=false  → 질의 시 자동 인덱싱 비활성화(권장)
@@ -12,15 +18,15 @@
 # ================================================================
 from __future__ import annotations
 
-import os, json, threading, glob, datetime
+import os, json, threading, glob, datetime, time
 from typing import Optional, List, Dict
 
 from .config import (
     DATA_DIR, PDF_GLOBS, CHROMA_DIR,
     MONGO_URI, MONGO_DB, MONGO_COLL, MONGO_UPDATED_FIELD,
 )
-from .ingest import ingest_all
-from .store import get_client, get_collection
+from .ingest import PDF_DATASET, rebuild_index, export_np_index, ingest_pdfs, ingest_mongo_all, purge_pdf, purge_mongo_collection
+from .store import get_client, get_collection, active_collection_name
 
 from pymongo import MongoClient
 
@@ -115,9 +121,83 @@ def _read_manifest() -> Optional[dict]:
         return None
 
 def _write_manifest(state: dict) -> None:
+    # 서빙 프로세스가 index_state()로 읽으므로 임시 파일 + os.replace로 원자적 교체
     os.makedirs(CHROMA_DIR, exist_ok=True)
-    with open(_MANIFEST_PATH, "w", encoding="utf-8") as f:
+    tmp = _MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, _MANIFEST_PATH)
+
+def _bump_versions(versions: Optional[Dict], datasets: List[str]) -> Dict[str, int]:
+    """datasets 버전을 현재 시각으로(같은 초에 다시 올려도 값이 반드시 바뀌도록 +1 보장)"""
+    out = dict(versions or {})
+    now = int(time.time())
+    for d in datasets:
+        out[d] = max(now, out.get(d, 0) + 1)
+    return out
+
+def bump_dataset_versions(datasets: List[str]) -> Dict[str, int]:
+    """
+    ensure_index_ready 밖에서 인덱스 내용을 바꾼 뒤 호출(/ingest 등).
+    manifest의 dataset_versions만 갱신 → 그 dataset을 출처로 쓴 답변 캐시/FAQ 항목이 모든 워커에서 무효.
+    반환: 갱신 후 dataset_versions
+    """
+    datasets = sorted({d for d in datasets if d})
+    with _LOCK:
+        manifest = _read_manifest() or {}
+        if not datasets:
+            return dict(manifest.get("dataset_versions") or {})
+        manifest["dataset_versions"] = _bump_versions(manifest.get("dataset_versions"), datasets)
+        _write_manifest(manifest)
+        return manifest["dataset_versions"]
+
+def _changed_datasets(plan: Dict[str, List[str]]) -> List[str]:
+    """증분 plan → 내용이 바뀐 dataset 메타 값(PDF는 PDF_DATASET, Mongo는 컬렉션명)"""
+    out = set(plan["mongo_changed"]) | set(plan["mongo_removed"])
+    if plan["pdf_changed"] or plan["pdf_removed"]:
+        out.add(PDF_DATASET)
+    return sorted(out)
+
+# ---------------- 재인덱싱 후 훅 ----------------
+_REINDEX_HOOKS: List = []
+
+def on_reindex(fn) -> None:
+    """재인덱싱 완료 후 호출할 콜백 등록(fn(result), 중복 등록 무시)"""
+    if fn not in _REINDEX_HOOKS:
+        _REINDEX_HOOKS.append(fn)
+
+def _run_hooks(result: dict) -> None:
+    def run():
+        for fn in list(_REINDEX_HOOKS):
+            try:
+                fn(result)
+            except Exception as e:
+                print(f"[auto_index][hook] {getattr(fn, '__name__', fn)}: {type(e).__name__}: {e}")
+    if _REINDEX_HOOKS:
+        threading.Thread(target=run, name="reindex-hooks", daemon=True).start()
+
+# ---------------- 인덱스 버전(답변 캐시 무효화용) ----------------
+_state_sig = None
+_state: Dict = {"built_at": 0, "datasets": {}}
+
+def index_state() -> Dict:
+    """
+    {"collection": 활성 컬렉션, "built_at": 전체 재빌드 시각, "datasets": {dataset: 마지막 증분 반영 시각}}
+    - 전체 재빌드 → 포인터(collection)와 built_at이 바뀜
+    - 증분 반영 → 바뀐 dataset의 버전만 바뀜
+    manifest는 stat이 바뀐 경우에만 다시 읽음(다른 프로세스의 인덱싱도 반영)
+    """
+    global _state_sig, _state
+    try:
+        st = os.stat(_MANIFEST_PATH)
+        sig = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        sig = None
+    if sig != _state_sig:
+        manifest = _read_manifest() or {}
+        _state = {"built_at": manifest.get("built_at", 0), "datasets": dict(manifest.get("dataset_versions") or {})}
+        _state_sig = sig
+    return {"collection": active_collection_name(), **_state}
 
 # ---------------- 인덱스 유무 ----------------
 def _collection_has_data() -> bool:
@@ -128,32 +208,135 @@ def _collection_has_data() -> bool:
     except Exception:
         return False
 
+# ---------------- 소스 단위 diff ----------------
+def _diff_manifest(manifest: dict, current: dict, mongo_complete: bool) -> Dict[str, List[str]]:
+    """
+    이전/현재 manifest를 소스 단위로 비교
+    - PDF: path별 size/mtime
+    - Mongo: 컬렉션별 최신 타임스탬프
+    mongo_complete=False(조회 실패/샘플링)면 맵에 없는 컬렉션을 삭제로 보지 않음
+    """
+    old_pdf = {f["path"]: f for f in manifest.get("pdf") or []}
+    new_pdf = {f["path"]: f for f in current["pdf"]}
+    old_mongo = manifest.get("mongo_latest") or {}
+    new_mongo = current["mongo_latest"]
+    return {
+        "pdf_changed": [p for p, f in new_pdf.items() if old_pdf.get(p) != f],
+        "pdf_removed": [p for p in old_pdf if p not in new_pdf],
+        "mongo_changed": [c for c, ts in new_mongo.items() if old_mongo.get(c) != ts],
+        "mongo_removed": [c for c in old_mongo if c not in new_mongo] if mongo_complete else [],
+    }
+
+def _failed_mongo(plan: Dict[str, List[str]], applied: dict) -> List[str]:
+    """Mongo 증분 반영이 실패했으면 이번 plan의 변경 컬렉션 전체(어디까지 반영됐는지 알 수 없음)"""
+    if "mongo_error" in (applied["result"].get("mongo") or {}):
+        return list(plan["mongo_changed"])
+    return []
+
+def _apply_plan(plan: Dict[str, List[str]]) -> dict:
+    """plan대로 재인덱싱/삭제하고 소스별 소요 시간(ms) 기록"""
+    timing: Dict[str, int] = {}
+    result: dict = {}
+
+    if plan["pdf_changed"]:
+        result["pdf"] = ingest_pdfs(plan["pdf_changed"])
+        for r in result["pdf"]["pdf_results"]:
+            timing[f"pdf::{os.path.abspath(r['path'])}"] = r.get("ms", 0)
+
+    if plan["mongo_changed"]:
+        try:
+            result["mongo"] = ingest_mongo_all(collections=plan["mongo_changed"])
+            for r in result["mongo"]["mongo_collections"]:
+                timing[f"mongo::{r['collection']}"] = r.get("ms", 0)
+        except Exception as e:
+            result["mongo"] = {"mongo_error": str(e)}
+
+    for p in plan["pdf_removed"]:
+        t0 = time.perf_counter()
+        purge_pdf(p)
+        timing[f"purge::pdf::{p}"] = int((time.perf_counter() - t0) * 1000)
+    for c in plan["mongo_removed"]:
+        t0 = time.perf_counter()
+        purge_mongo_collection(c)
+        timing[f"purge::mongo::{c}"] = int((time.perf_counter() - t0) * 1000)
+
+    # 증분 반영 후 NumPy 검색 인덱스도 활성 컬렉션 기준으로 다시 export
+    t0 = time.perf_counter()
+    np_res = export_np_index()
+    if np_res is not None:
+        result["np_index"] = np_res
+        timing["np_index"] = int((time.perf_counter() - t0) * 1000)
+
+    return {"result": result, "timing_ms": timing}
+
 # ---------------- 퍼블릭 API ----------------
 def ensure_index_ready(force: bool = False) -> dict:
     """
-    force=True  → 강제 재인덱싱
-    force=False → (옵션) 변경 감지 후 필요 시 재인덱싱
+    force=True  → 강제 재인덱싱(전체)
+    force=False → (옵션) 변경 감지 후 바뀐 소스만 재인덱싱
     AUTO_INDEX_ON_QUERY=false이면 질의 시점 자동 인덱싱은 하지 않음
     """
     if not AUTO_INDEX_ON_QUERY and not force:
         return {"indexed": False, "reason": "disabled_on_query"}
 
     with _LOCK:
+        t0 = time.perf_counter()
         pdf_fp = _pdf_fingerprint()
-        mongo_map = _mongo_latest_map(0 if force else SAMPLE_LIMIT)
+        sample = 0 if force else SAMPLE_LIMIT
+        mongo_map = _mongo_latest_map(sample)
         manifest = _read_manifest()
         populated = _collection_has_data()
 
         current = {"pdf": pdf_fp, "mongo_latest": mongo_map}
-        fresh = populated and (manifest == current)
 
-        if force or not fresh:
-            res = ingest_all()
-            _write_manifest(current)
-            return {
-                "indexed": True,
+        # dataset_versions만 있는 manifest(bump_dataset_versions가 먼저 기록)도 소스 기록이 없으므로 재빌드
+        if force or not populated or not manifest or "pdf" not in manifest:
+            # 전체 재빌드는 비활성 컬렉션에서 진행, 질의는 교체 전까지 기존 컬렉션 사용
+            res = rebuild_index()
+            out = {
+                "indexed": res["swapped"],
                 "reason": "forced" if force else "stale_or_missing",
                 "result": res,
+                "total_ms": int((time.perf_counter() - t0) * 1000),
             }
-        else:
+            if res["swapped"]:
+                current["built_at"] = int(time.time())
+                _write_manifest(current)
+                _run_hooks(out)
+            return out
+
+        mongo_complete = bool(mongo_map) and sample == 0
+        plan = _diff_manifest(manifest, current, mongo_complete)
+        if not any(plan.values()):
             return {"indexed": False, "reason": "up_to_date"}
+
+        applied = _apply_plan(plan)
+
+        # 샘플링/조회 실패로 확인 못 한 컬렉션은 이전 값 유지
+        old_latest = manifest.get("mongo_latest") or {}
+        if not mongo_complete:
+            current["mongo_latest"] = {**old_latest, **mongo_map}
+        # 인덱싱에 실패한 컬렉션도 이전 값 유지 → 다음 호출에서 다시 변경으로 감지돼 재시도
+        failed = _failed_mongo(plan, applied)
+        latest = dict(current["mongo_latest"])
+        for c in failed:
+            if c in old_latest:
+                latest[c] = old_latest[c]
+            else:
+                latest.pop(c, None)
+        current["mongo_latest"] = latest
+        # 바뀐 dataset만 버전 갱신 → 해당 dataset 답변 캐시만 무효화(반영 실패한 컬렉션 제외)
+        current["built_at"] = manifest.get("built_at", 0)
+        current["dataset_versions"] = _bump_versions(manifest.get("dataset_versions"),
+                                                     [d for d in _changed_datasets(plan) if d not in failed])
+        _write_manifest(current)
+        out = {
+            "indexed": True,
+            "reason": "incremental",
+            "plan": plan,
+            "failed": failed,
+            **applied,
+            "total_ms": int((time.perf_counter() - t0) * 1000),
+        }
+        _run_hooks(out)
+        return out
@@ -0,0 +1,49 @@
+# ai/rag/bench_chunker.py
+# ================================================================
+# 역할
+# - data/docs PDF에 대해 기존 문자 기준 청크(CHUNK_SIZE/CHUNK_OVERLAP)가
+#   임베더 입력 한도(토큰)를 넘어 잘렸을 청크 수를 집계
+# - 토큰 기준 청커의 청크 수/소요 시간과 비교
+#
+# 실행:
+#   cd ai
+#   python -m rag.bench_chunker
+# ================================================================
+import glob, os, sys, time
+
+from .config import DATA_DIR, PDF_GLOBS
+from .ingest import extract_pages, split_paragraphs, to_chunks_chars, token_chunker
+
+
+if __name__ == "__main__":
+    paths = []
+    for pat in PDF_GLOBS:
+        paths.extend(glob.glob(os.path.join(DATA_DIR, pat)))
+    paths = sorted(set(paths))
+    if not paths:
+        sys.exit(f"PDF 없음: {DATA_DIR}")
+
+    chunker = token_chunker()
+    if chunker is None:
+        sys.exit("fast tokenizer를 불러올 수 없어 토큰 청커를 사용할 수 없습니다.")
+
+    total = {"legacy_chunks": 0, "legacy_truncated": 0, "legacy_max_tokens": 0, "token_chunks": 0}
+    t_char = t_tok = 0.0
+    for p in paths:
+        for page in extract_pages(p):
+            if not page:
+                continue
+            paras = split_paragraphs(page)
+            rep = chunker.legacy_report(paras, to_chunks_chars)
+            for k in ("legacy_chunks", "legacy_truncated", "token_chunks"):
+                total[k] += rep[k]
+            total["legacy_max_tokens"] = max(total["legacy_max_tokens"], rep["legacy_max_tokens"])
+
+            t0 = time.perf_counter(); to_chunks_chars(paras); t_char += time.perf_counter() - t0
+            t0 = time.perf_counter(); chunker.chunk(paras);   t_tok  += time.perf_counter() - t0
+
+    limit = chunker.model_limit - chunker.reserve
+    print(f"files={len(paths)} token_limit={limit} (model={chunker.model_limit}, reserve={chunker.reserve})")
+    print(f"legacy(char) chunks : {total['legacy_chunks']}  truncated={total['legacy_truncated']}  "
+          f"max_tokens={total['legacy_max_tokens']}  ({t_char * 1000:.1f} ms)")
+    print(f"token chunks        : {total['token_chunks']}  ({t_tok * 1000:.1f} ms)")
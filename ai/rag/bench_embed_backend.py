@@ -0,0 +1,62 @@
+# ai/rag/bench_embed_backend.py
+# ================================================================
+# 역할
+# - PyTorch 임베더와 int8 양자화 ONNX 임베더의
+#   1) 코사인 일치도(parity): 같은 query:/passage: 입력에 대한 벡터 비교
+#   2) 쿼리 1건 임베딩 지연(ms) 비교
+# - 최소 코사인이 기준치 미만이면 종료 코드 1
+#
+# 실행:
+#   cd ai
+#   python -m rag.bench_embed_backend [최소코사인=0.98] [반복=50]
+# ================================================================
+import sys, time
+
+from .ingest import load_embedder, embed_parity, EMBEDDER_MODEL, EMBED_ONNX_QCONFIG
+
+QUERIES = [
+    "휴학 신청 기간",
+    "재학연기 조건 알려줘",
+    "시험 일정 언제야?",
+    "장학금 신청 자격이 어떻게 되나요",
+    "수강신청 정정 기간",
+    "졸업 요건 학점",
+]
+PASSAGES = [
+    "제1조(목적) 이 학칙은 동양미래대학교의 학사 운영에 관한 사항을 규정함을 목적으로 한다.",
+    "휴학을 원하는 학생은 소정의 기간 내에 휴학원을 제출하여 총장의 허가를 받아야 한다.",
+    "성적 평가는 중간고사, 기말고사, 과제 및 출석 등을 종합하여 평가한다.",
+    "장학금 신청 기간: 매 학기 개강 전 2주 | 대상: 직전 학기 12학점 이상 이수자",
+]
+
+
+def _encode(model, texts):
+    return model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+
+def _latency_ms(model, repeat: int) -> float:
+    _encode(model, [f"query: {QUERIES[0]}"])  # 웜업
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        _encode(model, [f"query: {QUERIES[i % len(QUERIES)]}"])
+    return (time.perf_counter() - t0) * 1000 / repeat
+
+
+if __name__ == "__main__":
+    min_cos = float(sys.argv[1]) if len(sys.argv) > 1 else 0.98
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    torch_model = load_embedder("torch")
+    onnx_model = load_embedder("onnx")
+
+    texts = [f"query: {q}" for q in QUERIES] + [f"passage: {p}" for p in PASSAGES]
+    cos = embed_parity(torch_model, onnx_model, texts)
+
+    print(f"model={EMBEDDER_MODEL} onnx_qconfig={EMBED_ONNX_QCONFIG}")
+    print(f"parity cosine   : min={cos.min():.4f} mean={cos.mean():.4f} (n={len(texts)})")
+    print(f"query latency   : torch={_latency_ms(torch_model, repeat):.2f} ms  "
+          f"onnx-int8={_latency_ms(onnx_model, repeat):.2f} ms  (repeat={repeat})")
+
+    if cos.min() < min_cos:
+        sys.exit(f"FAIL: min cosine {cos.min():.4f} < {min_cos}")
+    print("OK")
@@ -0,0 +1,57 @@
+# ai/rag/bench_models.py
+# ================================================================
+# 역할
+# - 한 프로세스가 임베더를 들고 있을 때 상주 메모리(RSS)/로드 시간 비교
+#   1) legacy: app.py의 HuggingFaceEmbeddings(EMBEDDING_MODEL_NAME)
+#              + ingest.embedder()(EMBEDDER_MODEL) + retriever._embedder() 사본
+#   2) shared: rag.models 레지스트리 → ingest/retriever/app이 embedder() 1개 공유
+# - 구성마다 새 프로세스(spawn)에서 측정 → 서로의 메모리에 영향 없음
+#
+# 실행:
+#   cd ai
+#   python -m rag.bench_models [legacy 모델명=jhgan/ko-sroberta-multitask]
+# ================================================================
+import sys, time
+import multiprocessing as mp
+
+LEGACY_APP_MODEL = "jhgan/ko-sroberta-multitask"
+
+
+def _legacy(app_model: str, out):
+    from sentence_transformers import SentenceTransformer
+    from .models import rss_bytes
+    from .ingest import EMBEDDER_MODEL
+    rss0, t0 = rss_bytes(), time.perf_counter()
+    models = [
+        SentenceTransformer(app_model),       # app.py HuggingFaceEmbeddings 내부 모델
+        SentenceTransformer(EMBEDDER_MODEL),  # ingest.embedder()
+        SentenceTransformer(EMBEDDER_MODEL),  # retriever._embedder()
+    ]
+    for m in models:
+        m.encode(["query: 웜업"])
+    out.put(("legacy", len(models), rss_bytes() - rss0, time.perf_counter() - t0))
+
+
+def _shared(_app_model: str, out):
+    from .models import rss_bytes
+    from .ingest import embedder
+    from .retriever import encode_query
+    rss0, t0 = rss_bytes(), time.perf_counter()
+    embedder()               # ingest
+    encode_query("웜업")      # retriever / app(/rag/chat·FAQ)
+    out.put(("shared", 1, rss_bytes() - rss0, time.perf_counter() - t0))
+
+
+if __name__ == "__main__":
+    app_model = sys.argv[1] if len(sys.argv) > 1 else LEGACY_APP_MODEL
+    ctx = mp.get_context("spawn")
+    rows = {}
+    for fn in (_legacy, _shared):
+        q = ctx.Queue()
+        p = ctx.Process(target=fn, args=(app_model, q))
+        p.start()
+        label, n, rss, secs = q.get()
+        p.join()
+        rows[label] = rss
+        print(f"{label:7s}: models={n}  rss +{rss / 2**20:7.1f} MB  load={secs:5.1f} s")
+    print(f"saved  : {(rows['legacy'] - rows['shared']) / 2**20:.1f} MB per process")
@@ -0,0 +1,84 @@
+# ai/rag/bench_np_index.py
+# ================================================================
+# 역할
+# - 실제 활성 컬렉션에서 검색 엔진 비교: Chroma(HNSW) vs NumPy mmap brute-force(np_index)
+#   1) 질의 1건 top-k 지연(ms)
+#   2) recall@k: float32 전체 정확 검색(정답) 대비 각 엔진 결과 일치율
+# - 질의: 예시 질문 + 저장된 청크 벡터 일부(자기 자신 제외 근방 검색)
+# - export본이 없거나 오래됐으면 먼저 export_index() 실행
+#
+# 실행:
+#   cd ai
+#   python -m rag.bench_np_index [k=6] [샘플 질의 수=200] [where JSON(선택)]
+#   예) python -m rag.bench_np_index 6 200 "{\"dataset\": \"규정집\"}"
+# ================================================================
+import json, sys, time
+
+import numpy as np
+
+from .config import CHROMA_DIR
+from .store import get_client, get_collection, active_collection_name
+from .np_index import export_index, load_index
+from .retriever import encode_queries
+
+QUERIES = [
+    "휴학 신청 기간", "재학연기 조건 알려줘", "시험 일정 언제야?", "장학금 신청 자격이 어떻게 되나요",
+    "수강신청 정정 기간", "졸업 요건 학점", "복학 신청 방법", "성적 이의신청 절차",
+]
+
+
+def _exact(all_vecs: np.ndarray, mask, q: np.ndarray, k: int):
+    sims = all_vecs @ q.T
+    if mask is not None:
+        sims[~mask] = -np.inf
+    return [set(np.argsort(-sims[:, b], kind="stable")[:k].tolist()) for b in range(q.shape[0])]
+
+
+if __name__ == "__main__":
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    n_sample = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    where = json.loads(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    name = active_collection_name()
+    col = get_collection(get_client(CHROMA_DIR), name=name)
+    idx = load_index(name)
+    if idx is None or len(idx) != col.count():
+        export_index(name)
+        idx = load_index(name)
+    print(f"collection={name} n={len(idx)} dtype={idx.info['dtype']} search_dtype={idx.vectors.dtype} k={k} where={where}")
+
+    # 정답: float32 원본으로 정확 검색(np_index 행 순서 기준)
+    vec_of = {}
+    for off in range(0, col.count(), 5000):
+        got = col.get(include=["embeddings"], limit=5000, offset=off)
+        vec_of.update(zip(got["ids"], np.asarray(got["embeddings"], dtype=np.float32)))
+    full = np.vstack([vec_of[str(i)] for i in idx.ids])
+    full /= np.maximum(np.linalg.norm(full, axis=1, keepdims=True), 1e-12)
+    mask = idx.mask(where)
+
+    rng = np.random.default_rng(0)
+    sample = full[rng.choice(len(full), size=min(n_sample, len(full)), replace=False)]
+    q = np.vstack([encode_queries(QUERIES), sample]).astype(np.float32)
+    truth = _exact(full, mask, q, k)
+    row_of = {str(cid): i for i, cid in enumerate(idx.ids)}
+
+    # Chroma
+    col.query(query_embeddings=[q[0].tolist()], n_results=k, where=where)  # 웜업
+    t0 = time.perf_counter()
+    chroma_hits = []
+    for v in q:
+        res = col.query(query_embeddings=[v.tolist()], n_results=k, where=where, include=[])
+        chroma_hits.append({row_of[c] for c in res["ids"][0]})
+    chroma_ms = (time.perf_counter() - t0) * 1000 / len(q)
+
+    # NumPy
+    idx.search(q[:1], k, where)  # 웜업
+    t0 = time.perf_counter()
+    np_hits = [{i for i, _ in idx.search(v[None, :], k, where)[0]} for v in q]
+    np_ms = (time.perf_counter() - t0) * 1000 / len(q)
+
+    def recall(hits):
+        return float(np.mean([len(h & t) / max(1, len(t)) for h, t in zip(hits, truth)]))
+
+    print(f"chroma (HNSW)   : {chroma_ms:.3f} ms/query  recall@{k}={recall(chroma_hits):.4f}")
+    print(f"numpy (mmap)    : {np_ms:.3f} ms/query  recall@{k}={recall(np_hits):.4f}  x{chroma_ms / np_ms:.1f}")
@@ -0,0 +1,52 @@
+# ai/rag/bench_pdf_extract.py
+# ================================================================
+# 역할
+# - data/docs PDF로 기존 2패스 추출(PyMuPDF + 전 페이지 pdfplumber)과
+#   단일 패스 추출(extract_pages)의 페이지당 소요 시간을 비교
+#
+# 실행:
+#   cd ai
+#   python -m rag.bench_pdf_extract [반복횟수]
+# ================================================================
+import glob, os, sys, time
+
+from .config import DATA_DIR, PDF_GLOBS
+from .ingest import extract_text_pages, extract_tables_as_lines, extract_pages
+
+
+def _two_pass(path: str) -> int:
+    text_pages = extract_text_pages(path)
+    table_pages = extract_tables_as_lines(path)
+    return max(len(text_pages), len(table_pages))
+
+
+def _single_pass(path: str) -> int:
+    return len(extract_pages(path))
+
+
+def _bench(fn, paths, repeat: int) -> float:
+    """전체 PDF에 대한 페이지당 평균 ms"""
+    pages, t0 = 0, time.perf_counter()
+    for _ in range(repeat):
+        for p in paths:
+            pages += fn(p)
+    elapsed = time.perf_counter() - t0
+    return (elapsed * 1000 / pages) if pages else 0.0
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    paths = []
+    for pat in PDF_GLOBS:
+        paths.extend(glob.glob(os.path.join(DATA_DIR, pat)))
+    paths = sorted(set(paths))
+    if not paths:
+        sys.exit(f"PDF 없음: {DATA_DIR}")
+
+    before = _bench(_two_pass, paths, repeat)
+    after = _bench(_single_pass, paths, repeat)
+    print(f"files={len(paths)} repeat={repeat}")
+    print(f"before (2-pass) : {before:8.2f} ms/page")
+    print(f"after  (1-pass) : {after:8.2f} ms/page")
+    if after:
+        print(f"speedup         : {before / after:8.2f}x")
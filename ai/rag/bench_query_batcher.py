@@ -0,0 +1,52 @@
+# ai/rag/bench_query_batcher.py
+# ================================================================
+# 역할
+# - 동시 요청 N개가 각자 질의 1건을 임베딩할 때 처리량/지연 비교
+#   1) 요청마다 model.encode(배치 1)
+#   2) 마이크로 배처(QUERY_BATCH_MAX / QUERY_BATCH_WAIT_MS)로 모아서 encode
+# - 배처의 배치 크기 분포와 추가된 큐 대기 시간 출력
+#
+# 실행:
+#   cd ai
+#   python -m rag.bench_query_batcher [동시 요청 수=16] [요청당 질의 수=20]
+# ================================================================
+import sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .microbatch import MicroBatcher
+from .retriever import _model_encode
+
+BASE = ["휴학 신청 기간", "재학연기 조건", "시험 일정", "장학금 자격", "수강신청 정정", "졸업 요건"]
+
+
+def _run(encode_one, clients: int, per_client: int):
+    def client(c):
+        lat = []
+        for i in range(per_client):
+            t0 = time.perf_counter()
+            encode_one(f"query: {BASE[i % len(BASE)]} {c}-{i}")  # 질의마다 다른 텍스트
+            lat.append((time.perf_counter() - t0) * 1000)
+        return lat
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(clients) as ex:
+        lats = [x for lat in ex.map(client, range(clients)) for x in lat]
+    total_s = time.perf_counter() - t0
+    return len(lats) / total_s, float(np.percentile(lats, 50)), float(np.percentile(lats, 95))
+
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    _model_encode(["query: 웜업"])
+    batcher = MicroBatcher(_model_encode, name="bench")
+
+    for label, fn in (("direct", lambda t: _model_encode([t])[0]), ("batched", batcher.submit)):
+        qps, p50, p95 = _run(fn, clients, per_client)
+        print(f"{label:8s}: {qps:7.1f} q/s  p50={p50:.1f} ms  p95={p95:.1f} ms  (clients={clients})")
+    st = batcher.stats()
+    print(f"avg_batch={st['avg_batch']} hist={st['batch_size_hist']}")
+    print(f"queue_delay_ms={st['queue_delay_ms']}")
@@ -0,0 +1,64 @@
+# ai/rag/bench_retrieve_many.py
+# ================================================================
+# 역할
+# - 질의 N건 검색 비용 비교
+#   1) retrieve() N번 (질의마다 encode 1회 + col.query 1회)
+#   2) retrieve_many() 1번 (배치 encode 1회 + 다중 임베딩 col.query 1회)
+# - 캐시 효과를 빼기 위해 임베딩 캐시/질의 캐시를 끄고 측정
+# - 두 방식의 결과(청크 id 순서)가 같은지도 확인
+#
+# 실행:
+#   cd ai
+#   python -m rag.bench_retrieve_many [k=6] [반복=3]
+# ================================================================
+import os, sys, time
+
+os.environ["EMBED_CACHE"] = "false"
+os.environ["QUERY_CACHE_SIZE"] = "0"
+
+from .retriever import retrieve, retrieve_many, embedder
+
+QUERIES = [
+    "휴학 신청 기간",
+    "재학연기 조건 알려줘",
+    "시험 일정 언제야?",
+    "장학금 신청 자격이 어떻게 되나요",
+    "수강신청 정정 기간",
+    "졸업 요건 학점",
+    "복학 신청 방법",
+    "성적 이의신청 절차",
+    "기숙사 입사 신청",
+    "학점 포기 제도",
+    "계절학기 수강료",
+    "전과 신청 자격",
+]
+
+
+def _best_ms(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best
+
+
+if __name__ == "__main__":
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    embedder()
+    retrieve(QUERIES[0], k=k)  # 웜업(모델/핸들 로드)
+
+    loop_ms = _best_ms(lambda: [retrieve(q, k=k) for q in QUERIES], repeat)
+    batch_ms = _best_ms(lambda: retrieve_many(QUERIES, k=k), repeat)
+
+    one = [[c["id"] for c in retrieve(q, k=k)] for q in QUERIES]
+    many = [[c["id"] for c in r] for r in retrieve_many(QUERIES, k=k)]
+    same = sum(1 for a, b in zip(one, many) if a == b)
+
+    n = len(QUERIES)
+    print(f"queries={n} k={k} (best of {repeat})")
+    print(f"retrieve() x{n}   : {loop_ms:.1f} ms  ({loop_ms / n:.2f} ms/query)")
+    print(f"retrieve_many()  : {batch_ms:.1f} ms  ({batch_ms / n:.2f} ms/query)  x{loop_ms / batch_ms:.2f}")
+    print(f"same top-k ids   : {same}/{n}")
@@ -0,0 +1,61 @@
+# ai/rag/bench_store_handles.py
+# ================================================================
+# 역할
+# - 질의 1건마다 드는 Chroma 핸들 준비 비용 비교
+#   1) 기존 방식: chromadb.Client 생성 + get_collection (매 호출)
+#   2) store 핸들 캐시: get_client() + get_collection() (캐시 hit)
+# - 실제 검색(col.query) 1건 지연도 함께 출력해 비중을 비교
+#
+# 실행:
+#   cd ai
+#   python -m rag.bench_store_handles [반복=200]
+# ================================================================
+import sys, time
+
+import chromadb
+
+from .config import CHROMA_DIR
+from .store import get_client, get_collection, active_collection_name
+
+
+def _uncached(name: str):
+    client = chromadb.Client(chromadb.config.Settings(is_persistent=True, persist_directory=CHROMA_DIR))
+    try:
+        return client.get_collection(name=name)
+    except Exception:
+        return client.create_collection(name=name)
+
+
+def _cached(_: str):
+    return get_collection(get_client(CHROMA_DIR))
+
+
+def _per_call_ms(fn, name: str, repeat: int) -> float:
+    fn(name)  # 웜업
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(name)
+    return (time.perf_counter() - t0) * 1000 / repeat
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    name = active_collection_name()
+
+    old = _per_call_ms(_uncached, name, repeat)
+    new = _per_call_ms(_cached, name, repeat)
+
+    col = _cached(name)
+    query_ms = None
+    if col.count():
+        row = col.get(limit=1, include=["embeddings"])
+        qvec = list(row["embeddings"][0])
+        t0 = time.perf_counter()
+        for _ in range(20):
+            col.query(query_embeddings=[qvec], n_results=6)
+        query_ms = (time.perf_counter() - t0) * 1000 / 20
+
+    print(f"chroma_dir={CHROMA_DIR} collection={name} (repeat={repeat})")
+    print(f"handle per query : uncached={old:.3f} ms  cached={new:.4f} ms  saved={old - new:.3f} ms")
+    if query_ms is not None:
+        print(f"col.query (k=6)  : {query_ms:.2f} ms  → 기존 핸들 비용 비중 {old / (old + query_ms) * 100:.1f}%")
@@ -0,0 +1,108 @@
+# ai/rag/chunker.py
+# ================================================================
+# 역할
+# - 임베더 토크나이저 기준(토큰 수)으로 문단을 청크에 채워 넣는 청커
+#   · 문단마다 1회만 토크나이즈(offset 포함) → 전체 선형 시간
+#   · 토큰 예산을 넘는 문단은 토큰 경계(offset)에서 잘라 분할
+#   · 이전 청크 끝 overlap 토큰을 다음 청크 앞에 붙임
+#   · 문자열은 청크마다 한 번만 join (반복 concat 없음)
+# - 기존 문자 기준 청크가 모델 입력 한도를 넘어 잘리는지 점검(over_limit / legacy_report)
+# ================================================================
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Tuple
+
+# 토크나이저 model_max_length가 비정상적으로 큰 값(미설정)일 때 사용할 한도
+_DEFAULT_MAX_LEN = 512
+
+_Piece = Tuple[str, List[Tuple[int, int]]]  # (텍스트, 토큰 offset 목록)
+
+
+class TokenChunker:
+    def __init__(self, tokenizer, max_tokens: int = 0, overlap_tokens: int = 0, prefix: str = "passage: "):
+        """
+        max_tokens=0 → 모델 입력 한도 - (프리픽스 + special 토큰)
+        overlap_tokens → 다음 청크 앞에 붙일 이전 청크 꼬리 토큰 수
+        """
+        self.tok = tokenizer
+        limit = getattr(tokenizer, "model_max_length", _DEFAULT_MAX_LEN) or _DEFAULT_MAX_LEN
+        if limit > 100_000:
+            limit = _DEFAULT_MAX_LEN
+        self.model_limit = limit
+        self.reserve = len(tokenizer(prefix, add_special_tokens=False)["input_ids"]) + \
+            tokenizer.num_special_tokens_to_add(pair=False)
+        self.max_tokens = min(max_tokens or limit, limit) - self.reserve
+        self.overlap = max(0, min(overlap_tokens, self.max_tokens // 2))
+
+    # ---- 토큰 수 ----
+    def count(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        enc = self.tok(texts, add_special_tokens=False)
+        return [len(ids) for ids in enc["input_ids"]]
+
+    def over_limit(self, chunks: List[str]) -> int:
+        """모델 입력 한도(프리픽스 + special 토큰 제외)를 넘어 임베딩 시 잘리는 청크 수"""
+        limit = self.model_limit - self.reserve
+        return sum(1 for c in self.count(chunks) if c > limit)
+
+    # ---- 청크 ----
+    def _pieces(self, paras: List[str], budget: int) -> List[_Piece]:
+        """문단 → 예산 이하 조각 목록(긴 문단은 토큰 경계에서 분할)"""
+        enc = self.tok(paras, add_special_tokens=False, return_offsets_mapping=True)
+        out: List[_Piece] = []
+        for para, offs in zip(paras, enc["offset_mapping"]):
+            offs = [tuple(o) for o in offs]
+            if not offs:
+                continue
+            if len(offs) <= budget:
+                out.append((para, offs))
+                continue
+            for s in range(0, len(offs), budget):
+                part = offs[s:s + budget]
+                c0, c1 = part[0][0], part[-1][1]
+                out.append((para[c0:c1], [(a - c0, b - c0) for a, b in part]))
+        return out
+
+    def chunk(self, paras: List[str]) -> List[str]:
+        paras = [p for p in paras if p and p.strip()]
+        if not paras:
+            return []
+        # 본문 예산: overlap(+구분 줄바꿈) 자리를 비워 둠, 조각 사이 줄바꿈은 1토큰으로 계산
+        budget = max(1, self.max_tokens - self.overlap - (1 if self.overlap else 0))
+        chunks: List[str] = []
+        cur: List[_Piece] = []
+        cur_tokens = 0
+        tail = ""
+
+        def flush():
+            nonlocal tail
+            body = "\n".join(p[0] for p in cur)
+            chunks.append(f"{tail}\n{body}" if tail else body)
+            if self.overlap:
+                text, offs = cur[-1]
+                tail = text[offs[max(0, len(offs) - self.overlap)][0]:].strip()
+
+        for piece in self._pieces(paras, budget):
+            n = len(piece[1]) + (1 if cur else 0)
+            if cur and cur_tokens + n > budget:
+                flush()
+                cur, cur_tokens = [], 0
+                n = len(piece[1])
+            cur.append(piece)
+            cur_tokens += n
+        if cur:
+            flush()
+        return chunks
+
+    # ---- 기존 문자 기준 청크 점검 ----
+    def legacy_report(self, paras: List[str], legacy_chunker: Callable[[List[str]], List[str]]) -> Dict:
+        """기존 청커 결과 중 모델 입력 한도를 넘어 잘렸을 청크 수"""
+        old = legacy_chunker(paras)
+        counts = self.count(old)
+        return {
+            "legacy_chunks": len(old),
+            "legacy_truncated": self.over_limit(old),
+            "legacy_max_tokens": max(counts) if counts else 0,
+            "token_chunks": len(self.chunk(paras)),
+        }
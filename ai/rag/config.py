@@ -27,8 +27,6 @@ MONGO_UPDATED_FIELD = os.getenv("MONGO_UPDATED_FIELD", "updated_at")
 
 # --- Chroma 벡터DB ---
 CHROMA_DIR = os.getenv("CHROMA_DIR", str(BASE_DIR / "rag" / "chroma_db"))
-COLLECTION_NAME = os.getenv("COLLECTION_NAME", "school_corpus")
-EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "jhgan/ko-sroberta-multitask")
 
 # --- 청크/검색 파라미터 ---
 def _getint(k, d): 
@@ -37,7 +35,19 @@ def _getint(k, d):
 
 CHUNK_SIZE = _getint("CHUNK_SIZE", 1200)
 CHUNK_OVERLAP = _getint("CHUNK_OVERLAP", 200)
+# 토큰 기준 청크(임베더 토크나이저): CHUNK_MODE=token|char, CHUNK_TOKENS=0이면 모델 입력 한도
+CHUNK_MODE = os.getenv("CHUNK_MODE", "token").lower()
+CHUNK_TOKENS = _getint("CHUNK_TOKENS", 0)
+CHUNK_OVERLAP_TOKENS = _getint("CHUNK_OVERLAP_TOKENS", 48)
 TOP_K = _getint("TOP_K", 6)
+# 검색 엔진: chroma(HNSW) | numpy(export된 mmap 행렬 brute-force, np_index.py)
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "chroma").lower()
+# 필터가 dataset(파티션 키)을 고정하면 SEARCH_ENGINE과 무관하게 NumPy 파티션(작은 전용 구간)에서 검색
+# (export본은 일부 인덱싱 경로에서만 갱신되므로 기본 off → Chroma 결과와 어긋날 수 있음을 감수할 때만 켬)
+PARTITION_SEARCH = os.getenv("PARTITION_SEARCH", "false").lower() == "true"
+# /rag/chat·/rag/chat/stream: 같은 질의(정규화) + top_k/필터 + 인덱스 버전의 동시 요청은 검색/LLM 호출 1번으로 합침
+RAG_COALESCE = os.getenv("RAG_COALESCE", "true").lower() == "true"
+RAG_COALESCE_GRACE_S = float(os.getenv("RAG_COALESCE_GRACE_S", "2"))
 FINAL_K = _getint("FINAL_K", 3)
 
 # 활성 컬렉션 이름이 들어있는 “포인터 파일”
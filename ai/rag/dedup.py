@@ -0,0 +1,78 @@
+# ai/rag/dedup.py
+# ================================================================
+# 역할
+# - MinHash + LSH(banding) 기반 근사 중복 청크 탐지
+#   · 문자 n-gram shingle(한국어 친화) → crc32 → 유니버설 해시 num_perm개로 서명
+#   · 서명을 bands개 구간으로 나눠 버킷팅 → 후보만 추정 Jaccard로 확인
+# - 인덱싱 1회(ingest_mongo_all 호출) 범위에서 먼저 본 청크를 대표(canonical)로 유지
+# - 같은 파라미터(threshold 제외)/seed의 인덱스끼리는 서명이 같음 → 한 번 계산한 서명을 공유 가능
+# ================================================================
+from __future__ import annotations
+
+import re, zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_PRIME = (1 << 31) - 1
+_WS = re.compile(r"\s+")
+
+
+class NearDupIndex:
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, bands: int = 16, shingle: int = 5,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle = shingle
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = {}
+        self._sigs: Dict[str, np.ndarray] = {}
+        self.seen = 0
+        self.duplicates = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        t = _WS.sub(" ", text).strip().lower()
+        n = self.shingle
+        grams = {t[i:i + n] for i in range(max(1, len(t) - n + 1))}
+        h = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+        return ((self._a[:, None] * h[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def _band_keys(self, sig: np.ndarray):
+        r = self.rows
+        for i in range(self.bands):
+            yield i, sig[i * r:(i + 1) * r].tobytes()
+
+    def match_or_add(self, key: str, text: str, sig: Optional[np.ndarray] = None) -> Optional[str]:
+        """
+        근사 중복이면 대표 청크 key를 반환(인덱스에 추가하지 않음),
+        아니면 key를 대표로 등록하고 None 반환. sig: 미리 계산한 signature(text)
+        """
+        self.seen += 1
+        if sig is None:
+            sig = self.signature(text)
+        keys = list(self._band_keys(sig))
+        checked = set()
+        for bk in keys:
+            for cand in self._buckets.get(bk, ()):
+                if cand in checked:
+                    continue
+                checked.add(cand)
+                if float(np.mean(self._sigs[cand] == sig)) >= self.threshold:
+                    self.duplicates += 1
+                    return cand
+        self._sigs[key] = sig
+        for bk in keys:
+            self._buckets.setdefault(bk, []).append(key)
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            "chunks_seen": self.seen,
+            "duplicates": self.duplicates,
+            "dedup_ratio": round(self.duplicates / self.seen, 4) if self.seen else 0.0,
+        }
@@ -0,0 +1,192 @@
+# ai/rag/embed_cache.py
+# ================================================================
+# 역할
+# - 임베딩 결과를 SQLite에 영구 저장하는 content-addressed 캐시
+#   key = sha1(모델명 + "\0" + 프리픽스 포함 텍스트)
+# - ingest(passage:) / retriever(query:) / app.py(LangChain) 가 공유
+# - 최대 항목 수 초과 시 마지막 접근 시각(atime)이 오래된 순으로 제거
+#   · 조회 시 atime은 EMBED_CACHE_TOUCH_S보다 오래된 행만 모아 두었다가
+#     put_many(또는 버퍼가 찼을 때) 한 번에 갱신 → 읽기 경로에서 UPDATE/commit 없음
+#
+# 환경변수
+# - EMBED_CACHE=true|false           (캐시 on/off)
+# - EMBED_CACHE_PATH=<CHROMA_DIR>/embed_cache.sqlite3
+# - EMBED_CACHE_MAX_ENTRIES=200000   (초과 시 오래된 항목부터 제거)
+# - EMBED_CACHE_TOUCH_S=3600         (atime 갱신 단위, 초)
+# ================================================================
+from __future__ import annotations
+
+import os, hashlib, sqlite3, threading, time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .config import CHROMA_DIR
+
+EMBED_CACHE = os.getenv("EMBED_CACHE", "true").lower() == "true"
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH") or os.path.join(CHROMA_DIR, "embed_cache.sqlite3")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+EMBED_CACHE_TOUCH_S = int(os.getenv("EMBED_CACHE_TOUCH_S", "3600"))
+
+_SQLITE_MAX_VARS = 900  # IN (...) 바인딩 개수 제한 여유분
+_TOUCH_FLUSH = 256      # 버퍼에 모인 atime 갱신이 이만큼이면 조회 중에도 반영
+
+
+def _key(model_name: str, text: str) -> str:
+    return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite 기반 임베딩 캐시 (스레드 안전, hit/miss 카운터 포함)"""
+
+    def __init__(self, path: str = EMBED_CACHE_PATH, max_entries: int = EMBED_CACHE_MAX_ENTRIES,
+                 touch_s: int = EMBED_CACHE_TOUCH_S):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_s = touch_s
+        self.hits = 0
+        self.misses = 0
+        self._count: Optional[int] = None  # 행 수(put마다 COUNT(*) 하지 않도록 직접 유지)
+        self._touch: set = set()           # atime 갱신 대기 key
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS emb ("
+            " key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vec BLOB NOT NULL, atime INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS emb_atime ON emb(atime)")
+        self._conn.commit()
+
+    def get_many(self, model_name: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        keys = [_key(model_name, t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        now = int(time.time())
+        with self._lock:
+            for i in range(0, len(keys), _SQLITE_MAX_VARS):
+                part = keys[i:i + _SQLITE_MAX_VARS]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vec, atime FROM emb WHERE key IN ({marks})", part
+                ).fetchall()
+                for k, blob, atime in rows:
+                    found[k] = np.frombuffer(blob, dtype=np.float32)
+                    if now - atime >= self.touch_s:
+                        self._touch.add(k)
+            if len(self._touch) >= _TOUCH_FLUSH:
+                self._flush_touch_locked(now)
+                self._conn.commit()
+            out = [found.get(k) for k in keys]
+            hit = sum(1 for v in out if v is not None)
+            self.hits += hit
+            self.misses += len(out) - hit
+        return out
+
+    def put_many(self, model_name: str, texts: Sequence[str], vecs) -> None:
+        now = int(time.time())
+        rows = []
+        for t, v in zip(texts, vecs):
+            arr = np.asarray(v, dtype=np.float32)
+            rows.append((_key(model_name, t), int(arr.shape[0]), arr.tobytes(), now))
+        if not rows:
+            return
+        with self._lock:
+            self._flush_touch_locked(now)
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO emb(key, dim, vec, atime) VALUES(?,?,?,?)", rows
+            )
+            if self._count is not None:
+                # REPLACE는 기존 행 삭제 + 삽입이라 changes로는 새 행 수를 알 수 없음 → 상한으로 가정,
+                # 실제 수는 eviction 시점에 COUNT(*)로 다시 맞춤
+                self._count += self._conn.total_changes - before
+            self._evict_locked()
+            self._conn.commit()
+
+    def _flush_touch_locked(self, now: int) -> None:
+        """조회 때 모아 둔 key의 atime을 한 번에 갱신(eviction 전에 호출)"""
+        if not self._touch:
+            return
+        keys, self._touch = list(self._touch), set()
+        for i in range(0, len(keys), _SQLITE_MAX_VARS):
+            part = keys[i:i + _SQLITE_MAX_VARS]
+            marks = ",".join("?" * len(part))
+            self._conn.execute(f"UPDATE emb SET atime=? WHERE key IN ({marks})", [now, *part])
+
+    def _count_locked(self) -> int:
+        if self._count is None:
+            (self._count,) = self._conn.execute("SELECT COUNT(*) FROM emb").fetchone()
+        return self._count
+
+    def _evict_locked(self) -> None:
+        if self.max_entries <= 0 or self._count_locked() <= self.max_entries:
+            return
+        # 추정치가 상한을 넘었을 때만 실제 행 수 확인(REPLACE로 부풀려졌을 수 있음)
+        (n,) = self._conn.execute("SELECT COUNT(*) FROM emb").fetchone()
+        self._count = n
+        if n <= self.max_entries:
+            return
+        # 한 번에 10% 여유를 두고 제거해 매 put마다 eviction이 돌지 않게 함
+        drop = n - int(self.max_entries * 0.9)
+        cur = self._conn.execute(
+            "DELETE FROM emb WHERE key IN (SELECT key FROM emb ORDER BY atime ASC LIMIT ?)", (drop,)
+        )
+        self._count = n - cur.rowcount
+
+    def stats(self) -> Dict:
+        with self._lock:
+            n = self._count_locked()
+            total = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": n,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# 전역 싱글톤 캐시
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> Optional[EmbeddingCache]:
+    """EMBED_CACHE=false면 None"""
+    global _cache
+    if not EMBED_CACHE:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
+
+def cache_stats() -> Dict:
+    cache = get_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+def cached_encode(model_name: str, texts: Sequence[str],
+                  encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+    """
+    캐시에 없는 텍스트만 encode()로 임베딩하고 결과를 저장.
+    texts는 프리픽스(query:/passage:)가 이미 붙은 최종 입력이어야 함.
+    반환: 입력 순서 그대로의 (N, dim) float32 배열
+    """
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    cache = get_cache()
+    if cache is None:
+        return np.asarray(encode(texts), dtype=np.float32)
+
+    cached = cache.get_many(model_name, texts)
+    miss_idx = [i for i, v in enumerate(cached) if v is None]
+    if miss_idx:
+        fresh = np.asarray(encode([texts[i] for i in miss_idx]), dtype=np.float32)
+        cache.put_many(model_name, [texts[i] for i in miss_idx], fresh)
+        for j, i in enumerate(miss_idx):
+            cached[i] = fresh[j]
+    return np.vstack(cached)
@@ -0,0 +1,407 @@
+# ai/rag/faq.py
+# ================================================================
+# 역할
+# - 자주 묻는 질문(FAQ) 답변 사전 계산
+#   · front의 MySQL chat_logs에서 최근 USER 메시지를 읽어 정규화 질의 기준으로 빈도 집계
+#   · 질의 임베딩으로 그리디 클러스터링(코사인 ≥ FAQ_CLUSTER_THRESHOLD) → 빈도 상위 N개 의도 선택
+#   · 의도별 대표 질문(가장 많이 나온 표현)으로 RAG 답변/출처를 미리 생성
+#   · 결과(npz: 표현별 벡터 + 의도/답변 JSON)를 원자적으로 저장, 인덱스 버전(index_state) 함께 기록
+# - FaqStore: /rag/chat에서 검색 전에 조회하는 빠른 lookup
+#   · 질의 벡터와 의도별 표현 벡터의 최대 코사인 ≥ FAQ_MATCH_THRESHOLD면 미리 계산한 답변 반환
+#   · collection/built_at/출처 dataset 버전 또는 임베더(model)가 현재와 다르면 사용하지 않고 재계산 예약
+#   · 파일은 stat이 바뀐 경우에만 다시 읽음(다른 프로세스의 재계산도 반영)
+# - 재인덱싱 후 자동 재계산: auto_index.on_reindex()에 등록(rag/app.py) + 버전 불일치 감지 시
+#   · 버전 불일치로 인한 재계산은 인덱스 버전당 1번(시도 기록 <FAQ_PATH>.attempt.json, 프로세스 간 공유),
+#     실패하면 FAQ_RETRY_COOLDOWN_S 동안 다시 시도하지 않음 → stale 히트마다 재계산이 몰리지 않음
+# - 수동 실행: cd ai && python -m rag.faq
+#
+# 환경변수
+# - FAQ_ANSWERS=true|false
+# - FAQ_TOP_N=30                 (사전 계산할 의도 수)
+# - FAQ_DAYS=30                  (최근 N일 chat_logs)
+# - FAQ_MAX_MESSAGES=20000       (읽을 USER 메시지 상한)
+# - FAQ_MIN_COUNT=3              (이보다 적게 나온 의도는 제외)
+# - FAQ_CLUSTER_THRESHOLD=0.85   (같은 의도로 묶을 코사인 유사도)
+# - FAQ_MATCH_THRESHOLD=0.92     (질의를 FAQ로 응답할 코사인 유사도)
+# - FAQ_MAX_VARIANTS=20          (의도별로 저장할 표현 수)
+# - FAQ_K=6                      (답변 생성 시 top_k, 필터 없는 같은 top_k 질의에만 FAQ 응답)
+# - FAQ_PATH=CHROMA_DIR/faq_answers.npz
+# - FAQ_RETRY_COOLDOWN_S=300     (재계산 실패 후 stale 감지로 재시도하기까지 대기)
+# - DB_HOST / DB_PORT / DB_USER / DB_PASS / DB_NAME  (front/app.py와 같은 MySQL)
+# ================================================================
+from __future__ import annotations
+
+import os, json, threading, time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .config import CHROMA_DIR
+from .query_cache import normalize_query
+
+FAQ_ANSWERS = os.getenv("FAQ_ANSWERS", "true").lower() == "true"
+FAQ_TOP_N = int(os.getenv("FAQ_TOP_N", "30"))
+FAQ_DAYS = int(os.getenv("FAQ_DAYS", "30"))
+FAQ_MAX_MESSAGES = int(os.getenv("FAQ_MAX_MESSAGES", "20000"))
+FAQ_MIN_COUNT = int(os.getenv("FAQ_MIN_COUNT", "3"))
+FAQ_CLUSTER_THRESHOLD = float(os.getenv("FAQ_CLUSTER_THRESHOLD", "0.85"))
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.92"))
+FAQ_MAX_VARIANTS = int(os.getenv("FAQ_MAX_VARIANTS", "20"))
+FAQ_K = int(os.getenv("FAQ_K", "6"))
+FAQ_PATH = os.getenv("FAQ_PATH", os.path.join(CHROMA_DIR, "faq_answers.npz"))
+FAQ_RETRY_COOLDOWN_S = int(os.getenv("FAQ_RETRY_COOLDOWN_S", "300"))
+
+_ATTEMPT_STALE_S = 3600  # 끝났다는 기록 없이 이보다 오래된 시도 = 시작한 프로세스가 죽은 것으로 봄
+
+DB_HOST = os.getenv("DB_HOST", "127.0.0.1")
+DB_PORT = int(os.getenv("DB_PORT", "3306"))
+DB_USER = os.getenv("DB_USER", "root")
+DB_PASS = os.getenv("DB_PASS", "")
+DB_NAME = os.getenv("DB_NAME", "test")
+
+
+def _version_key(state: Dict) -> str:
+    """index_state() → 비교용 문자열(활성 컬렉션 + built_at + dataset별 버전)"""
+    return json.dumps([state.get("collection"), state.get("built_at", 0),
+                       sorted((state.get("datasets") or {}).items())], ensure_ascii=False)
+
+
+def _unit_rows(vecs) -> np.ndarray:
+    m = np.asarray(vecs, dtype=np.float32)
+    if m.ndim == 1:
+        m = m[None, :]
+    return m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)
+
+
+# ---------------- chat_logs 읽기 ----------------
+def fetch_user_messages(days: int = FAQ_DAYS, limit: int = FAQ_MAX_MESSAGES) -> List[str]:
+    """최근 days일 USER 메시지(최신순, 최대 limit건)"""
+    import mysql.connector  # front와 같은 드라이버, FAQ 잡에서만 필요
+
+    conn = mysql.connector.connect(
+        host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASS or "",
+        database=DB_NAME, auth_plugin="mysql_native_password",
+    )
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT message FROM chat_logs WHERE speaker='USER' "
+            "AND created_at >= NOW() - INTERVAL %s DAY ORDER BY id DESC LIMIT %s",
+            (int(days), int(limit)),
+        )
+        rows = cur.fetchall()
+        cur.close()
+    finally:
+        conn.close()
+    return [r[0] for r in rows if r and r[0] and str(r[0]).strip()]
+
+
+# ---------------- 의도 클러스터링 ----------------
+def mine_intents(messages: Sequence[str], embed_fn: Callable[[List[str]], np.ndarray],
+                 top_n: int = FAQ_TOP_N, threshold: float = FAQ_CLUSTER_THRESHOLD,
+                 min_count: int = FAQ_MIN_COUNT, max_variants: int = FAQ_MAX_VARIANTS) -> List[Dict]:
+    """
+    메시지 → 빈도 상위 의도 목록
+    [{"question": 대표 표현, "count": 메시지 수, "variants": [표현...], "vecs": (V, dim)}]
+    - 정규화 질의(normalize_query)가 같은 메시지는 먼저 하나로 합침(임베딩 1회)
+    - 빈도 내림차순으로 순회하며 가장 가까운 클러스터 중심과 코사인 ≥ threshold면 합류, 아니면 새 클러스터
+      → 대표 표현 = 클러스터에서 가장 많이 나온 표현
+    """
+    counts: Counter = Counter()
+    surface: Dict[str, Counter] = {}
+    for m in messages:
+        text = str(m).strip()
+        key = normalize_query(text)
+        if not key:
+            continue
+        counts[key] += 1
+        surface.setdefault(key, Counter())[text] += 1
+    if not counts:
+        return []
+
+    keys = [k for k, _ in counts.most_common()]
+    texts = [surface[k].most_common(1)[0][0] for k in keys]
+    vecs = _unit_rows(embed_fn(texts))
+
+    sums: List[np.ndarray] = []      # 클러스터 벡터 합(가중치 = 빈도)
+    centroids = np.zeros((0, vecs.shape[1]), dtype=np.float32)
+    members: List[List[int]] = []
+    totals: List[int] = []
+    for i, v in enumerate(vecs):
+        c = -1
+        if len(centroids):
+            sims = centroids @ v
+            b = int(np.argmax(sims))
+            if sims[b] >= threshold:
+                c = b
+        if c < 0:
+            sums.append(v * counts[keys[i]])
+            centroids = np.vstack([centroids, v[None, :]])
+            members.append([i])
+            totals.append(counts[keys[i]])
+            continue
+        sums[c] = sums[c] + v * counts[keys[i]]
+        centroids[c] = sums[c] / max(float(np.linalg.norm(sums[c])), 1e-12)
+        members[c].append(i)
+        totals[c] += counts[keys[i]]
+
+    order = sorted(range(len(members)), key=lambda c: -totals[c])
+    intents = []
+    for c in order:
+        if totals[c] < min_count or len(intents) >= top_n:
+            break
+        idx = members[c][:max_variants]  # 빈도순으로 들어갔으므로 앞쪽이 많이 나온 표현
+        intents.append({
+            "question": texts[idx[0]],
+            "count": totals[c],
+            "variants": [texts[i] for i in idx],
+            "vecs": vecs[idx],
+        })
+    return intents
+
+
+# ---------------- 사전 계산/저장 ----------------
+def _write(path: str, vecs: np.ndarray, owner: np.ndarray, meta: Dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, vecs=vecs, owner=owner, meta=np.array(json.dumps(meta, ensure_ascii=False)))
+    os.replace(tmp, path)
+
+
+def build_faq(answer_fn: Callable[[str], Dict], embed_fn: Callable[[List[str]], np.ndarray],
+              version_fn: Callable[[], Dict], messages: Optional[Sequence[str]] = None,
+              path: str = FAQ_PATH, top_n: int = FAQ_TOP_N, model: Optional[str] = None) -> Dict:
+    """
+    chat_logs 마이닝 → 의도별 답변 사전 계산 → path에 저장
+    answer_fn(question) → qa.answer()와 같은 {"answer", "sources"} dict
+    model: embed_fn의 임베더 키(lookup 시 같은 임베더인지 확인)
+    """
+    t0 = time.perf_counter()
+    state = version_fn()  # 답변 생성 전 버전: 도중에 인덱스가 바뀌면 lookup에서 stale 처리
+    if messages is None:
+        messages = fetch_user_messages()
+    intents = mine_intents(messages, embed_fn, top_n=top_n)
+    t_mine = time.perf_counter()
+
+    entries, vec_rows, owner = [], [], []
+    skipped = 0
+    for it in intents:
+        try:
+            res = answer_fn(it["question"])
+        except Exception as e:
+            print(f"[faq][skip] {it['question'][:40]!r}: {type(e).__name__}: {e}")
+            skipped += 1
+            continue
+        if not res.get("sources"):
+            skipped += 1  # 근거 없는 답변은 미리 저장하지 않음
+            continue
+        datasets = sorted({s.get("dataset") for s in res["sources"] if s.get("dataset")})
+        versions = {d: (state.get("datasets") or {}).get(d, 0) for d in datasets}
+        vec_rows.append(it["vecs"])
+        owner.extend([len(entries)] * len(it["vecs"]))
+        entries.append({
+            "question": it["question"],
+            "count": it["count"],
+            "variants": it["variants"],
+            "answer": dict(res),
+            "versions": versions,
+        })
+
+    dim = intents[0]["vecs"].shape[1] if intents else 0
+    vecs = np.vstack(vec_rows).astype(np.float32) if vec_rows else np.zeros((0, dim), dtype=np.float32)
+    meta = {
+        "model": model,
+        "collection": state.get("collection"),
+        "built_at": state.get("built_at", 0),
+        "created_at": int(time.time()),
+        "messages": len(messages),
+        "entries": entries,
+    }
+    _write(path, vecs, np.asarray(owner, dtype=np.int32), meta)
+
+    out = {
+        "messages": len(messages),
+        "intents": len(intents),
+        "entries": len(entries),
+        "skipped": skipped,
+        "collection": meta["collection"],
+        "mine_ms": int((t_mine - t0) * 1000),
+        "total_ms": int((time.perf_counter() - t0) * 1000),
+    }
+    print(f"[faq][build] {out}")
+    return out
+
+
+# ---------------- lookup ----------------
+class FaqStore:
+    def __init__(self, version_fn: Callable[[], Dict], path: str = FAQ_PATH,
+                 threshold: float = FAQ_MATCH_THRESHOLD, model: Optional[str] = None):
+        self.version_fn = version_fn
+        self.model = model
+        self.path = path
+        self.attempt_path = path + ".attempt.json"
+        self.threshold = threshold
+        self._sig = None
+        self._vecs = np.zeros((0, 0), dtype=np.float32)
+        self._owner = np.zeros(0, dtype=np.int32)
+        self._meta: Dict = {"entries": []}
+        self._lock = threading.Lock()
+        self._job: Optional[Callable[[], Dict]] = None
+        self._running = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.rebuilds = 0
+        self.skipped_rebuilds = 0
+        self.last_build: Optional[Dict] = None
+
+    def _load_locked(self) -> None:
+        try:
+            st = os.stat(self.path)
+            sig = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            sig = None
+        if sig == self._sig:
+            return
+        if sig is None:
+            self._vecs, self._owner, self._meta = np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int32), {"entries": []}
+        else:
+            with np.load(self.path, allow_pickle=False) as z:
+                self._vecs = z["vecs"].astype(np.float32)
+                self._owner = z["owner"]
+                self._meta = json.loads(str(z["meta"]))
+        self._sig = sig
+
+    def _valid(self, entry: Dict, state: Dict) -> bool:
+        if self._meta.get("collection") != state.get("collection") or self._meta.get("built_at", 0) != state.get("built_at", 0):
+            return False
+        cur = state.get("datasets") or {}
+        return all(cur.get(d, 0) == v for d, v in entry.get("versions", {}).items())
+
+    def lookup(self, vec) -> Optional[Dict]:
+        """미리 계산한 답변이 있으면 {"answer", "question", "similarity"}"""
+        q = _unit_rows(vec)[0]
+        state = self.version_fn()
+        hit, stale = None, False
+        with self._lock:
+            self._load_locked()
+            if self._sig is not None and self._meta.get("model") != self.model:
+                stale = True  # 다른 임베더로 만든 벡터 → 비교 불가
+            elif len(self._vecs) and self._vecs.shape[1] == q.shape[0]:
+                sims = self._vecs @ q
+                b = int(np.argmax(sims))
+                if sims[b] >= self.threshold:
+                    entry = self._meta["entries"][int(self._owner[b])]
+                    if not self._valid(entry, state):
+                        stale = True
+                    else:
+                        hit = {"answer": entry["answer"], "question": entry["question"],
+                               "similarity": round(float(sims[b]), 4)}
+            if stale:
+                self.stale += 1
+            elif hit is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if stale:
+            # 다른 프로세스가 재인덱싱한 경우에도 따라잡되, 같은 버전으로는 한 번만(실패 시 쿨다운 후)
+            if self._should_rebuild(_version_key(state)):
+                self.schedule_rebuild()
+            else:
+                self.skipped_rebuilds += 1
+        return hit
+
+    # ---- 재계산 시도 기록(프로세스 간 공유) ----
+    def _read_attempt(self) -> Dict:
+        try:
+            with open(self.attempt_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_attempt(self, attempt: Dict) -> None:
+        os.makedirs(os.path.dirname(self.attempt_path) or ".", exist_ok=True)
+        tmp = self.attempt_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(attempt, f, ensure_ascii=False)
+        os.replace(tmp, self.attempt_path)
+
+    def _should_rebuild(self, key: str) -> bool:
+        """stale 감지 시 재계산 여부: 이 버전으로 시도한 적 없거나, 실패 후 쿨다운이 지났거나, 시도가 멈췄을 때"""
+        a = self._read_attempt()
+        if a.get("version") != key:
+            return True
+        now = time.time()
+        if a.get("failed_at"):
+            return now - a["failed_at"] >= FAQ_RETRY_COOLDOWN_S
+        if a.get("finished_at"):
+            return False
+        return now - a.get("started_at", 0) >= _ATTEMPT_STALE_S
+
+    # ---- 재계산 ----
+    def set_job(self, job: Callable[[], Dict]) -> None:
+        """job() = build_faq(...) 호출(답변/임베딩 파이프라인은 app에서 주입)"""
+        self._job = job
+
+    def rebuild(self) -> Optional[Dict]:
+        """동기 재계산(이미 진행 중이면 None)"""
+        if self._job is None or not self._running.acquire(blocking=False):
+            return None
+        attempt = {"version": _version_key(self.version_fn()), "started_at": time.time()}
+        try:
+            self._write_attempt(attempt)
+            self.last_build = self._job()
+            self.rebuilds += 1
+            self._write_attempt({**attempt, "finished_at": time.time()})
+            return self.last_build
+        except Exception as e:
+            self.last_build = {"error": f"{type(e).__name__}: {e}"}
+            print(f"[faq][error] {self.last_build['error']}")
+            try:
+                self._write_attempt({**attempt, "failed_at": time.time()})
+            except OSError:
+                pass
+            return None
+        finally:
+            self._running.release()
+
+    def schedule_rebuild(self) -> bool:
+        """백그라운드 재계산 예약(진행 중이면 무시)"""
+        if self._job is None or self._running.locked():
+            return False
+        threading.Thread(target=self.rebuild, name="faq-rebuild", daemon=True).start()
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._load_locked()
+            total = self.hits + self.misses + self.stale
+            return {
+                "enabled": FAQ_ANSWERS,
+                "path": self.path,
+                "entries": len(self._meta.get("entries", [])),
+                "variants": int(len(self._vecs)),
+                "model": self._meta.get("model"),
+                "collection": self._meta.get("collection"),
+                "built_at": self._meta.get("built_at", 0),
+                "created_at": self._meta.get("created_at"),
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "rebuilding": self._running.locked(),
+                "rebuilds": self.rebuilds,
+                "skipped_rebuilds": self.skipped_rebuilds,
+                "last_attempt": self._read_attempt(),
+                "last_build": self.last_build,
+                "questions": [{"question": e["question"], "count": e["count"]}
+                              for e in self._meta.get("entries", [])],
+            }
+
+
+if __name__ == "__main__":
+    # 서빙과 같은 답변/임베딩 파이프라인으로 1회 재계산
+    from .app import faq_store
+    print(json.dumps(faq_store.rebuild(), ensure_ascii=False, indent=2))
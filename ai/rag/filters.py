@@ -0,0 +1,154 @@
+# ai/rag/filters.py
+# ================================================================
+# 역할
+# - API/호출자가 넘기는 "친화적" 필터를 Chroma where 절로 컴파일
+#   · {"dataset": ["규정집", "notices"]}      → {"dataset": {"$in": [...]}}
+#   · {"dataset": ["규정집"]} / {"dataset": "규정집"} → {"dataset": "규정집"}
+#   · {"updated_from": "2024-03-01", "updated_to": "2024-06-30"}
+#       → updated_at(정수 타임스탬프) $gte / $lte (날짜만 주면 to는 그날 23:59:59까지)
+#   · {"updated_at": {"from": ..., "to": ...}} 도 동일
+#   · 값이 {"$gte": ...} 같은 연산자 dict면 그대로(updated_at 값은 타임스탬프로 변환)
+#   · 조건이 2개 이상이면 {"$and": [...]} (Chroma는 필드 dict당 연산자 1개만 허용)
+# - 이미 $and/$or로 시작하는 where 절은 검증만 하고 그대로 통과
+# - partition_values(): where 절이 파티션 키(dataset)를 특정 값으로 고정하는지 추출
+#   (np_index 파티션 검색에서 사용)
+# ================================================================
+from __future__ import annotations
+
+import datetime, re
+from typing import Any, Dict, List, Optional, Tuple
+
+UPDATED_KEY = "updated_at"  # ingest 메타의 정수 타임스탬프 필드
+
+_OPS = {"$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin"}
+_RANGE_KEYS = {
+    "updated_from": "$gte", "updated_after": "$gt",
+    "updated_to": "$lte", "updated_before": "$lt",
+}
+_DATE_ONLY = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class FilterError(ValueError):
+    """필터 형식 오류(API에서는 400으로 변환)"""
+
+
+def _ts(v, end_of_day: bool = False) -> int:
+    """타임스탬프(초/밀리초) 또는 ISO 날짜/일시 → 정수 초"""
+    if isinstance(v, bool):
+        raise FilterError(f"invalid timestamp: {v!r}")
+    if isinstance(v, (int, float)):
+        return int(v // 1000 if v > 1e11 else v)
+    if isinstance(v, str):
+        s = v.strip()
+        if re.fullmatch(r"\d{10,13}", s):
+            return int(s[:10])
+        try:
+            dt = datetime.datetime.fromisoformat(s.replace("Z", "+00:00"))
+        except ValueError:
+            raise FilterError(f"invalid date: {v!r}")
+        if end_of_day and _DATE_ONLY.fullmatch(s):
+            dt += datetime.timedelta(days=1, seconds=-1)
+        return int(dt.timestamp())
+    raise FilterError(f"invalid timestamp: {v!r}")
+
+
+def _op_clauses(key: str, ops: Dict) -> List[Dict]:
+    out = []
+    for op, val in ops.items():
+        if op not in _OPS:
+            raise FilterError(f"unsupported operator {op!r} for {key!r}")
+        if op in ("$in", "$nin"):
+            if not isinstance(val, (list, tuple, set)) or not val:
+                raise FilterError(f"{op} for {key!r} needs a non-empty list")
+            val = [_ts(v) for v in val] if key == UPDATED_KEY else list(val)
+        elif key == UPDATED_KEY:
+            val = _ts(val, end_of_day=op in ("$lte", "$gt"))
+        out.append({key: {op: val}})
+    return out
+
+
+def _validate_where(where: Dict) -> None:
+    for key, cond in where.items():
+        if key in ("$and", "$or"):
+            # Chroma는 $and/$or 피연산자가 2개 이상이어야 함(1개면 400 대신 500이 나므로 여기서 거름)
+            if not isinstance(cond, list) or len(cond) < 2:
+                raise FilterError(f"{key} needs a list of at least 2 conditions")
+            for w in cond:
+                if not isinstance(w, dict):
+                    raise FilterError(f"{key} items must be objects")
+                _validate_where(w)
+        elif key.startswith("$"):
+            raise FilterError(f"unsupported logical operator {key!r}")
+        elif isinstance(cond, dict):
+            if len(cond) != 1 or next(iter(cond)) not in _OPS:
+                raise FilterError(f"invalid condition for {key!r}: {cond!r}")
+
+
+def compile_filters(filters: Optional[Dict[str, Any]]) -> Optional[Dict]:
+    """친화적 필터 → Chroma where 절(조건 없으면 None)"""
+    if not filters:
+        return None
+    if not isinstance(filters, dict):
+        raise FilterError("filters must be an object")
+    if any(k.startswith("$") for k in filters):
+        _validate_where(filters)
+        return filters
+
+    clauses: List[Dict] = []
+    for key, val in filters.items():
+        if key in _RANGE_KEYS:
+            if val in (None, ""):
+                continue
+            op = _RANGE_KEYS[key]
+            clauses.append({UPDATED_KEY: {op: _ts(val, end_of_day=op in ("$lte", "$gt"))}})
+        elif key == UPDATED_KEY and isinstance(val, dict) and not any(k.startswith("$") for k in val):
+            if val.get("from") not in (None, ""):
+                clauses.append({UPDATED_KEY: {"$gte": _ts(val["from"])}})
+            if val.get("to") not in (None, ""):
+                clauses.append({UPDATED_KEY: {"$lte": _ts(val["to"], end_of_day=True)}})
+        elif isinstance(val, dict):
+            clauses.extend(_op_clauses(key, val))
+        elif isinstance(val, (list, tuple, set)):
+            vals = list(dict.fromkeys(v for v in val if v not in (None, "")))
+            if not vals:
+                continue  # 빈 목록 = 해당 키 조건 없음
+            if key == UPDATED_KEY:
+                vals = [_ts(v) for v in vals]
+            clauses.append({key: vals[0]} if len(vals) == 1 else {key: {"$in": vals}})
+        elif val in (None, ""):
+            continue
+        else:
+            clauses.append({key: _ts(val) if key == UPDATED_KEY else val})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def partition_values(where: Optional[Dict], key: str) -> Tuple[Optional[List], Optional[Dict]]:
+    """
+    where가 key를 특정 값(들)로 고정하면 (값 목록, 나머지 where) 반환, 아니면 (None, where)
+    최상위 조건 또는 최상위 $and 안의 조건만 인식($or 안쪽은 고정으로 보지 않음)
+    """
+    if not where:
+        return None, where
+
+    def pinned(clause: Dict) -> Optional[List]:
+        if len(clause) != 1 or key not in clause:
+            return None
+        cond = clause[key]
+        if not isinstance(cond, dict):
+            return [cond]
+        if set(cond) == {"$eq"}:
+            return [cond["$eq"]]
+        if set(cond) == {"$in"}:
+            return list(cond["$in"])
+        return None
+
+    parts = where["$and"] if set(where) == {"$and"} else [where]
+    for i, clause in enumerate(parts):
+        vals = pinned(clause)
+        if vals is not None:
+            rest = parts[:i] + parts[i + 1:]
+            return vals, (None if not rest else rest[0] if len(rest) == 1 else {"$and": rest})
+    return None, where
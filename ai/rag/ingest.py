@@ -1,19 +1,33 @@
 # ai/rag/ingest.py
 # ================================================================
 # 역할
-# - 여러 PDF + MongoDB 문서를 단일 Chroma 컬렉션에 인덱싱
-# - PDF: 본문+표 추출 → 청크 → 임베딩(배치) → upsert
-# - Mongo: (옵션) 증분 인덱싱(컬렉션별 워터마크) → 청크 → 임베딩(배치) → upsert
+# - 여러 PDF + MongoDB 문서를 활성 Chroma 컬렉션(ACTIVE_COLLECTION 포인터)에 인덱싱
+# - 전체 재빌드는 비활성 컬렉션(A/B)에 만든 뒤 포인터 교체(rebuild_index)
+# - PDF: 본문+표 추출 → 청크 → 임베딩(배치) → diff upsert
+# - Mongo: (옵션) 증분 인덱싱(컬렉션별 워터마크) → 청크 → 임베딩(배치) → diff upsert
+# - diff upsert: source_id별 기존 청크와 비교해 변경분만 임베딩, 사라진 청크 삭제
 #
 # 환경변수
 # - EMBEDDER_MODEL=intfloat/multilingual-e5-small | ...   (기본: small)
 # - EMBED_BATCH=64                                       (임베딩 배치 크기)
+# - EMBED_BACKEND=torch|onnx                             (onnx=int8 양자화 ONNX, 최초 1회 export)
+# - EMBED_ONNX_QCONFIG=avx512_vnni                       (양자화 설정: arm64/avx2/avx512/avx512_vnni)
+# - EMBED_ONNX_MIN_COS=0.98                              (export 직후 fp32 대비 최소 코사인, 미달 시 로드 실패)
 # - MONGO_INCREMENTAL=true|false                         (증분 인덱싱 on/off)
+# - INGEST_WORKERS=0                                     (PDF 추출/청크 워커 프로세스 수, 0·1=직렬)
+# - TABLE_MIN_RULINGS=4                                  (pdfplumber 표 추출을 돌릴 최소 괘선 수)
+# - MONGO_BATCH_SIZE=200                                 (Mongo 커서 batch_size)
+# - MONGO_WINDOW=512                                     (청크 N개마다 임베딩/쓰기 + 워터마크 전진)
+# - EMBED_POOL_WORKERS=0                                 (임베딩 워커 프로세스 수, 0·1=프로세스 내)
+# - EMBED_POOL_MIN_CHUNKS=256                            (한 번에 이 수 이상 임베딩할 때만 풀 사용)
+# - DEDUP=true, DEDUP_THRESHOLD=0.9                      (컬렉션 안 근사 중복 청크 통합, MinHash Jaccard 기준)
+# - INGEST_RESUME=true                                   (ingest_all 중단 시 체크포인트부터 재개)
 # ================================================================
 from __future__ import annotations
 
-from typing import List, Dict, Optional
-import os, re, glob, datetime, json
+from typing import List, Dict, Optional, Tuple
+import os, re, glob, datetime, json, time, threading, atexit
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # --- PDF 추출 도구 (PyMuPDF 우선) ---
 try:
@@ -23,22 +37,51 @@ except ImportError:
     from pypdf import PdfReader
     USE_FITZ = False
 
+import numpy as np
 import pdfplumber
 from sentence_transformers import SentenceTransformer
 from pymongo import MongoClient
+from bson import ObjectId
 
 from .config import (
-    DATA_DIR, PDF_GLOBS, CHROMA_DIR, COLLECTION_NAME,
-    CHUNK_SIZE, CHUNK_OVERLAP,
+    DATA_DIR, PDF_GLOBS, CHROMA_DIR,
+    CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_MODE, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS,
     MONGO_URI, MONGO_DB, MONGO_COLL, MONGO_UPDATED_FIELD,
 )
-from .store import get_client, get_collection
+from .store import (
+    get_client, get_collection, active_collection_name, inactive_collection_name,
+    set_active_name, drop_collection_later, begin_rebuild, end_rebuild,
+)
+from .embed_cache import cached_encode, cache_stats
+from .query_cache import get_query_cache
+from .models import get_model
+from .np_index import NP_INDEX_EXPORT, export_index
+from .pipeline import Pipeline
+from .chunker import TokenChunker
+from .dedup import NearDupIndex
 
 # ---------------- 설정 ----------------
 EMBEDDER_MODEL = os.getenv("EMBEDDER_MODEL", "intfloat/multilingual-e5-small")
 EMBED_BATCH    = int(os.getenv("EMBED_BATCH", "64"))
+EMBED_BACKEND  = os.getenv("EMBED_BACKEND", "torch").lower()          # torch | onnx
+EMBED_ONNX_QCONFIG = os.getenv("EMBED_ONNX_QCONFIG", "avx512_vnni")  # arm64 | avx2 | avx512 | avx512_vnni
+EMBED_ONNX_DIR = os.getenv("EMBED_ONNX_DIR") or os.path.join(os.path.dirname(CHROMA_DIR), "onnx_models")
+EMBED_ONNX_MIN_COS = float(os.getenv("EMBED_ONNX_MIN_COS", "0.98"))
+# 임베딩 캐시 키: 양자화 모델은 벡터가 미세하게 달라 백엔드별로 분리
+EMBEDDER_KEY = EMBEDDER_MODEL if EMBED_BACKEND != "onnx" else f"{EMBEDDER_MODEL}@onnx-q8-{EMBED_ONNX_QCONFIG}"
 MONGO_INCREMENTAL = os.getenv("MONGO_INCREMENTAL", "true").lower() == "true"
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))
+TABLE_MIN_RULINGS = int(os.getenv("TABLE_MIN_RULINGS", "4"))
+MONGO_BATCH_SIZE = int(os.getenv("MONGO_BATCH_SIZE", "200"))
+MONGO_WINDOW = int(os.getenv("MONGO_WINDOW", "512"))
+EMBED_POOL_WORKERS = int(os.getenv("EMBED_POOL_WORKERS", "0"))
+EMBED_POOL_MIN_CHUNKS = int(os.getenv("EMBED_POOL_MIN_CHUNKS", "256"))
+DEDUP = os.getenv("DEDUP", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
 _WATERMARK = os.path.join(CHROMA_DIR, "mongo_watermarks.json")
+_CHECKPOINT = os.path.join(CHROMA_DIR, "ingest_checkpoint.json")
+PDF_DATASET = "규정집"  # PDF 청크의 dataset 메타 값
+INGEST_RESUME = os.getenv("INGEST_RESUME", "true").lower() == "true"
 
 # ================================================================
 # 공통 유틸 (전처리/청크/임베딩/메타 보정)
@@ -53,7 +96,8 @@ def split_paragraphs(text: str) -> List[str]:
     paras = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
     return paras if paras else [text]
 
-def to_chunks(paras: List[str], size=CHUNK_SIZE, overlap=CHUNK_OVERLAP) -> List[str]:
+def to_chunks_chars(paras: List[str], size=CHUNK_SIZE, overlap=CHUNK_OVERLAP) -> List[str]:
+    """기존 문자 수 기준 청크(CHUNK_MODE=char 또는 토크나이저 사용 불가 시)"""
     buf, chunks = "", []
     for p in paras:
         if len(buf) + len(p) + 1 <= size:
@@ -70,6 +114,44 @@ def to_chunks(paras: List[str], size=CHUNK_SIZE, overlap=CHUNK_OVERLAP) -> List[
         chunks = with_overlap
     return chunks
 
+# 토큰 청커: 토크나이저만 로드하므로 PDF 워커 프로세스에서도 가벼움.
+# fast tokenizer는 스레드 간 동시 사용 시 에러가 나므로 임베더와 별도 인스턴스 + 락 사용
+_chunker = None
+_chunker_lock = threading.Lock()
+def token_chunker() -> Optional[TokenChunker]:
+    global _chunker
+    if _chunker is None:
+        from transformers import AutoTokenizer
+        tok = AutoTokenizer.from_pretrained(EMBEDDER_MODEL)
+        if not getattr(tok, "is_fast", False):
+            return None  # offset 매핑 불가 → 문자 기준으로 폴백
+        _chunker = TokenChunker(tok, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)
+    return _chunker
+
+def to_chunks(paras: List[str]) -> List[str]:
+    """CHUNK_MODE=token이면 임베더 토큰 예산 기준, 아니면 문자 기준"""
+    if CHUNK_MODE == "token":
+        with _chunker_lock:
+            chunker = token_chunker()
+            if chunker is not None:
+                return chunker.chunk(paras)
+    return to_chunks_chars(paras)
+
+def to_chunks_counted(paras: List[str]) -> Tuple[List[str], int]:
+    """
+    to_chunks() + 문자 기준 청크였다면 모델 입력 한도를 넘어 잘렸을 청크 수(char_truncated).
+    CHUNK_MODE=char면 실제로 잘려서 임베딩되는 청크 수. 토크나이저를 못 쓰면 0
+    """
+    legacy = to_chunks_chars(paras)
+    with _chunker_lock:
+        chunker = token_chunker()
+        if chunker is None:
+            return legacy, 0
+        truncated = chunker.over_limit(legacy)
+        if CHUNK_MODE == "token":
+            return chunker.chunk(paras), truncated
+    return legacy, truncated
+
 def _sanitize_meta(meta: Dict) -> Dict:
     """Chroma 메타 타입 보정: None 제거/기본값 강제."""
     fixed = {}
@@ -83,25 +165,198 @@ def _sanitize_meta(meta: Dict) -> Dict:
     return fixed
 
 def _encode_in_batches(model: SentenceTransformer, docs: List[str]) -> List[List[float]]:
-    """대량 문서를 배치로 임베딩(list[float])."""
-    vecs: List[List[float]] = []
-    for i in range(0, len(docs), EMBED_BATCH):
-        batch = docs[i:i + EMBED_BATCH]
-        emb = model.encode(
-            [f"passage: {d}" for d in batch],
-            convert_to_numpy=True,
-            normalize_embeddings=True,
+    """대량 문서를 배치로 임베딩(list[float]). 임베딩 캐시에 있는 passage는 재계산하지 않음."""
+    def _encode(texts: List[str]):
+        pool = embed_pool() if len(texts) >= EMBED_POOL_MIN_CHUNKS else None
+        if pool is not None:
+            # 워커 프로세스로 샤딩, 결과는 입력 순서 그대로 반환됨
+            return model.encode(
+                texts, pool=pool, batch_size=EMBED_BATCH,
+                convert_to_numpy=True, normalize_embeddings=True,
+            )
+        vecs = []
+        for i in range(0, len(texts), EMBED_BATCH):
+            vecs.append(model.encode(
+                texts[i:i + EMBED_BATCH],
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            ))
+        return np.vstack(vecs)
+
+    return cached_encode(EMBEDDER_KEY, [f"passage: {d}" for d in docs], _encode).tolist()
+
+def _onnx_dir(model_name: str) -> str:
+    return os.path.join(EMBED_ONNX_DIR, model_name.replace("/", "__"))
+
+# export 직후 양자화 모델 검증용 입력(query:/passage: 프리픽스 포함)
+_PARITY_PROBES = [
+    "query: 휴학 신청 기간",
+    "query: 졸업 요건 학점",
+    "passage: 휴학을 원하는 학생은 소정의 기간 내에 휴학원을 제출하여 총장의 허가를 받아야 한다.",
+    "passage: 장학금 신청 기간: 매 학기 개강 전 2주 | 대상: 직전 학기 12학점 이상 이수자",
+]
+
+def embed_parity(a: SentenceTransformer, b: SentenceTransformer, texts: List[str]) -> np.ndarray:
+    """두 임베더의 같은 입력에 대한 코사인(L2 정규화 후 내적), 입력별 배열"""
+    va = a.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    vb = b.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    return np.sum(va * vb, axis=1)
+
+def load_embedder(backend: str = EMBED_BACKEND, model_name: str = EMBEDDER_MODEL) -> SentenceTransformer:
+    """
+    backend=torch → 기본 PyTorch SentenceTransformer
+    backend=onnx  → int8 동적 양자화 ONNX 모델(최초 1회 EMBED_ONNX_DIR에 export 후 재사용)
+    두 경우 모두 같은 encode() 인터페이스, 프리픽스/정규화는 호출 측에서 동일하게 적용
+    onnx export/검증이 실패하면 PyTorch나 fp32로 대신 로드하지 않고 RuntimeError
+    """
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend != "onnx":
+        raise ValueError(f"알 수 없는 EMBED_BACKEND: {backend!r} (torch | onnx)")
+
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+    local = _onnx_dir(model_name)
+    qfile = f"onnx/model_qint8_{EMBED_ONNX_QCONFIG}.onnx"
+    qpath = os.path.join(local, qfile)
+    if os.path.exists(qpath):
+        return SentenceTransformer(local, backend="onnx", model_kwargs={"file_name": qfile})
+
+    try:
+        base = SentenceTransformer(model_name, backend="onnx")  # fp32 ONNX export
+        base.save(local)
+        export_dynamic_quantized_onnx_model(base, EMBED_ONNX_QCONFIG, local)
+    except Exception as e:
+        raise RuntimeError(f"ONNX int8 export 실패: model={model_name} qconfig={EMBED_ONNX_QCONFIG}: {e}") from e
+    # 파일이 없으면 SentenceTransformer가 fp32로 조용히 다시 export하므로 여기서 막음
+    if not os.path.exists(qpath):
+        raise RuntimeError(f"ONNX int8 export 결과 없음: {qpath}")
+    model = SentenceTransformer(local, backend="onnx", model_kwargs={"file_name": qfile})
+    cos = embed_parity(base, model, _PARITY_PROBES)
+    if cos.min() < EMBED_ONNX_MIN_COS:
+        os.remove(qpath)  # 다음 로드에서 검증 안 된 파일을 재사용하지 않도록
+        raise RuntimeError(
+            f"ONNX int8 모델 코사인 {cos.min():.4f} < EMBED_ONNX_MIN_COS={EMBED_ONNX_MIN_COS} "
+            f"(qconfig={EMBED_ONNX_QCONFIG})"
         )
-        vecs.extend(emb.tolist())
-    return vecs
+    print(f"[ingest][embed] onnx int8 export ok: {qpath} (min cos={cos.min():.4f})")
+    return model
 
-# 전역 싱글톤 임베더
-_model = None
+# 전역 싱글톤 임베더: rag.models 레지스트리(EMBEDDER_KEY)에 1번만 로드,
+# retriever/app(/rag/chat·/rag/preview)도 이 함수를 통해 같은 인스턴스를 사용
 def embedder() -> SentenceTransformer:
-    global _model
-    if _model is None:
-        _model = SentenceTransformer(EMBEDDER_MODEL)
-    return _model
+    # 모델이 (다시) 로드되면 이전 모델로 만든 질의 벡터는 버림
+    return get_model(EMBEDDER_KEY, load_embedder, on_load=lambda _m: get_query_cache().clear())
+
+# 대량 인덱싱용 멀티 프로세스 임베딩 풀(워커마다 모델 사본 보유, 최초 사용 시 기동)
+_pool = None
+_pool_lock = threading.Lock()
+def embed_pool():
+    """EMBED_POOL_WORKERS<=1이면 None(프로세스 내 인코딩)"""
+    global _pool
+    if EMBED_POOL_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = embedder().start_multi_process_pool(target_devices=["cpu"] * EMBED_POOL_WORKERS)
+            atexit.register(SentenceTransformer.stop_multi_process_pool, _pool)
+    return _pool
+
+_DIFF_GET_BATCH = 500  # col.get(where=source_id $in ...) 한 번에 조회할 소스 수
+
+def _existing_chunks(col, source_ids: List[str], scope: Optional[Dict] = None) -> Dict[str, tuple]:
+    """
+    source_id 목록에 속한 기존 청크 {id: (document, metadata)}
+    scope: 함께 걸 메타 조건(예: {"source_type": "mongo", "dataset": 컬렉션}).
+           Mongo source_id는 컬렉션 안에서만 유일한 _id 문자열이라 다른 컬렉션 청크를 orphan으로 지우지 않도록 필수
+    """
+    out: Dict[str, tuple] = {}
+    sids = sorted(set(source_ids))
+    extra = [{k: v} for k, v in (scope or {}).items()]
+    for i in range(0, len(sids), _DIFF_GET_BATCH):
+        part = sids[i:i + _DIFF_GET_BATCH]
+        where = {"source_id": part[0]} if len(part) == 1 else {"source_id": {"$in": part}}
+        if extra:
+            where = {"$and": [where, *extra]}
+        got = col.get(where=where, include=["documents", "metadatas"])
+        for cid, doc, meta in zip(got.get("ids") or [], got.get("documents") or [], got.get("metadatas") or []):
+            out[cid] = (doc, meta or {})
+    return out
+
+def _plan_diff(col, docs: List[str], metas: List[Dict], ids: List[str], source_ids: List[str],
+               scope: Optional[Dict] = None) -> Dict:
+    """
+    소스 단위 diff 계획
+    - 새 청크/본문 변경 → 임베딩 후 upsert (embed_idx)
+    - 메타만 변경 → 임베딩 없이 메타 update (meta_idx)
+    - 완전히 동일 → 건드리지 않음
+    - 해당 source_id(+ scope)에 남아있지만 새 집합에 없는 ID → 삭제 (orphans)
+    본문이 그대로인 대표 청크의 중복 출처(source_ids)는 유지(dedup 범위가 호출 1회라 다시 채워지지 않음)
+    """
+    existing = _existing_chunks(col, source_ids, scope) if source_ids else {}
+
+    embed_idx, meta_idx = [], []
+    for j, cid in enumerate(ids):
+        old = existing.get(cid)
+        if old is None or old[0] != docs[j]:
+            embed_idx.append(j)
+            continue
+        if "source_ids" in old[1] and "source_ids" not in metas[j]:
+            metas[j] = {**metas[j], "source_ids": old[1]["source_ids"]}
+        if old[1] != metas[j]:
+            meta_idx.append(j)
+
+    new_ids = set(ids)
+    return {
+        "docs": docs, "metas": metas, "ids": ids,
+        "embed_idx": embed_idx,
+        "meta_idx": meta_idx,
+        "orphans": [cid for cid in existing if cid not in new_ids],
+    }
+
+def _embed_diff(plan: Dict) -> List[List[float]]:
+    docs = plan["docs"]
+    sub_docs = [docs[j] for j in plan["embed_idx"]]
+    return _encode_in_batches(embedder(), sub_docs) if sub_docs else []
+
+def _write_diff(col, plan: Dict, embeds: List[List[float]]) -> Dict:
+    docs, metas, ids = plan["docs"], plan["metas"], plan["ids"]
+    embed_idx, meta_idx, orphans = plan["embed_idx"], plan["meta_idx"], plan["orphans"]
+    if orphans:
+        col.delete(ids=orphans)
+    if embed_idx:
+        col.upsert(
+            ids=[ids[j] for j in embed_idx],
+            documents=[docs[j] for j in embed_idx],
+            embeddings=embeds,
+            metadatas=[metas[j] for j in embed_idx],
+        )
+    if meta_idx:
+        col.update(ids=[ids[j] for j in meta_idx], metadatas=[metas[j] for j in meta_idx])
+    return {
+        "added": len(embed_idx),
+        "updated": len(meta_idx),
+        "unchanged": len(ids) - len(embed_idx) - len(meta_idx),
+        "removed": len(orphans),
+    }
+
+def _diff_stages(col) -> List:
+    """
+    공통 파이프라인 단계: diff(Chroma 조회) → embed → write
+    입력 항목: dict(docs, metas, ids, source_ids, scope, ...) / 출력: 입력 항목 + diff 카운트
+    """
+    def diff(items):
+        for it in items:
+            yield it, _plan_diff(col, it["docs"], it["metas"], it["ids"], it["source_ids"], it.get("scope"))
+
+    def embed(items):
+        for it, plan in items:
+            yield it, plan, _embed_diff(plan)
+
+    def write(items):
+        for it, plan, embeds in items:
+            yield {**it, **_write_diff(col, plan, embeds)}
+
+    return [("diff", diff), ("embed", embed), ("write", write)]
 
 # ================================================================
 # PDF 인덱싱
@@ -119,46 +374,100 @@ def extract_text_pages(path: str) -> List[str]:
             pages.append(clean(p.extract_text() or ""))
     return pages
 
+def _table_lines(tables) -> str:
+    """pdfplumber 표 목록 → '헤더: 값 | ...' 줄 텍스트"""
+    rows = []
+    for tbl in tables or []:
+        header = None
+        if tbl and any(tbl[0]):
+            header = [(c or "").strip() for c in tbl[0]]
+        for i, row in enumerate(tbl):
+            if i == 0:
+                continue
+            cells = [(c or "").strip() for c in row]
+            if not any(cells):
+                continue
+            if header and len(header) == len(cells):
+                kv = [f"{header[j]}: {cells[j]}" for j in range(len(cells))]
+                rows.append(" | ".join(kv))
+            else:
+                rows.append(" | ".join(cells))
+    return "\n".join(rows)
+
 def extract_tables_as_lines(path: str) -> List[str]:
     out = []
     with pdfplumber.open(path) as pdf:
         for page in pdf.pages:
-            rows, tables = [], (page.extract_tables() or [])
-            for tbl in tables:
-                header = None
-                if tbl and any(tbl[0]):
-                    header = [(c or "").strip() for c in tbl[0]]
-                for i, row in enumerate(tbl):
-                    if i == 0:
-                        continue
-                    cells = [(c or "").strip() for c in row]
-                    if not any(cells):
-                        continue
-                    if header and len(header) == len(cells):
-                        kv = [f"{header[j]}: {cells[j]}" for j in range(len(cells))]
-                        rows.append(" | ".join(kv))
-                    else:
-                        rows.append(" | ".join(cells))
-            out.append("\n".join(rows))
+            out.append(_table_lines(page.extract_tables()))
     return out
 
-def _ingest_one_pdf(path: str) -> Dict:
-    text_pages  = extract_text_pages(path)
-    table_pages = extract_tables_as_lines(path)
-    n = max(len(text_pages), len(table_pages))
+def _likely_has_table(page) -> bool:
+    """PyMuPDF 벡터 드로잉에서 괘선(line/rect) 수로 표 존재 여부를 싸게 추정"""
+    rulings = 0
+    try:
+        for path in page.get_drawings():
+            for item in path.get("items", ()):
+                if item and item[0] in ("l", "re"):
+                    rulings += 1
+                    if rulings >= TABLE_MIN_RULINGS:
+                        return True
+    except Exception:
+        return True  # 판단 불가 → 안전하게 pdfplumber로 확인
+    return False
 
-    docs, metas, ids = [], [], []
+def extract_pages(path: str) -> List[str]:
+    """
+    단일 패스 추출: 페이지별 '본문 + 표 줄'을 병합한 텍스트 목록.
+    - PyMuPDF로 한 번 열어 본문 추출 + 괘선 검사
+    - 표가 있을 법한 페이지만 pdfplumber extract_tables() 실행(문서는 최초 필요 시 1회만 open)
+    - PyMuPDF가 없으면 기존 2패스 추출로 폴백
+    """
+    if not USE_FITZ:
+        text_pages  = extract_text_pages(path)
+        table_pages = extract_tables_as_lines(path)
+        n = max(len(text_pages), len(table_pages))
+        return [
+            "\n\n".join([
+                text_pages[i]  if i < len(text_pages)  else "",
+                table_pages[i] if i < len(table_pages) else "",
+            ]).strip()
+            for i in range(n)
+        ]
+
+    pages: List[str] = []
+    plumber = None
+    try:
+        with fitz.open(path) as doc:
+            for i, p in enumerate(doc):
+                t_text, t_table = clean(p.get_text("text")), ""
+                if _likely_has_table(p):
+                    if plumber is None:
+                        plumber = pdfplumber.open(path)
+                    if i < len(plumber.pages):
+                        t_table = _table_lines(plumber.pages[i].extract_tables())
+                pages.append("\n\n".join([t_text, t_table]).strip())
+    finally:
+        if plumber is not None:
+            plumber.close()
+    return pages
+
+def _prepare_pdf(path: str) -> Dict:
+    """본문/표 추출 → 청크 → 메타/ID 구성 (CPU 바운드, 워커 프로세스에서도 실행 가능)."""
+    t0 = time.perf_counter()
+    pages = extract_pages(path)
+    n = len(pages)
+
+    docs, metas, ids, truncated = [], [], [], 0
     basename = os.path.basename(path)
     mtime = int(os.stat(path).st_mtime)
     abspath = os.path.abspath(path)
 
-    for idx_page in range(n):
-        t_text  = text_pages[idx_page]  if idx_page < len(text_pages)  else ""
-        t_table = table_pages[idx_page] if idx_page < len(table_pages) else ""
-        merged = "\n\n".join([t_text, t_table]).strip()
+    for idx_page, merged in enumerate(pages):
         if not merged:
             continue
-        for idx, chunk in enumerate(to_chunks(split_paragraphs(merged))):
+        chunks, cut = to_chunks_counted(split_paragraphs(merged))
+        truncated += cut
+        for idx, chunk in enumerate(chunks):
             docs.append(chunk)
             metas.append({
                 "source_type": "pdf",
@@ -167,36 +476,89 @@ def _ingest_one_pdf(path: str) -> Dict:
                 "page": idx_page + 1,
                 "uri": abspath,
                 "updated_at": mtime,
-                "dataset": "규정집",
+                "dataset": PDF_DATASET,
             })
             ids.append(f"pdf::{abspath}::{idx_page+1}-{idx}")
 
-    if not ids:
-        return {"path": path, "pages": n, "chunks": 0}
+    return {"path": path, "source_id": abspath, "pages": n, "docs": docs, "metas": metas, "ids": ids,
+            "char_truncated": truncated, "prepare_ms": int((time.perf_counter() - t0) * 1000)}
 
-    model  = embedder()
-    embeds = _encode_in_batches(model, docs)
+def _pdf_result(prep: Dict) -> Dict:
+    return {"path": prep["path"], "pages": prep["pages"], "chunks": len(prep["ids"]),
+            **{k: prep[k] for k in ("added", "updated", "unchanged", "removed")},
+            "char_truncated": prep.get("char_truncated", 0),
+            "ms": prep.get("prepare_ms", 0) + int((time.perf_counter() - prep["_t_ready"]) * 1000)}
 
-    client = get_client(CHROMA_DIR)
-    col    = get_collection(client, name=COLLECTION_NAME)
+def _log_pdf(i: int, total: int, r: Dict) -> None:
+    print(f"[ingest][pdf] {i}/{total} {os.path.basename(r['path'])} chunks={r['chunks']} "
+          f"added={r['added']} unchanged={r['unchanged']} removed={r['removed']} "
+          f"char_truncated={r['char_truncated']}")
+
+def _prepared_pdfs(paths: List[str], workers: int):
+    """추출/청크 결과를 준비되는 순서대로 내보냄(workers>1이면 프로세스 풀)"""
+    def _ready(prep):
+        prep["source_ids"] = [prep["source_id"]]
+        prep["scope"] = {"source_type": "pdf"}
+        prep["_t_ready"] = time.perf_counter()
+        return prep
+
+    if workers <= 1 or len(paths) <= 1:
+        for p in paths:
+            yield _ready(_prepare_pdf(p))
+        return
+    # 파이프라인이 중간에 멈추면(close/GeneratorExit) 대기 중 작업을 취소하고 워커 프로세스를 정리
+    ex = ProcessPoolExecutor(max_workers=min(workers, len(paths)))
     try:
-        col.delete(ids=ids)
-    except Exception:
-        pass
-    col.add(documents=docs, embeddings=embeds, metadatas=metas, ids=ids)
-    return {"path": path, "pages": n, "chunks": len(docs)}
+        futs = [ex.submit(_prepare_pdf, p) for p in paths]
+        for fut in as_completed(futs):
+            yield _ready(fut.result())
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
 
-def ingest_pdfs(paths: Optional[List[str]] = None) -> Dict:
+def ingest_pdfs(paths: Optional[List[str]] = None, workers: Optional[int] = None,
+                checkpoint: Optional[Dict] = None, collection_name: Optional[str] = None) -> Dict:
+    """
+    - 추출/청크(workers>1이면 워커 프로세스) → diff → 임베딩 → 쓰기를 파이프라인으로 겹쳐 실행
+    - 임베딩/Chroma 쓰기는 현재 프로세스의 단일 writer가 담당
+    - pdf_results는 경로 정렬 순서로 반환, pipeline에는 단계별 처리량/큐 통계
+    - checkpoint: 파일별 완료 기록, 재개 시 같은 mtime으로 완료된 파일은 건너뜀
+    - collection_name: 쓰기 대상 컬렉션(None이면 ACTIVE_COLLECTION 포인터)
+    """
     if not paths:
         paths = []
         for pat in PDF_GLOBS:
             paths.extend(glob.glob(os.path.join(DATA_DIR, pat)))
     paths = sorted(set(paths))
-    results = []
-    for p in paths:
-        if os.path.exists(p):
-            results.append(_ingest_one_pdf(p))
-    return {"pdf_count": len(paths), "pdf_results": results}
+    todo = [p for p in paths if os.path.exists(p)]
+    workers = INGEST_WORKERS if workers is None else workers
+
+    results: Dict[str, Dict] = {}
+    pending = todo
+    if checkpoint is not None:
+        pending = []
+        for p in todo:
+            done = checkpoint["pdf_done"].get(os.path.abspath(p))
+            if done and done.get("mtime") == int(os.stat(p).st_mtime):
+                results[p] = {"path": p, "pages": done.get("pages", 0), "chunks": done.get("chunks", 0),
+                              "added": 0, "updated": 0, "unchanged": done.get("chunks", 0), "removed": 0,
+                              "char_truncated": done.get("char_truncated", 0), "ms": 0, "resumed": True}
+            else:
+                pending.append(p)
+
+    col = get_collection(get_client(CHROMA_DIR), name=collection_name)
+    pipe = Pipeline(_prepared_pdfs(pending, workers), _diff_stages(col), source_name="extract")
+
+    for i, prep in enumerate(pipe.run(), 1):
+        r = results[prep["path"]] = _pdf_result(prep)
+        _log_pdf(i, len(pending), r)
+        if checkpoint is not None:
+            checkpoint["pdf_done"][prep["source_id"]] = {
+                "mtime": int(os.stat(prep["path"]).st_mtime),
+                "pages": r["pages"], "chunks": r["chunks"], "char_truncated": r["char_truncated"],
+            }
+            _save_checkpoint(checkpoint)
+
+    return {"pdf_count": len(paths), "pdf_results": [results[p] for p in todo], "pipeline": pipe.stats()}
 
 # ================================================================
 # Mongo 인덱싱 (여러 컬렉션 / 증분 지원)
@@ -253,156 +615,476 @@ def _latest_ts(coll, uf: str) -> int:
     except Exception:
         return 0
 
-def _load_watermarks() -> Dict[str, int]:
+# ---- 워터마크: 컬렉션별 마지막으로 커밋된 (uf 타임스탬프, _id) 위치 ----
+# {Chroma 컬렉션(A/B): {Mongo 컬렉션: {"ts": int, "last_id": _id|None}}}
+#   쓰기 대상 Chroma 컬렉션별로 따로 기록 → 비활성 쪽 재빌드가 실패해도 활성 쪽 증분 위치는 그대로
+#   (이전 형식 {Mongo 컬렉션: ts}는 현재 활성 컬렉션 것으로 읽음)
+# (uf, _id) 오름차순으로 처리하므로 "이 위치 이후"만 읽으면 경계 타임스탬프를 공유하는
+# 아직 처리 안 된 문서(날짜만 있는 작성일 등)도 빠지지 않음
+def _id_json(v):
+    """_id → JSON 저장값(ObjectId 등은 문자열, int/str은 그대로)"""
+    return v if isinstance(v, (int, str)) else str(v)
+
+def _id_value(v):
+    return ObjectId(v) if isinstance(v, str) and ObjectId.is_valid(v) else v
+
+def _after_position(uf: str, pos: Dict) -> Dict:
+    """
+    pos 이후 문서 조건
+    - last_id 있음: uf > ts 또는 (uf == ts 이고 _id > last_id)
+    - last_id 없음(이전 형식): uf >= ts (경계 초는 다시 읽고 diff에서 unchanged 처리)
+    """
+    ts = datetime.datetime.fromtimestamp(pos["ts"])
+    if pos.get("last_id") is None:
+        return {uf: {"$gte": ts}}
+    return {"$or": [{uf: {"$gt": ts}}, {uf: ts, "_id": {"$gt": _id_value(pos["last_id"])}}]}
+
+def _and_query(q: Dict, cond: Dict) -> Dict:
+    return {"$and": [q, cond]} if q else cond
+
+def _is_position(v) -> bool:
+    return not isinstance(v, dict) or "ts" in v
+
+def _read_watermarks() -> Dict[str, Dict]:
     try:
         with open(_WATERMARK, "r", encoding="utf-8") as f:
-            return json.load(f)
+            raw = json.load(f)
     except Exception:
         return {}
+    by_col = {k: v for k, v in raw.items() if not _is_position(v)}
+    legacy = {k: v for k, v in raw.items() if _is_position(v)}
+    if legacy:
+        by_col.setdefault(active_collection_name(), {}).update(legacy)
+    return by_col
+
+def _load_watermarks(target: str) -> Dict[str, Dict]:
+    wm = _read_watermarks().get(target) or {}
+    return {c: v if isinstance(v, dict) else {"ts": int(v), "last_id": None} for c, v in wm.items()}
 
-def _save_watermarks(wm: Dict[str, int]) -> None:
+def _advance(wm: Dict[str, Dict], cname: str, ts: int, last_id) -> bool:
+    """커밋된 윈도우의 마지막 위치로 워터마크 전진(뒤로 가지 않음)"""
+    if not ts or ts < (wm.get(cname) or {}).get("ts", 0):
+        return False
+    wm[cname] = {"ts": int(ts), "last_id": _id_json(last_id) if last_id is not None else None}
+    return True
+
+def _write_watermarks(by_col: Dict[str, Dict]) -> None:
     os.makedirs(CHROMA_DIR, exist_ok=True)
-    with open(_WATERMARK, "w", encoding="utf-8") as f:
-        json.dump(wm, f, ensure_ascii=False, indent=2)
+    tmp = _WATERMARK + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(by_col, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, _WATERMARK)
+
+def _save_watermarks(target: str, wm: Dict[str, Dict]) -> None:
+    by_col = _read_watermarks()
+    by_col[target] = wm
+    _write_watermarks(by_col)
+
+def _reset_watermarks(target: str) -> None:
+    """대상 컬렉션을 비우고 다시 만들 때 그 컬렉션의 워터마크도 삭제"""
+    by_col = _read_watermarks()
+    if by_col.pop(target, None) is not None:
+        _write_watermarks(by_col)
+
+# ---- 체크포인트 (ingest_all 중단 후 재개용) ----
+# {"pdf_done": {abspath: {"mtime", "pages", "chunks"}},
+#  "mongo": {컬렉션: {"last_id", "ts", "done"}}}   (ts, last_id) = 마지막 커밋 윈도우의 (uf, _id) 위치
+def _load_checkpoint() -> Dict:
+    try:
+        with open(_CHECKPOINT, "r", encoding="utf-8") as f:
+            cp = json.load(f)
+    except Exception:
+        cp = {}
+    cp.setdefault("pdf_done", {})
+    cp.setdefault("mongo", {})
+    return cp
+
+def _save_checkpoint(cp: Dict) -> None:
+    os.makedirs(CHROMA_DIR, exist_ok=True)
+    tmp = _CHECKPOINT + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cp, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, _CHECKPOINT)
+
+def _clear_checkpoint() -> None:
+    try:
+        os.remove(_CHECKPOINT)
+    except FileNotFoundError:
+        pass
+
+def _resume_query(q: Dict, uf: str, state: Dict, since: Optional[Dict] = None) -> Dict:
+    """
+    마지막 커밋 위치 이후부터 읽도록 쿼리 구성((uf, _id) 오름차순 처리 기준)
+    - 체크포인트 위치(state)와 증분 워터마크(since) 중 더 뒤 위치 이후만 읽음
+      uf > ts 또는 (uf == ts 이고 _id > last_id) → 경계 타임스탬프를 공유하는 미처리 문서도 읽음
+      (증분 조건 uf > 워터마크와 합치면 사실상 uf > ts가 되어 경계 문서가 빠지므로 대체)
+    - uf 타임스탬프 없이 _id만 기록됐으면 _id 기준
+    """
+    ts, last_id = state.get("ts") or 0, state.get("last_id")
+    if since and since.get("ts", 0) > ts:
+        return _and_query(q, _after_position(uf, since))
+    if ts:
+        return _and_query(q, _after_position(uf, {"ts": ts, "last_id": last_id}))
+    if since:
+        return _and_query(q, _after_position(uf, since))
+    if last_id is not None:
+        return _and_query(q, {"_id": {"$gt": _id_value(last_id)}})
+    return q
+
+TEXT_FIELD_CANDIDATES = (
+    "title","subject","content","body","summary","text","desc","description",
+    "content_html","html","markdown",
+    "내용","본문","요약","설명","비고","세부내용","공지내용",
+    "content_list","details",
+)
+
+def _projection(uf: str) -> Dict[str, int]:
+    """본문 후보 + 타임스탬프/URL 필드만 가져오도록 projection 구성"""
+    fields = set(TEXT_FIELD_CANDIDATES) | {uf, "작성일", "url", "link"}
+    return {f: 1 for f in fields}
+
+def _record_chunks(cname: str, uf: str, rec: Dict):
+    """Mongo 문서 1건 → (docs, metas, ids, char_truncated). 본문이 없으면 빈 리스트, 0"""
+    # --- 본문 구성 ---
+    parts = []
+
+    ttl = rec.get("title") or rec.get("subject")
+    if isinstance(ttl, str) and ttl.strip():
+        parts.append(f"제목: {ttl.strip()}")
+
+    if isinstance(rec.get("content_list"), list) and rec["content_list"]:
+        parts.append(_flatten_texts(rec["content_list"]))
+    if isinstance(rec.get("details"), dict) and rec["details"]:
+        parts.append(_flatten_texts(rec["details"]))
+
+    for k in TEXT_FIELD_CANDIDATES:
+        if k in ("content_list", "details"):
+            continue
+        v = rec.get(k)
+        if isinstance(v, str) and v.strip():
+            parts.append(v.strip())
+        elif isinstance(v, (list, dict)):
+            s = _flatten_texts(v)
+            if s:
+                parts.append(s)
+
+    if not any(parts):
+        return [], [], [], 0
+
+    full_text = "\n\n".join(parts)
+
+    # --- 타임스탬프/URI ---
+    ts = _coerce_ts(rec.get(uf))
+    if ts is None:
+        ts = _coerce_ts(rec.get("작성일"))
+    if ts is None:
+        ts = int(rec["_id"].generation_time.timestamp())
+    uri = rec.get("url") or rec.get("link") or ""
+
+    # --- 청크 & 메타/ID ---
+    docs, metas, ids = [], [], []
+    rid = str(rec.get("_id"))
+    chunks, truncated = to_chunks_counted(split_paragraphs(full_text))
+    for idx, chunk in enumerate(chunks):
+        docs.append(chunk)
+        metas.append(_sanitize_meta({
+            "source_type": "mongo",
+            "source_id": rid,
+            "title": (ttl or cname) or "",
+            "page": 0,
+            "uri": uri or "",
+            "updated_at": int(ts),
+            "dataset": cname or "",
+        }))
+        ids.append(f"mongo::{cname}::{rid}::{idx}")
+    return docs, metas, ids, truncated
+
+def _iter_batches(cur, size: int):
+    """커서 → 원본 문서 배치(list). 파이프라인의 fetch 단계(네트워크 I/O)"""
+    batch = []
+    for rec in cur:
+        batch.append(rec)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _iter_windows(recs, cname: str, uf: str, window: int):
+    """
+    문서 스트림을 청크로 바꿔 청크 수가 window 이상이 되면 묶어서 내보냄.
+    문서 1건의 청크는 항상 같은 윈도우에 들어감(diff 정확성 보장).
+    yield: dict(docs, metas, ids, source_ids, scope, max_ts, max_id, last_id, char_truncated)
+           (max_ts, max_id) = 윈도우에서 uf 타임스탬프가 가장 큰(정렬상 마지막) 문서의 위치
+    """
+    scope = {"source_type": "mongo", "dataset": cname or ""}
+    docs, metas, ids, seen, max_ts, max_id, last, cut = [], [], [], [], 0, None, None, 0
+    for rec in recs:
+        last = rec.get("_id")
+        # 텍스트가 사라진 문서의 옛 청크도 정리되도록 조회된 모든 _id를 기록
+        seen.append(str(rec.get("_id")))
+        ts = _coerce_ts(rec.get(uf))
+        if ts and ts >= max_ts:
+            max_ts, max_id = ts, rec.get("_id")
+        d, m, i, c = _record_chunks(cname, uf, rec)
+        docs.extend(d); metas.extend(m); ids.extend(i); cut += c
+        if len(ids) >= window:
+            yield {"docs": docs, "metas": metas, "ids": ids, "source_ids": seen, "scope": scope,
+                   "max_ts": max_ts, "max_id": max_id, "last_id": last, "char_truncated": cut}
+            docs, metas, ids, seen, cut = [], [], [], [], 0
+    if seen:
+        yield {"docs": docs, "metas": metas, "ids": ids, "source_ids": seen, "scope": scope,
+               "max_ts": max_ts, "max_id": max_id, "last_id": last, "char_truncated": cut}
+
+def _dedup_stage(index: NearDupIndex, merges: Dict[str, set], cross: Optional[NearDupIndex] = None):
+    """
+    윈도우에서 근사 중복 청크를 제거하고 대표 청크에 합칠 출처(source_id)를 기록.
+    index는 컬렉션(dataset)별 → dataset 필터/컬렉션 purge가 다른 컬렉션 내용에 영향을 주지 않음.
+    cross(호출 1회 전체 공유)는 집계만: 다른 컬렉션 청크와 겹쳐도 남긴 청크 수(cross.duplicates)
+    윈도우의 source_ids는 유지 → 중복으로 빠진 청크가 이전에 저장돼 있었다면 orphan으로 삭제됨
+    """
+    def dedup(windows):
+        for w in windows:
+            keep = []
+            for j, (doc, meta, cid) in enumerate(zip(w["docs"], w["metas"], w["ids"])):
+                sig = index.signature(doc)
+                canon = index.match_or_add(cid, doc, sig)
+                if canon is None:
+                    keep.append(j)
+                    if cross is not None:
+                        cross.match_or_add(cid, doc, sig)
+                    continue
+                merges.setdefault(canon, set()).add(meta.get("source_id", ""))
+            if len(keep) != len(w["ids"]):
+                w = {**w,
+                     "docs": [w["docs"][j] for j in keep],
+                     "metas": [w["metas"][j] for j in keep],
+                     "ids": [w["ids"][j] for j in keep]}
+            yield w
+    return dedup
 
-def ingest_mongo_all(query: Optional[Dict] = None, limit: Optional[int] = None) -> Dict:
+def _apply_provenance(col, merges: Dict[str, set]) -> int:
+    """대표 청크 메타에 중복 출처 source_id를 'a|b' 문자열로 병합 (Chroma 메타는 스칼라만 허용)"""
+    cids = sorted(merges)
+    updated = 0
+    for i in range(0, len(cids), _DIFF_GET_BATCH):
+        got = col.get(ids=cids[i:i + _DIFF_GET_BATCH], include=["metadatas"])
+        ids, metas = [], []
+        for cid, meta in zip(got.get("ids") or [], got.get("metadatas") or []):
+            meta = dict(meta or {})
+            meta.pop("datasets", None)  # 이전(컬렉션 간 통합) 형식
+            sources = {meta.get("source_id", "")} | set(filter(None, meta.get("source_ids", "").split("|"))) | merges[cid]
+            meta["source_ids"] = "|".join(sorted(filter(None, sources)))
+            ids.append(cid); metas.append(meta)
+        if ids:
+            col.update(ids=ids, metadatas=metas)
+            updated += len(ids)
+    return updated
+
+def ingest_mongo_all(query: Optional[Dict] = None, limit: Optional[int] = None,
+                     collections: Optional[List[str]] = None, checkpoint: Optional[Dict] = None,
+                     collection_name: Optional[str] = None, full: bool = False) -> Dict:
     """
-    - DB 내 여러(또는 모든) 컬렉션 순회 → 본문 구성 → 청크 → 임베딩(배치) → upsert
-    - MONGO_INCREMENTAL=true면 컬렉션별 워터마크 기반 증분 인덱싱
-    - 컬렉션 단위로 한 번만 col.add() 호출
+    - collections 지정 시 해당 컬렉션만, 아니면 MONGO_COLL 기준 컬렉션 순회
+    - 커서를 MONGO_BATCH_SIZE 단위로 스트리밍(본문/타임스탬프/URL 필드만 projection)
+    - 청크가 MONGO_WINDOW개 모일 때마다 diff 임베딩/쓰기 → 메모리 사용량이 컬렉션 크기와 무관
+    - fetch → chunk → diff → embed → write 단계를 bounded queue 파이프라인으로 겹쳐 실행
+    - MONGO_INCREMENTAL=true면 컬렉션별 워터마크 기반 증분 인덱싱,
+      워터마크는 윈도우가 커밋될 때마다 그 윈도우의 마지막 (uf, _id) 위치로 전진((uf, _id) 오름차순 처리)
+    - DEDUP=true면 같은 컬렉션 안의 근사 중복 청크를 하나의 벡터로 통합(대표 청크 메타에 source_ids 병합)
+      컬렉션 간에는 통합하지 않음 → dataset 필터/파티션/purge/답변 캐시 무효화가 컬렉션 단위로 정확
+    - limit: 컬렉션별 최대 처리 문서 수(오름차순 기준이므로 증분 모드에서는 '다음 N건')
+    - checkpoint: 윈도우 커밋마다 마지막 _id/타임스탬프 기록, 완료 컬렉션은 재개 시 건너뜀
+    - collection_name: 쓰기 대상 컬렉션(None이면 ACTIVE_COLLECTION 포인터)
+    - full=True: 워터마크를 무시하고 전체를 읽음(빈 컬렉션으로 재빌드할 때), 워터마크 전진은 동일
+    - 워터마크는 쓰기 대상 컬렉션별로 기록 → 비활성 쪽 재빌드가 실패해도 활성 쪽 증분 위치는 전진하지 않음
     """
     db = _connect_db()
     results, total_docs = [], 0
-    wm = _load_watermarks() if MONGO_INCREMENTAL else {}
-
-    TEXT_FIELD_CANDIDATES = (
-        "title","subject","content","body","summary","text","desc","description",
-        "content_html","html","markdown",
-        "내용","본문","요약","설명","비고","세부내용","공지내용",
-        "content_list","details",
-    )
+    target = collection_name or active_collection_name()
+    wm = _load_watermarks(target) if MONGO_INCREMENTAL else {}
+    col = get_collection(get_client(CHROMA_DIR), name=target)
+    # 근사 중복 인덱스는 호출 1회, 컬렉션별(통합) + 전체 공유(컬렉션 간 중복 집계만)
+    dup_stats = {"chunks_seen": 0, "duplicates": 0}
+    merges: Dict[str, set] = {}
+    cross_index = NearDupIndex(threshold=DEDUP_THRESHOLD) if DEDUP else None
 
-    for cname in _collection_names(db):
+    for cname in (collections if collections is not None else _collection_names(db)):
+        t0   = time.perf_counter()
         coll = db[cname]
         uf   = _updated_field_for(cname)
+        state = checkpoint["mongo"].setdefault(cname, {}) if checkpoint is not None else None
+        if state and state.get("done"):
+            results.append({"collection": cname, "ingested": 0, "resumed": True, "skipped": "checkpoint_done"})
+            continue
 
         # 증분 쿼리 결합
         q = dict(query or {})
-        since = wm.get(cname, 0)
-        if MONGO_INCREMENTAL and since:
-            q[uf] = {"$gt": datetime.datetime.fromtimestamp(since)}
+        since = wm.get(cname) if MONGO_INCREMENTAL and not full else None
+        if state:
+            q = _resume_query(q, uf, state, since)
+        elif since:
+            q = _and_query(q, _after_position(uf, since))
 
-        cur = coll.find(q)
+        cur = coll.find(q, projection=_projection(uf), batch_size=MONGO_BATCH_SIZE)
         try:
-            cur = cur.sort([(uf, -1)])
+            cur = cur.sort([(uf, 1), ("_id", 1)])
         except Exception:
-            cur = cur.sort([("_id", -1)])
+            cur = cur.sort([("_id", 1)])
         if limit:
             cur = cur.limit(limit)
 
-        docs, metas, ids = [], [], []
-
-        for rec in cur:
-            # --- 본문 구성 ---
-            parts = []
-
-            ttl = rec.get("title") or rec.get("subject")
-            if isinstance(ttl, str) and ttl.strip():
-                parts.append(f"제목: {ttl.strip()}")
-
-            if isinstance(rec.get("content_list"), list) and rec["content_list"]:
-                parts.append(_flatten_texts(rec["content_list"]))
-            if isinstance(rec.get("details"), dict) and rec["details"]:
-                parts.append(_flatten_texts(rec["details"]))
-
-            for k in TEXT_FIELD_CANDIDATES:
-                if k in ("content_list", "details"):
-                    continue
-                v = rec.get(k)
-                if isinstance(v, str) and v.strip():
-                    parts.append(v.strip())
-                elif isinstance(v, (list, dict)):
-                    s = _flatten_texts(v)
-                    if s:
-                        parts.append(s)
-
-            if not any(parts):
-                continue
+        def chunk(batches, cname=cname, uf=uf):
+            recs = (rec for batch in batches for rec in batch)
+            return _iter_windows(recs, cname, uf, MONGO_WINDOW)
 
-            full_text = "\n\n".join(parts)
-
-            # --- 타임스탬프/URI ---
-            ts = _coerce_ts(rec.get(uf))
-            if ts is None:
-                ts = _coerce_ts(rec.get("작성일"))
-            if ts is None:
-                ts = int(rec["_id"].generation_time.timestamp())
-            uri = rec.get("url") or rec.get("link") or ""
-
-            # --- 청크 & 메타/ID ---
-            for idx, chunk in enumerate(to_chunks(split_paragraphs(full_text))):
-                docs.append(chunk)
-                metas.append(_sanitize_meta({
-                    "source_type": "mongo",
-                    "source_id": str(rec.get("_id")),
-                    "title": (ttl or cname) or "",
-                    "page": 0,
-                    "uri": uri or "",
-                    "updated_at": int(ts),
-                    "dataset": cname or "",
-                }))
-                ids.append(f"mongo::{cname}::{str(rec.get('_id'))}::{idx}")
-
-        # --- 컬렉션 단위 upsert ---
-        n_docs, n_ids, n_meta = len(docs), len(ids), len(metas)
-        if n_docs == 0 or n_ids == 0 or n_meta == 0:
-            results.append({"collection": cname, "ingested": 0, "latest_ts": _latest_ts(coll, uf)})
-            # 증분 모드면 워터마크 최신화(신규 없음 케이스)
-            if MONGO_INCREMENTAL:
-                latest = _latest_ts(coll, uf)
-                if latest:
-                    wm[cname] = max(wm.get(cname, 0), latest)
-            continue
+        stages = [("chunk", chunk)]
+        dup_index = NearDupIndex(threshold=DEDUP_THRESHOLD) if DEDUP else None
+        if dup_index is not None:
+            stages.append(("dedup", _dedup_stage(dup_index, merges, cross_index)))
+        pipe = Pipeline(_iter_batches(cur, MONGO_BATCH_SIZE), [*stages, *_diff_stages(col)])
 
-        if not (n_docs == n_ids == n_meta):
-            min_n = min(n_docs, n_ids, n_meta)
-            docs, ids, metas = docs[:min_n], ids[:min_n], metas[:min_n]
+        ing_cnt, windows, truncated = 0, 0, 0
+        diff = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+        for win in pipe.run():
+            for k in diff:
+                diff[k] += win[k]
+            ing_cnt += len(win["docs"])
+            truncated += win["char_truncated"]
+            windows += 1
+            # 커밋된 윈도우까지 워터마크/체크포인트 전진
+            if MONGO_INCREMENTAL and _advance(wm, cname, win["max_ts"], win["max_id"]):
+                _save_watermarks(target, wm)
+            if state is not None:
+                # 워터마크와 같은 (uf, _id) 위치, uf가 없는 문서 구간이면 _id만
+                if win["max_ts"]:
+                    state.update({"ts": win["max_ts"], "last_id": _id_json(win["max_id"])})
+                elif not state.get("ts"):
+                    state["last_id"] = _id_json(win["last_id"])
+                _save_checkpoint(checkpoint)
 
-        model  = embedder()
-        embeds = _encode_in_batches(model, docs)
+        total_docs += ing_cnt
+        if dup_index is not None:
+            dup_stats["chunks_seen"] += dup_index.seen
+            dup_stats["duplicates"] += dup_index.duplicates
+        latest = _latest_ts(coll, uf)
+        results.append({"collection": cname, "ingested": ing_cnt, "latest_ts": latest, **diff,
+                        "char_truncated": truncated, "windows": windows, "ms": int((time.perf_counter() - t0) * 1000),
+                        "pipeline": pipe.stats()})
+        if state is not None:
+            state["done"] = True
+            _save_checkpoint(checkpoint)
 
-        client = get_client(CHROMA_DIR)
-        col    = get_collection(client, name=COLLECTION_NAME)
-        try:
-            col.delete(ids=ids)
-        except Exception:
-            pass
-        col.add(documents=docs, embeddings=embeds, metadatas=metas, ids=ids)
+        if windows:
+            print(f"[ingest][{cname}] docs={ing_cnt} windows={windows} added={diff['added']} "
+                  f"unchanged={diff['unchanged']} removed={diff['removed']} char_truncated={truncated}")
 
-        ing_cnt = len(docs)
-        total_docs += ing_cnt
-        results.append({"collection": cname, "ingested": ing_cnt, "latest_ts": _latest_ts(coll, uf)})
+    if MONGO_INCREMENTAL:
+        _save_watermarks(target, wm)
 
-        # 워터마크 갱신
-        if MONGO_INCREMENTAL:
-            latest = _latest_ts(coll, uf)
-            if latest:
-                wm[cname] = max(wm.get(cname, 0), latest)
+    out = {"mongo_collections": results, "mongo_total": total_docs}
+    if DEDUP:
+        seen = dup_stats["chunks_seen"]
+        out["dedup"] = {**dup_stats, "dedup_ratio": round(dup_stats["duplicates"] / seen, 4) if seen else 0.0,
+                        "cross_dataset_kept": cross_index.duplicates,
+                        "merged_into": _apply_provenance(col, merges) if merges else 0}
+        print(f"[ingest][dedup] {out['dedup']}")
+    return out
 
-        print(f"[ingest][{cname}] docs={len(docs)} ids={len(ids)} metas={len(metas)}")
+# ================================================================
+# 소스 삭제 (원본에서 사라진 PDF/컬렉션 정리)
+# ================================================================
+def purge_pdf(path: str, collection_name: Optional[str] = None) -> None:
+    col = get_collection(get_client(CHROMA_DIR), name=collection_name)
+    col.delete(where={"source_id": os.path.abspath(path)})
 
+def purge_mongo_collection(cname: str, collection_name: Optional[str] = None) -> None:
+    target = collection_name or active_collection_name()
+    col = get_collection(get_client(CHROMA_DIR), name=target)
+    col.delete(where={"$and": [{"source_type": "mongo"}, {"dataset": cname}]})
     if MONGO_INCREMENTAL:
-        _save_watermarks(wm)
+        wm = _load_watermarks(target)
+        if wm.pop(cname, None) is not None:
+            _save_watermarks(target, wm)
 
-    return {"mongo_collections": results, "mongo_total": total_docs}
+# ================================================================
+# NumPy 검색 인덱스 export (SEARCH_ENGINE=numpy용)
+# ================================================================
+def export_np_index(collection_name: Optional[str] = None) -> Optional[Dict]:
+    """NP_INDEX_EXPORT=true면 컬렉션을 mmap 행렬로 내보냄(실패해도 인덱싱 결과에는 영향 없음)"""
+    if not NP_INDEX_EXPORT:
+        return None
+    try:
+        return export_index(collection_name)
+    except Exception as e:
+        print(f"[ingest][np_index] export failed: {e}")
+        return {"error": str(e)}
 
 # ================================================================
 # 통합 인덱싱 (PDF + Mongo)
 # ================================================================
-def ingest_all(pdf_paths: Optional[List[str]] = None, mongo_query: Optional[Dict] = None) -> Dict:
-    res_pdf = ingest_pdfs(pdf_paths)
+def ingest_all(pdf_paths: Optional[List[str]] = None, mongo_query: Optional[Dict] = None,
+               collection_name: Optional[str] = None, full: bool = False) -> Dict:
+    """
+    PDF + Mongo 전체 인덱싱.
+    INGEST_RESUME=true면 PDF 파일/Mongo 윈도우 단위로 체크포인트를 남기고,
+    이전 실행이 중간에 죽었다면 완료된 작업은 건너뛰고 이어서 진행.
+    (체크포인트는 대상 컬렉션 이름을 함께 기록, 다른 컬렉션 대상이면 버리고 처음부터)
+    모두 성공하면 체크포인트 삭제.
+    """
+    target = collection_name or active_collection_name()
+    cp = _load_checkpoint() if INGEST_RESUME else None
+    if cp is not None and cp.get("collection") not in (None, target):
+        cp = {"pdf_done": {}, "mongo": {}}
+    if cp is not None:
+        cp["collection"] = target
+    resumed = bool(cp and (cp["pdf_done"] or cp["mongo"]))
+    if resumed:
+        print(f"[ingest] resume from checkpoint: pdf_done={len(cp['pdf_done'])} mongo={list(cp['mongo'])}")
+
+    res_pdf = ingest_pdfs(pdf_paths, checkpoint=cp, collection_name=target)
     try:
-        res_mongo = ingest_mongo_all(mongo_query)
+        res_mongo = ingest_mongo_all(mongo_query, checkpoint=cp, collection_name=target, full=full)
     except Exception as e:
         res_mongo = {"mongo_error": str(e)}
-    return {"pdf": res_pdf, "mongo": res_mongo}
+
+    if cp is not None and "mongo_error" not in res_mongo:
+        _clear_checkpoint()
+    return {"pdf": res_pdf, "mongo": res_mongo, "resumed": resumed, "collection": target,
+            "np_index": export_np_index(target), "embed_cache": cache_stats()}
+
+# ================================================================
+# 무중단 재빌드 (blue/green: school_corpus_A ↔ school_corpus_B)
+# ================================================================
+def rebuild_index(pdf_paths: Optional[List[str]] = None, mongo_query: Optional[Dict] = None) -> Dict:
+    """
+    비활성 컬렉션에 전체 인덱스를 새로 만들고, 성공하면 ACTIVE_COLLECTION 포인터를 원자적으로 교체.
+    - 재빌드 중에도 질의는 기존(활성) 컬렉션을 그대로 사용
+    - 같은 대상으로 중단된 재빌드의 체크포인트가 있으면 이어서, 아니면 대상 컬렉션을 비우고 시작
+    - 이전 컬렉션은 RAG_SWAP_GRACE_S 뒤 삭제(진행 중 질의 보호),
+      그 전에 다시 재빌드가 시작되면 삭제 예약을 취소하고 그 컬렉션에 재빌드
+    - Mongo 실패 시 포인터를 바꾸지 않음(이전 인덱스로 계속 서비스)
+    """
+    t0 = time.perf_counter()
+    client = get_client(CHROMA_DIR)
+    old, target = active_collection_name(), inactive_collection_name()
+
+    cp = _load_checkpoint() if INGEST_RESUME else {}
+    reset = cp.get("collection") != target
+    # 이전 스왑에서 예약된 target 삭제를 취소하고 재빌드 동안 삭제 금지
+    begin_rebuild(client, target, reset=reset)
+    try:
+        if reset:
+            _reset_watermarks(target)
+        res = ingest_all(pdf_paths, mongo_query, collection_name=target, full=True)
+        swapped = "mongo_error" not in res["mongo"]
+        if swapped:
+            set_active_name(target)
+            drop_collection_later(client, old)
+            print(f"[ingest][swap] {old} -> {target}")
+        else:
+            print(f"[ingest][swap] skipped, keep {old}: {res['mongo']['mongo_error']}")
+    finally:
+        end_rebuild(target)
+    return {**res, "previous": old, "active": target if swapped else old, "swapped": swapped,
+            "rebuild_ms": int((time.perf_counter() - t0) * 1000)}
@@ -0,0 +1,178 @@
+# ai/rag/microbatch.py
+# ================================================================
+# 역할
+# - 동시 요청의 질의 임베딩을 모아서 한 번에 encode하는 마이크로 배처
+#   · 첫 요청이 들어온 뒤 최대 max_wait_ms 동안, 또는 max_batch건이 모일 때까지 수집
+#   · 워커 스레드 1개가 배치 함수를 실행하고 각 호출자에게 자기 결과를 돌려줌
+# - FastAPI threadpool(동기 엔드포인트)에서 호출하는 것을 전제로 한 blocking API
+# - 배치 크기 분포 / 추가된 큐 대기 시간 통계 제공
+#
+# 환경변수
+# - QUERY_BATCH=true|false      (마이크로 배칭 on/off)
+# - QUERY_BATCH_MAX=32          (배치 최대 건수)
+# - QUERY_BATCH_WAIT_MS=2       (첫 요청 이후 최대 대기(ms))
+# ================================================================
+from __future__ import annotations
+
+import os, queue, threading, time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Sequence
+
+QUERY_BATCH = os.getenv("QUERY_BATCH", "true").lower() == "true"
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "32"))
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "2"))
+
+# 배치 크기 분포 구간(상한 포함)
+_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+_DELAY_WINDOW = 2048  # 분위수 계산용 최근 대기 시간 샘플 수
+
+
+class _Item:
+    __slots__ = ("value", "future", "t_enq")
+
+    def __init__(self, value):
+        self.value = value
+        self.future: Future = Future()
+        self.t_enq = time.monotonic()
+
+
+class MicroBatcher:
+    def __init__(self, fn: Callable[[List], Sequence], max_batch: int = QUERY_BATCH_MAX,
+                 max_wait_ms: float = QUERY_BATCH_WAIT_MS, name: str = "microbatch"):
+        """
+        fn: 입력 리스트 → 같은 길이·순서의 결과 시퀀스(예: model.encode)
+        """
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._q: "queue.Queue[_Item]" = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # 통계(워커 스레드만 갱신, stats()는 스냅샷 읽기)
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self.size_hist = {b: 0 for b in _BUCKETS}
+        self.size_hist["more"] = 0
+        self.delay_sum_s = 0.0
+        self.delay_max_s = 0.0
+        self._delays = deque(maxlen=_DELAY_WINDOW)
+
+    # ---- 호출 측 ----
+    def submit_many(self, values: Sequence) -> List:
+        """values 각각을 큐에 넣고 결과가 나올 때까지 대기(입력 순서대로 반환)"""
+        self._ensure_worker()
+        items = [_Item(v) for v in values]
+        for it in items:
+            self._q.put(it)
+        return [it.future.result() for it in items]
+
+    def submit(self, value):
+        return self.submit_many([value])[0]
+
+    # ---- 워커 ----
+    def _ensure_worker(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                t = threading.Thread(target=self._run, name=f"{self.name}-worker", daemon=True)
+                t.start()
+                self._thread = t
+
+    def _collect(self) -> List[_Item]:
+        first = self._q.get()
+        batch = [first]
+        deadline = first.t_enq + self.max_wait_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                # 이미 쌓인 요청은 대기 시간이 지났어도 한도까지 함께 처리
+                batch.append(self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            t_start = time.monotonic()
+            try:
+                out = self.fn([it.value for it in batch])
+                if len(out) != len(batch):
+                    raise RuntimeError(f"{self.name}: batch fn returned {len(out)} results for {len(batch)} inputs")
+                for it, r in zip(batch, out):
+                    it.future.set_result(r)
+                ok = True
+            except BaseException as e:
+                for it in batch:
+                    if not it.future.done():
+                        it.future.set_exception(e)
+                ok = False
+            self._record(batch, t_start, ok)
+
+    def _record(self, batch: List[_Item], t_start: float, ok: bool) -> None:
+        n = len(batch)
+        with self._stats_lock:
+            self.batches += 1
+            self.items += n
+            if not ok:
+                self.failures += 1
+            for b in _BUCKETS:
+                if n <= b:
+                    self.size_hist[b] += 1
+                    break
+            else:
+                self.size_hist["more"] += 1
+            for it in batch:
+                d = t_start - it.t_enq
+                self.delay_sum_s += d
+                self.delay_max_s = max(self.delay_max_s, d)
+                self._delays.append(d)
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            delays = sorted(self._delays)
+
+            def pct(p):
+                return round(delays[min(len(delays) - 1, int(p * len(delays)))] * 1000, 3) if delays else 0.0
+
+            return {
+                "name": self.name,
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait_s * 1000,
+                "batches": self.batches,
+                "items": self.items,
+                "failures": self.failures,
+                "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "batch_size_hist": {f"<={b}" if b != "more" else f">{_BUCKETS[-1]}": c
+                                    for b, c in self.size_hist.items()},
+                "queue_delay_ms": {
+                    "avg": round(self.delay_sum_s / self.items * 1000, 3) if self.items else 0.0,
+                    "p50": pct(0.50),
+                    "p95": pct(0.95),
+                    "max": round(self.delay_max_s * 1000, 3),
+                },
+                "pending": self._q.qsize(),
+            }
+
+
+# 이름별 배처 등록(디버그 통계 일괄 조회용)
+_batchers: Dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+def get_batcher(name: str, fn: Callable[[List], Sequence]) -> MicroBatcher:
+    """name별 싱글톤, 최초 호출의 fn으로 생성"""
+    b = _batchers.get(name)
+    if b is None:
+        with _batchers_lock:
+            b = _batchers.get(name)
+            if b is None:
+                b = _batchers[name] = MicroBatcher(fn, name=name)
+    return b
+
+def batcher_stats() -> Dict:
+    return {"enabled": QUERY_BATCH, "batchers": [b.stats() for b in list(_batchers.values())]}
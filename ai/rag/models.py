@@ -0,0 +1,80 @@
+# ai/rag/models.py
+# ================================================================
+# 역할
+# - 프로세스 단위 모델 레지스트리: 키별로 모델을 1번만, 처음 쓸 때 로드
+#   · 키별 락 + double-checked → 동시 요청이 같은 모델을 두 번 로드하지 않음
+#   · 다른 키의 로드는 서로 막지 않음
+# - rag.ingest.embedder() / rag.retriever / rag.app(/rag/chat·/rag/preview·FAQ)가 모두 이 레지스트리의
+#   같은 임베더(EMBEDDER_KEY)를 사용 → 프로세스당 트랜스포머 1개
+# - 모델별 로드 시간 / 로드 전후 상주 메모리(RSS) 증가량 기록 → /rag/debug/models
+#   (이전 구조와 비교: cd ai && python -m rag.bench_models)
+# ================================================================
+from __future__ import annotations
+
+import os, threading, time
+from typing import Any, Callable, Dict, Optional
+
+_models: Dict[str, Any] = {}
+_info: Dict[str, Dict] = {}
+_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def rss_bytes() -> int:
+    """현재 프로세스 상주 메모리(bytes). /proc 없으면 최대 RSS로 대체"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource, sys
+        ru = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return ru if sys.platform == "darwin" else ru * 1024
+    except Exception:
+        return 0
+
+
+def get_model(key: str, loader: Callable[[], Any],
+              on_load: Optional[Callable[[Any], None]] = None) -> Any:
+    """key의 모델 반환(없으면 loader()로 1회 로드, 로드 직후 on_load(model) 호출)"""
+    m = _models.get(key)
+    if m is not None:
+        return m
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        m = _models.get(key)
+        if m is not None:
+            return m
+        rss0, t0 = rss_bytes(), time.perf_counter()
+        m = loader()
+        _info[key] = {
+            "load_ms": int((time.perf_counter() - t0) * 1000),
+            "rss_delta_mb": round((rss_bytes() - rss0) / 2**20, 1),
+            "loaded_at": int(time.time()),
+        }
+        if on_load is not None:
+            on_load(m)
+        _models[key] = m
+        print(f"[models][load] {key} {_info[key]}")
+        return m
+
+
+def unload(key: str) -> bool:
+    """레지스트리에서 제거(다음 get_model에서 다시 로드)"""
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        _info.pop(key, None)
+        return _models.pop(key, None) is not None
+
+
+def model_stats() -> Dict:
+    return {
+        "pid": os.getpid(),
+        "rss_mb": round(rss_bytes() / 2**20, 1),
+        "models": {k: dict(v) for k, v in _info.items()},
+    }
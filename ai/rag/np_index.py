@@ -0,0 +1,366 @@
+# ai/rag/np_index.py
+# ================================================================
+# 역할
+# - 활성 Chroma 컬렉션을 memory-map 가능한 NumPy 파일로 내보내고(export_index),
+#   정확한 brute-force top-k 검색을 제공하는 대체 검색 엔진(SEARCH_ENGINE=numpy)
+#   · vectors.npy   (N, dim) float32(기본) — 정규화된 임베딩
+#   · ids.npy       (N,) 고정 길이 유니코드
+#   · docs.bin / docs_off.npy, metas.bin / metas_off.npy — UTF-8 blob + offset(행 단위 지연 디코딩)
+#   · cols/*.npy    메타데이터 컬럼(문자열=코드(int32)+vocab, 숫자=float64) → 벡터화된 where 마스크
+# - 행을 파티션 키(dataset) 순으로 정렬해 저장 → 값별 연속 구간 = 작은 전용 인덱스
+#   where가 dataset을 고정하면 그 구간(view, 복사 없음)만 검색
+# - 모든 파일을 np.load(mmap_mode="r")로 열어 여러 워커 프로세스가 OS 페이지 캐시를 공유
+# - 버전 디렉터리(v<ns>)에 쓴 뒤 CURRENT 파일을 os.replace로 교체 → 읽는 쪽은 항상 완성본만 봄
+#
+# 환경변수
+# - NP_INDEX_DIR=<CHROMA_DIR>/np_index
+# - NP_INDEX_EXPORT=true         (인덱싱 후 활성 컬렉션 자동 export)
+# - NP_INDEX_DTYPE=float32       (float32|float16, 저장 dtype. float32는 사본 없이 mmap 직접 검색)
+# - NP_INDEX_UPCAST=false        (float16 저장본을 프로세스별 float32 사본으로 올려 BLAS 검색(opt-in),
+#                                  false면 mmap에서 블록 단위 변환 → 메모리 공유↑, 지연↑)
+# - NP_INDEX_PARTITION_KEY=dataset (파티션 키, 빈 값이면 파티션 없음)
+# ================================================================
+from __future__ import annotations
+
+import os, json, shutil, threading, time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import CHROMA_DIR
+from .filters import partition_values
+
+NP_INDEX_DIR = os.getenv("NP_INDEX_DIR") or os.path.join(CHROMA_DIR, "np_index")
+NP_INDEX_EXPORT = os.getenv("NP_INDEX_EXPORT", "true").lower() == "true"
+NP_INDEX_DTYPE = os.getenv("NP_INDEX_DTYPE", "float32").lower()
+NP_INDEX_UPCAST = os.getenv("NP_INDEX_UPCAST", "false").lower() == "true"
+NP_INDEX_PARTITION_KEY = os.getenv("NP_INDEX_PARTITION_KEY", "dataset")
+
+_EXPORT_PAGE = 5000     # col.get 한 번에 읽을 행 수
+_SEARCH_BLOCK = 16384   # float16 mmap 블록 단위 검색 시 행 수
+
+
+# ================================================================
+# Export (Chroma → NumPy 파일)
+# ================================================================
+def _collection_dir(name: str) -> str:
+    return os.path.join(NP_INDEX_DIR, name)
+
+def _read_current(name: str) -> Optional[str]:
+    try:
+        with open(os.path.join(_collection_dir(name), "CURRENT"), "r", encoding="utf-8") as f:
+            v = f.read().strip()
+            return os.path.join(_collection_dir(name), v) if v else None
+    except OSError:
+        return None
+
+def _write_blob(path: str, rows: List[str]) -> None:
+    """UTF-8 blob + (N+1,) int64 offset"""
+    enc = [r.encode("utf-8") for r in rows]
+    off = np.zeros(len(enc) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in enc], out=off[1:])
+    with open(path + ".bin", "wb") as f:
+        for b in enc:
+            f.write(b)
+    np.save(path + "_off.npy", off)
+
+def _write_columns(vdir: str, metas: List[Dict]) -> Dict:
+    """메타 키별 컬럼: 문자열 → 코드(-1=없음)+vocab, 숫자 → float64(NaN=없음)"""
+    os.makedirs(os.path.join(vdir, "cols"), exist_ok=True)
+    keys = sorted({k for m in metas for k in m})
+    spec = {}
+    for i, key in enumerate(keys):
+        vals = [m.get(key) for m in metas]
+        present = [v for v in vals if v is not None]
+        fname = f"cols/c{i}.npy"
+        if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+            arr = np.array([np.nan if v is None else float(v) for v in vals], dtype=np.float64)
+            spec[key] = {"kind": "num", "file": fname}
+        else:
+            vocab: Dict[str, int] = {}
+            arr = np.array([-1 if v is None else vocab.setdefault(str(v), len(vocab)) for v in vals],
+                           dtype=np.int32)
+            spec[key] = {"kind": "cat", "file": fname, "vocab": list(vocab)}
+        np.save(os.path.join(vdir, fname), arr)
+    return spec
+
+def _space_of(col) -> str:
+    try:
+        return (col.metadata or {}).get("hnsw:space", "l2")
+    except Exception:
+        return "l2"
+
+def export_index(collection_name: Optional[str] = None) -> Dict:
+    """
+    컬렉션 전체(임베딩/문서/메타)를 읽어 새 버전 디렉터리에 저장 후 CURRENT 교체.
+    이전 버전 디렉터리는 삭제(이미 열린 mmap은 OS가 유지, 실패 시 다음 export 때 재시도).
+    """
+    from .store import get_client, get_collection, active_collection_name
+
+    t0 = time.perf_counter()
+    name = collection_name or active_collection_name()
+    col = get_collection(get_client(CHROMA_DIR), name=name)
+
+    ids: List[str] = []
+    docs: List[str] = []
+    metas: List[Dict] = []
+    vecs: List[np.ndarray] = []
+    offset = 0
+    while True:
+        got = col.get(include=["embeddings", "documents", "metadatas"], limit=_EXPORT_PAGE, offset=offset)
+        page_ids = got.get("ids") or []
+        if not page_ids:
+            break
+        ids.extend(page_ids)
+        docs.extend(d or "" for d in (got.get("documents") or [""] * len(page_ids)))
+        metas.extend(m or {} for m in (got.get("metadatas") or [{}] * len(page_ids)))
+        vecs.append(np.asarray(got["embeddings"], dtype=np.float32))
+        offset += len(page_ids)
+        if len(page_ids) < _EXPORT_PAGE:
+            break
+
+    mat = np.vstack(vecs) if vecs else np.zeros((0, 0), dtype=np.float32)
+    if len(mat):
+        mat /= np.maximum(np.linalg.norm(mat, axis=1, keepdims=True), 1e-12)
+
+    # 파티션 키 값 순으로 안정 정렬 → 값별 [start, end) 연속 구간
+    partitions: Dict[str, List[int]] = {}
+    pkey = NP_INDEX_PARTITION_KEY
+    if pkey and ids:
+        keys = [str(m.get(pkey, "")) for m in metas]
+        order = sorted(range(len(ids)), key=keys.__getitem__)
+        ids = [ids[i] for i in order]
+        docs = [docs[i] for i in order]
+        metas = [metas[i] for i in order]
+        mat = mat[order]
+        start = 0
+        for i in range(1, len(order) + 1):
+            if i == len(order) or keys[order[i]] != keys[order[start]]:
+                partitions[keys[order[start]]] = [start, i]
+                start = i
+    dtype = np.float16 if NP_INDEX_DTYPE == "float16" else np.float32
+
+    cdir = _collection_dir(name)
+    version = f"v{time.time_ns()}"
+    vdir = os.path.join(cdir, version)
+    os.makedirs(vdir, exist_ok=True)
+    np.save(os.path.join(vdir, "vectors.npy"), mat.astype(dtype))
+    np.save(os.path.join(vdir, "ids.npy"), np.array(ids, dtype=str) if ids else np.zeros(0, dtype="<U1"))
+    _write_blob(os.path.join(vdir, "docs"), docs)
+    _write_blob(os.path.join(vdir, "metas"), [json.dumps(m, ensure_ascii=False) for m in metas])
+    info = {
+        "collection": name, "version": version, "count": len(ids),
+        "dim": int(mat.shape[1]) if mat.ndim == 2 else 0, "dtype": np.dtype(dtype).name,
+        "space": _space_of(col), "columns": _write_columns(vdir, metas), "created_at": int(time.time()),
+        "partition_key": pkey if partitions else None, "partitions": partitions,
+    }
+    with open(os.path.join(vdir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False)
+
+    # 포인터 원자적 교체
+    tmp = os.path.join(cdir, "CURRENT.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(cdir, "CURRENT"))
+
+    for d in os.listdir(cdir):
+        if d.startswith("v") and d != version:
+            shutil.rmtree(os.path.join(cdir, d), ignore_errors=True)
+
+    ms = int((time.perf_counter() - t0) * 1000)
+    print(f"[np_index] exported {name} {version}: n={len(ids)} dim={info['dim']} dtype={info['dtype']} "
+          f"partitions={len(partitions)} ms={ms}")
+    return {"collection": name, "version": version, "count": len(ids), "partitions": len(partitions), "ms": ms}
+
+
+# ================================================================
+# 메타데이터 where → 행 마스크 (Chroma where 문법의 부분집합)
+#   {"k": v}, {"k": {"$eq|$ne|$gt|$gte|$lt|$lte|$in|$nin": ...}}, {"$and": [...]}, {"$or": [...]}
+# ================================================================
+_NUM_OPS = {
+    "$eq": np.equal, "$ne": np.not_equal,
+    "$gt": np.greater, "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal,
+}
+
+
+class NumpyIndex:
+    def __init__(self, vdir: str):
+        with open(os.path.join(vdir, "index.json"), "r", encoding="utf-8") as f:
+            self.info = json.load(f)
+        self.dir = vdir
+        self.version = self.info["version"]
+        self.space = self.info.get("space", "l2")
+        self.partition_key = self.info.get("partition_key")
+        self.partitions: Dict[str, List[int]] = self.info.get("partitions") or {}
+        load = lambda n: np.load(os.path.join(vdir, n), mmap_mode="r")
+        self.vectors = load("vectors.npy")
+        if self.vectors.dtype != np.float32 and NP_INDEX_UPCAST:
+            self.vectors = np.asarray(self.vectors, dtype=np.float32)
+        self.ids = load("ids.npy")
+        self._docs = (np.memmap(os.path.join(vdir, "docs.bin"), dtype=np.uint8, mode="r")
+                      if os.path.getsize(os.path.join(vdir, "docs.bin")) else np.zeros(0, np.uint8),
+                      load("docs_off.npy"))
+        self._metas = (np.memmap(os.path.join(vdir, "metas.bin"), dtype=np.uint8, mode="r")
+                       if os.path.getsize(os.path.join(vdir, "metas.bin")) else np.zeros(0, np.uint8),
+                       load("metas_off.npy"))
+        self._cols = {k: (spec, load(spec["file"])) for k, spec in self.info["columns"].items()}
+        self._vocab_idx = {k: {v: i for i, v in enumerate(spec.get("vocab", []))}
+                           for k, spec in self.info["columns"].items()}
+
+    def __len__(self) -> int:
+        return int(self.info["count"])
+
+    # ---- 행 단위 디코딩 ----
+    @staticmethod
+    def _blob_row(blob, i: int) -> str:
+        data, off = blob
+        return bytes(data[off[i]:off[i + 1]]).decode("utf-8")
+
+    def doc(self, i: int) -> str:
+        return self._blob_row(self._docs, i)
+
+    def meta(self, i: int) -> Dict:
+        return json.loads(self._blob_row(self._metas, i) or "{}")
+
+    # ---- where → 마스크 ----
+    def _leaf(self, key: str, cond) -> np.ndarray:
+        n = len(self)
+        if key not in self._cols:
+            # 어느 행에도 없는 키: 부정 연산만 참
+            ops = cond if isinstance(cond, dict) else {"$eq": cond}
+            return np.full(n, all(op in ("$ne", "$nin") for op in ops), dtype=bool)
+        spec, arr = self._cols[key]
+        ops = cond if isinstance(cond, dict) else {"$eq": cond}
+        mask = np.ones(n, dtype=bool)
+        for op, val in ops.items():
+            if spec["kind"] == "cat":
+                vi = self._vocab_idx[key]
+                if op in ("$eq", "$ne"):
+                    m = arr == vi.get(str(val), -2)
+                    m = m if op == "$eq" else ~m
+                elif op in ("$in", "$nin"):
+                    codes = [vi[str(v)] for v in val if str(v) in vi]
+                    m = np.isin(arr, codes)
+                    m = m if op == "$in" else ~m
+                else:
+                    raise ValueError(f"unsupported operator {op} for string field {key}")
+            else:
+                if op in ("$in", "$nin"):
+                    m = np.isin(arr, [float(v) for v in val])
+                    m = m if op == "$in" else ~m
+                elif op in _NUM_OPS:
+                    with np.errstate(invalid="ignore"):
+                        m = _NUM_OPS[op](arr, float(val))
+                else:
+                    raise ValueError(f"unsupported operator {op}")
+            mask &= m
+        return mask
+
+    def mask(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        parts = []
+        for key, cond in where.items():
+            if key == "$and":
+                parts.append(np.logical_and.reduce([self.mask(w) for w in cond]))
+            elif key == "$or":
+                parts.append(np.logical_or.reduce([self.mask(w) for w in cond]))
+            else:
+                parts.append(self._leaf(key, cond))
+        return np.logical_and.reduce(parts)
+
+    # ---- 검색 ----
+    def _candidates(self, where: Optional[Dict]) -> Tuple[int, int, Optional[np.ndarray]]:
+        """
+        검색 대상 행: (start, end, None)=연속 구간 전체, (0, 0, rows)=행 번호 목록
+        파티션 키가 고정되면 해당 구간만, 나머지 조건은 그 구간 안에서 마스크
+        """
+        vals, rest = partition_values(where, self.partition_key) if self.partitions else (None, where)
+        if vals is None:
+            mask = self.mask(where)
+            return (0, len(self), None) if mask is None else (0, 0, np.flatnonzero(mask))
+        ranges = [self.partitions[str(v)] for v in dict.fromkeys(vals) if str(v) in self.partitions]
+        rest_mask = self.mask(rest)
+        if len(ranges) == 1 and rest_mask is None:
+            return ranges[0][0], ranges[0][1], None
+        rows = np.concatenate([np.arange(a, b) for a, b in ranges]) if ranges else np.zeros(0, dtype=np.int64)
+        if rest_mask is not None:
+            rows = rows[rest_mask[rows]]
+        return 0, 0, rows
+
+    def _scores(self, start: int, end: int, rows: Optional[np.ndarray], q: np.ndarray) -> np.ndarray:
+        """(n, B) 코사인(내적). rows=None이면 [start, end) 구간(view)"""
+        V = self.vectors
+        if rows is not None:
+            return np.asarray(V[rows], dtype=np.float32) @ q.T
+        if V.dtype == np.float32:
+            return V[start:end] @ q.T
+        out = np.empty((end - start, q.shape[0]), dtype=np.float32)
+        for s in range(start, end, _SEARCH_BLOCK):
+            e = min(s + _SEARCH_BLOCK, end)
+            out[s - start:e - start] = np.asarray(V[s:e], dtype=np.float32) @ q.T
+        return out
+
+    def _distance(self, sim: np.ndarray) -> np.ndarray:
+        """Chroma와 같은 거리값(정규화 벡터 기준)으로 변환 → retriever의 score=1-dist 의미 유지"""
+        if self.space == "cosine":
+            return 1.0 - sim
+        if self.space == "ip":
+            return 1.0 - sim
+        return 2.0 - 2.0 * sim  # l2(제곱)
+
+    def search(self, qvecs: np.ndarray, k: int, where: Optional[Dict] = None) -> List[List[Tuple[int, float]]]:
+        """질의별 [(행 번호, 거리)] 상위 k개(거리 오름차순)"""
+        q = np.atleast_2d(np.asarray(qvecs, dtype=np.float32))
+        start, end, rows = self._candidates(where)
+        n = end - start if rows is None else len(rows)
+        if n == 0 or k <= 0:
+            return [[] for _ in range(q.shape[0])]
+        sims = self._scores(start, end, rows, q)
+        kk = min(k, n)
+        out = []
+        for b in range(q.shape[0]):
+            col = sims[:, b]
+            top = np.argpartition(-col, kk - 1)[:kk] if kk < n else np.arange(n)
+            top = top[np.argsort(-col[top], kind="stable")]
+            idx = top + start if rows is None else rows[top]
+            out.append(list(zip(idx.tolist(), self._distance(col[top]).tolist())))
+        return out
+
+    def partition_sizes(self) -> Dict[str, int]:
+        return {v: b - a for v, (a, b) in self.partitions.items()}
+
+
+# ================================================================
+# 로더 (프로세스별 캐시, CURRENT/활성 컬렉션 변경 시 재로드)
+# ================================================================
+_loaded: Dict[str, Tuple[str, NumpyIndex]] = {}
+_load_lock = threading.Lock()
+
+def load_index(collection_name: Optional[str] = None) -> Optional[NumpyIndex]:
+    """export된 인덱스가 없으면 None"""
+    from .store import active_collection_name
+
+    name = collection_name or active_collection_name()
+    vdir = _read_current(name)
+    if not vdir:
+        return None
+    hit = _loaded.get(name)
+    if hit is not None and hit[0] == vdir:
+        return hit[1]
+    with _load_lock:
+        hit = _loaded.get(name)
+        if hit is None or hit[0] != vdir:
+            try:
+                hit = _loaded[name] = (vdir, NumpyIndex(vdir))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[np_index] load failed for {name}: {e}")
+                return None
+    return hit[1]
+
+def index_stats() -> Dict:
+    return {name: {"version": idx.version, "count": len(idx), "dtype": idx.info["dtype"],
+                   "search_dtype": str(idx.vectors.dtype),
+                   "shared_mmap": str(idx.vectors.dtype) == idx.info["dtype"],
+                   "partition_key": idx.partition_key, "partitions": idx.partition_sizes()}
+            for name, (_, idx) in list(_loaded.items())}
@@ -0,0 +1,163 @@
+# ai/rag/pipeline.py
+# ================================================================
+# 역할
+# - 인덱싱 단계(읽기 → 청크 → diff → 임베딩 → 쓰기)를 스레드별로 분리하고
+#   bounded queue로 연결해 I/O 대기와 CPU 작업을 겹쳐 실행
+# - 단계별 처리량/대기 시간/큐 깊이 통계 제공
+#
+# 사용
+#   pipe = Pipeline(source_iterable, [("chunk", fn1), ("embed", fn2), ...])
+#   for out in pipe.run(): ...
+#   pipe.stats()
+#   - 각 fn은 "입력 iterable → 출력 iterable" 변환(generator)이어야 함
+#
+# 환경변수
+# - PIPELINE_QUEUE_SIZE=4   (단계 사이 큐 최대 길이)
+# ================================================================
+from __future__ import annotations
+
+import os, queue, threading, time
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+
+_END = object()
+
+class _Failed:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+class _Stopped(Exception):
+    """소비자가 중단/실패해 파이프라인을 멈출 때 내부적으로 사용"""
+
+
+class _StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.elapsed_s = 0.0
+        self.wait_in_s = 0.0   # 입력 큐가 비어 기다린 시간(상류가 느림)
+        self.wait_out_s = 0.0  # 출력 큐가 가득 차 기다린 시간(하류가 느림)
+        self.depth_max = 0
+        self.depth_sum = 0
+        self.depth_n = 0
+
+    def as_dict(self) -> Dict:
+        busy = max(self.elapsed_s - self.wait_in_s - self.wait_out_s, 0.0)
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "elapsed_ms": int(self.elapsed_s * 1000),
+            "busy_ms": int(busy * 1000),
+            "wait_in_ms": int(self.wait_in_s * 1000),
+            "wait_out_ms": int(self.wait_out_s * 1000),
+            "items_per_s": round(self.items / self.elapsed_s, 2) if self.elapsed_s else 0.0,
+            "out_queue_max": self.depth_max,
+            "out_queue_avg": round(self.depth_sum / self.depth_n, 2) if self.depth_n else 0.0,
+        }
+
+
+class Pipeline:
+    def __init__(self, source: Iterable, stages: List[Tuple[str, Callable[[Iterable], Iterable]]],
+                 maxsize: int = PIPELINE_QUEUE_SIZE, source_name: str = "fetch"):
+        self._source = source
+        self._stages = stages
+        self._queues = [queue.Queue(maxsize=max(1, maxsize)) for _ in range(len(stages) + 1)]
+        self._stats = [_StageStats(source_name)] + [_StageStats(name) for name, _ in stages]
+        self._stop = threading.Event()
+
+    # ---- 큐 입출력 ----
+    def _put(self, i: int, item) -> None:
+        q, st = self._queues[i], self._stats[i]
+        t0 = time.perf_counter()
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        st.wait_out_s += time.perf_counter() - t0
+        depth = q.qsize()
+        st.depth_max = max(st.depth_max, depth)
+        st.depth_sum += depth
+        st.depth_n += 1
+
+    def _get(self, i: int):
+        """입력 큐에서 꺼내되 파이프라인이 멈추면(하류 실패/소비 중단) 바로 빠져나옴"""
+        q = self._queues[i]
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _drain(self, i: int, st: _StageStats) -> Iterator:
+        while True:
+            t0 = time.perf_counter()
+            item = self._get(i)
+            st.wait_in_s += time.perf_counter() - t0
+            if item is _END:
+                return
+            if isinstance(item, _Failed):
+                raise item.exc
+            yield item
+
+    # ---- 단계 스레드 ----
+    def _worker(self, i: int) -> None:
+        st = self._stats[i]
+        t0 = time.perf_counter()
+        it = None
+        try:
+            if i == 0:
+                it = iter(self._source)
+            else:
+                it = iter(self._stages[i - 1][1](self._drain(i - 1, st)))
+            for item in it:
+                st.items += 1
+                self._put(i, item)
+            self._put(i, _END)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            try:
+                self._put(i, _Failed(e))
+            except _Stopped:
+                pass
+        finally:
+            # 멈춘 단계의 generator를 바로 닫아 try/finally 정리(프로세스 풀 등)가 실행되게 함
+            close = getattr(it, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+            st.elapsed_s = time.perf_counter() - t0
+
+    def run(self) -> Iterator:
+        """마지막 단계의 출력을 호출 스레드에서 순서대로 반환"""
+        threads = [
+            threading.Thread(target=self._worker, args=(i,), name=f"pipeline-{st.name}", daemon=True)
+            for i, st in enumerate(self._stats)
+        ]
+        for t in threads:
+            t.start()
+        last = self._queues[-1]
+        try:
+            while True:
+                item = last.get()
+                if item is _END:
+                    break
+                if isinstance(item, _Failed):
+                    raise item.exc
+                yield item
+        finally:
+            self._stop.set()
+            for t in threads:
+                t.join(timeout=5)
+
+    def stats(self) -> List[Dict]:
+        return [st.as_dict() for st in self._stats]
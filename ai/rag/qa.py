@@ -1,9 +1,10 @@
 # qa.py
-from typing import Dict
+from typing import Dict, Iterator, List
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
+from langchain_core.documents import Document
 from langchain_core.language_models import BaseChatModel
-from langchain_core.vectorstores import VectorStoreRetriever
+from langchain_core.retrievers import BaseRetriever
 
 # ------------------------------
 # 1️⃣ 프롬프트 템플릿 정의
@@ -20,9 +21,32 @@ PROMPT_TEMPLATE = f"""{{system_prompt}}\n\n---\n\nCONTEXT:\n{{context}}\n\n---\n
 QA_PROMPT = PromptTemplate.from_template(PROMPT_TEMPLATE)
 
 # ------------------------------
-# 2️⃣ 답변 생성 함수 (개선)
+# 2️⃣ 공통: 출처 포맷 / 프롬프트 조합
 # ------------------------------
-def answer(query: str, retriever: VectorStoreRetriever, llm: BaseChatModel) -> Dict:
+def format_sources(docs: List[Document]) -> List[Dict]:
+    sources = []
+    for doc in docs or []:
+        # 메타데이터를 안전하게 추출
+        meta = doc.metadata or {}
+        sources.append({
+            "_id": meta.get("_id"),
+            "page_content": doc.page_content, # 청크 내용
+            "dataset": meta.get("dataset"),   # 답변 캐시의 dataset별 무효화에 사용
+            # 필요 시 다른 메타데이터 필드 추가
+            # "page": meta.get("page"),
+            # "title": meta.get("title"),
+        })
+    return sources
+
+def build_prompt(query: str, docs: List[Document]) -> str:
+    """RetrievalQA(stuff)와 같은 프롬프트: 청크 본문을 빈 줄로 이어 CONTEXT에 넣음"""
+    context = "\n\n".join(d.page_content for d in docs or [])
+    return QA_PROMPT.format(system_prompt=SYSTEM_PROMPT, context=context, question=query)
+
+# ------------------------------
+# 3️⃣ 답변 생성 함수 (개선)
+# ------------------------------
+def answer(query: str, retriever: BaseRetriever, llm: BaseChatModel) -> Dict:
     """
     질문(query)과 Retriever, LLM을 받아 RAG 답변과 소스를 반환
     """
@@ -37,21 +61,16 @@ def answer(query: str, retriever: VectorStoreRetriever, llm: BaseChatModel) -> D
     # 체인 실행
     result = chain.invoke({"query": query})
 
-    # 소스 문서 포맷팅
-    sources = []
-    if result.get("source_documents"):
-        for doc in result["source_documents"]:
-            # 메타데이터를 안전하게 추출
-            meta = doc.metadata or {}
-            sources.append({
-                "_id": meta.get("_id"),
-                "page_content": doc.page_content, # 청크 내용
-                # 필요 시 다른 메타데이터 필드 추가
-                # "page": meta.get("page"),
-                # "title": meta.get("title"),
-            })
-
     return {
         "answer": result.get("result", "답변을 생성할 수 없습니다."),
-        "sources": sources
-    }
\ No newline at end of file
+        "sources": format_sources(result.get("source_documents"))
+    }
+
+def stream_answer(query: str, docs: List[Document], llm: BaseChatModel) -> Iterator[str]:
+    """
+    검색이 끝난 청크(docs)로 같은 프롬프트를 만들고, LLM 토큰을 도착하는 대로 yield
+    (/rag/chat/stream: 출처를 먼저 보내고 답변을 이어서 스트리밍)
+    """
+    for chunk in llm.stream(build_prompt(query, docs)):
+        if chunk.content:
+            yield chunk.content
\ No newline at end of file
@@ -0,0 +1,112 @@
+# ai/rag/query_cache.py
+# ================================================================
+# 역할
+# - 질의 임베딩 앞단의 메모리 LRU/TTL 캐시 (스레드 안전)
+#   · 키 = (임베더 모델 키, 정규화 질의)
+#   · "시험 일정 언제야?" / "시험일정 언제야" / "ｓｃｈｏｏｌ" 같은 표기 차이는 같은 키
+# - 키에 모델 키가 포함되어 모델별로 분리, 임베더를 (다시) 로드하면 clear()로 전체 비움
+# - hit/miss/크기/만료/축출 통계 제공
+#
+# 환경변수
+# - QUERY_CACHE_SIZE=1024     (최대 항목 수, 0=비활성)
+# - QUERY_CACHE_TTL_S=3600    (항목 유효 시간(초), 0=무제한)
+# ================================================================
+from __future__ import annotations
+
+import os, re, threading, time, unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL_S = float(os.getenv("QUERY_CACHE_TTL_S", "3600"))
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_query(q: str) -> str:
+    """
+    NFKC(전각→반각, 호환 문자 통일) → casefold → 문장부호/기호 제거 → 공백 전부 제거
+    한국어는 띄어쓰기가 들쭉날쭉해서 공백 자체를 키에서 뺌
+    """
+    t = unicodedata.normalize("NFKC", q or "").casefold()
+    t = "".join(ch for ch in t if unicodedata.category(ch)[0] not in ("P", "S"))
+    return _WS.sub("", t)
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl_s: float = QUERY_CACHE_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[tuple, tuple]" = OrderedDict()  # (모델, 정규화 질의) → (벡터, 저장 시각)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, model: str, query: str) -> Optional[np.ndarray]:
+        if self.max_entries <= 0:
+            return None
+        key = (model, normalize_query(query))
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and self.ttl_s and time.monotonic() - hit[1] > self.ttl_s:
+                del self._data[key]
+                self.expired += 1
+                hit = None
+            if hit is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return hit[0]
+
+    def put(self, model: str, query: str, vec) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (model, normalize_query(query))
+        arr = np.array(vec, dtype=np.float32)  # 배치 결과 버퍼와 분리된 사본
+        arr.setflags(write=False)  # 호출자 간 공유되므로 읽기 전용
+        with self._lock:
+            self._data[key] = (arr, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "models": sorted({m for m, _ in self._data}),
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+
+# 전역 싱글톤
+_cache: Optional[QueryEmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+def get_query_cache() -> QueryEmbeddingCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QueryEmbeddingCache()
+    return _cache
+
+def query_cache_stats() -> Dict:
+    return get_query_cache().stats()
@@ -10,45 +10,60 @@
 import os
 from typing import List, Dict, Optional
 from .store import get_client, get_collection
-from .config import CHROMA_DIR, COLLECTION_NAME, TOP_K
-from sentence_transformers import SentenceTransformer
+from .config import CHROMA_DIR, TOP_K, SEARCH_ENGINE, PARTITION_SEARCH
 import numpy as np
-from .ingest import embedder
-
-# 단일 임베더 재사용 (ingest.py와 같은 모델명이어야 함)
-_EMBEDDER = None
-def _embedder():
-    global _EMBEDDER
-    if _EMBEDDER is None:
-        import os
-        model_name = os.getenv("EMBEDDER_MODEL", "intfloat/multilingual-e5-small")
-        _EMBEDDER = SentenceTransformer(model_name)
-    return _EMBEDDER
-
-def _encode_query(q: str) -> np.ndarray:
-    # 💡 e5는 query/passsage 프리픽스를 반드시 맞춰야 함
-    emb = _embedder().encode([f"query: {q.strip()}"],
-                             convert_to_numpy=True, normalize_embeddings=True)
-    return emb[0]
+from .ingest import embedder, EMBEDDER_KEY
+from .embed_cache import cached_encode
+from .query_cache import get_query_cache, normalize_query
+from .microbatch import QUERY_BATCH, get_batcher
+from .np_index import load_index
+from .filters import compile_filters, partition_values
 
-def retrieve(query: str, k: int = 6, filters=None):
-    model = embedder()
-    qvec = model.encode([f"query: {query}"], convert_to_numpy=True, normalize_embeddings=True)[0]
+# 임베더는 ingest.embedder()(rag.models 레지스트리) 하나만 사용 → 인덱싱과 같은 모델/백엔드
+def _model_encode(texts: List[str]) -> np.ndarray:
+    return embedder().encode(texts, convert_to_numpy=True, normalize_embeddings=True)
 
-    client = get_client(CHROMA_DIR)
-    col = get_collection(client, name=COLLECTION_NAME)
+def _encode(texts: List[str]) -> np.ndarray:
+    """QUERY_BATCH=true면 동시 요청의 질의와 모아서 한 번에 encode(마이크로 배칭)"""
+    if not QUERY_BATCH:
+        return _model_encode(texts)
+    return np.vstack(get_batcher("query-embed", _model_encode).submit_many(texts))
 
-    res = col.query(
-        query_embeddings=[qvec.tolist()],
-        n_results=k,
-        include=["documents", "metadatas", "distances"],  # 'ids'는 include 대상 아님
-        where=filters or None,
-    )
+def encode_queries(queries: List[str]) -> np.ndarray:
+    """
+    질의 여러 건을 한 번에 임베딩: 메모리 LRU(정규화 질의 키) → SQLite 임베딩 캐시 → 모델(1회 배치)
+    표기만 다른 질의는 처음 임베딩한 질의의 벡터를 공유
+    💡 e5는 query/passage 프리픽스를 반드시 맞춰야 함(인덱싱은 "passage: ")
+    반환: 입력 순서 그대로의 (N, dim) 배열
+    """
+    qcache = get_query_cache()
+    vecs: List[Optional[np.ndarray]] = [qcache.get(EMBEDDER_KEY, q) for q in queries]
 
-    docs  = (res.get("documents") or [[]])[0]
-    metas = (res.get("metadatas") or [[]])[0]
-    dists = (res.get("distances") or [[]])[0]
-    ids   = (res.get("ids") or [[]])[0] if res.get("ids") is not None else [None] * len(docs)
+    # 캐시 미스만 정규화 키 기준으로 중복 제거 후 배치 인코딩
+    todo: Dict[str, List[int]] = {}
+    for i, v in enumerate(vecs):
+        if v is None:
+            todo.setdefault(normalize_query(queries[i]), []).append(i)
+    if todo:
+        firsts = [idx[0] for idx in todo.values()]
+        fresh = cached_encode(EMBEDDER_KEY, [f"query: {queries[i].strip()}" for i in firsts], _encode)
+        for j, idx in enumerate(todo.values()):
+            qcache.put(EMBEDDER_KEY, queries[idx[0]], fresh[j])
+            for i in idx:
+                vecs[i] = fresh[j]
+    return np.vstack(vecs)
+
+def encode_query(query: str) -> np.ndarray:
+    return encode_queries([query])[0]
+
+def _to_chunks(res: Dict, qi: int) -> List[Dict]:
+    """col.query 결과에서 qi번째 질의의 청크 목록"""
+    def row(key):
+        rows = res.get(key)
+        return rows[qi] if rows is not None and qi < len(rows) and rows[qi] is not None else []
+
+    docs, metas, dists = row("documents"), row("metadatas"), row("distances")
+    ids = row("ids") if res.get("ids") is not None else [None] * len(docs)
 
     chunks = []
     for i, doc in enumerate(docs):
@@ -70,5 +85,44 @@ def retrieve(query: str, k: int = 6, filters=None):
             "meta": meta or {},
             "score": score,
         })
-
     return chunks
+
+def _search_numpy(idx, qvecs: np.ndarray, k: int, filters=None) -> List[List[Dict]]:
+    """np_index 검색 결과를 retrieve()와 같은 dict 형식으로(score = 1 - Chroma 거리)"""
+    out = []
+    for hits in idx.search(qvecs, k, where=filters):
+        out.append([{"id": str(idx.ids[i]), "text": idx.doc(i), "meta": idx.meta(i), "score": 1.0 - dist}
+                    for i, dist in hits])
+    return out
+
+def retrieve_many(queries: List[str], k: int = 6, filters=None) -> List[List[Dict]]:
+    """
+    질의 여러 건 → 배치 임베딩 1회 + Chroma 다중 임베딩 질의 1회
+    반환: 질의별 청크 목록(retrieve()와 같은 dict 형식), 입력 순서 유지
+    (평가 스크립트/캐시 워머/멀티 쿼리 확장용)
+    filters: 친화적 필터({"dataset": [...], "updated_from": ...}) 또는 where 절 → filters.compile_filters
+    """
+    if not queries:
+        return []
+    where = compile_filters(filters)
+    qvecs = encode_queries(queries)
+
+    if SEARCH_ENGINE == "numpy" or (PARTITION_SEARCH and where):
+        idx = load_index()  # 활성 컬렉션의 export본(mmap), 없으면 Chroma로 폴백
+        if idx is not None and (SEARCH_ENGINE == "numpy" or (
+                idx.partition_key and partition_values(where, idx.partition_key)[0] is not None)):
+            return _search_numpy(idx, qvecs, k, where)
+
+    client = get_client(CHROMA_DIR)
+    col = get_collection(client)  # ACTIVE_COLLECTION 포인터 기준 → 재빌드 교체 즉시 반영
+
+    res = col.query(
+        query_embeddings=qvecs.tolist(),
+        n_results=k,
+        include=["documents", "metadatas", "distances"],  # 'ids'는 include 대상 아님
+        where=where,
+    )
+    return [_to_chunks(res, qi) for qi in range(len(queries))]
+
+def retrieve(query: str, k: int = 6, filters=None):
+    return retrieve_many([query], k=k, filters=filters)[0]
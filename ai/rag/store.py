@@ -4,30 +4,178 @@
 # 💾 역할:
 #   - Chroma 벡터DB 초기화 및 Collection 관리
 #   - 문서 삽입/검색용 기본 인터페이스 제공
+#   - 활성 컬렉션 포인터(ACTIVE_NAME_FILE) 기반 A/B(blue/green) 전환
+#   - client/collection 핸들 프로세스 전역 캐시(질의마다 chromadb.Client 생성 방지)
+#   - 이전 컬렉션 지연 삭제 예약/취소(재빌드 대상이 된 컬렉션은 삭제하지 않음)
 # ================================================================
 
 import os
+import threading
 import chromadb
 from .config import CHROMA_DIR, ACTIVE_NAME_FILE, COLLECTION_PREFIX
 
+# 포인터 전환 후 이전 컬렉션을 삭제하기까지 대기 시간(진행 중인 질의 보호)
+SWAP_GRACE_S = int(os.getenv("RAG_SWAP_GRACE_S", "300"))
+
+# ---- 핸들 캐시 ----
+# 프로세스 전역으로 client/collection 객체를 재사용(FastAPI threadpool에서 동시 호출 가능)
+# - client: persist 디렉터리(절대경로)별 1개
+# - collection: (client, 이름)별 1개, 포인터 파일이 바뀌거나 컬렉션을 삭제하면 무효화
+# - 포인터는 매번 읽지 않고 stat(mtime/size)이 바뀐 경우에만 다시 읽음
+_handle_lock = threading.Lock()
+_clients: dict = {}
+_collections: dict = {}
+_pointer_sig = None
+_pointer_name = None
+
+def _pointer_stat():
+    try:
+        st = os.stat(ACTIVE_NAME_FILE)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+        return None
+
 def _read_active_name():
+    global _pointer_sig, _pointer_name
+    sig = _pointer_stat()
+    if sig == _pointer_sig and _pointer_name:
+        return _pointer_name
+    name = None
     try:
         with open(ACTIVE_NAME_FILE, "r", encoding="utf-8") as f:
-            name = f.read().strip()
-            if name: return name
+            name = f.read().strip() or None
     except Exception:
         pass
     # 초기값 없으면 A로
-    return f"{COLLECTION_PREFIX}_A"
+    name = name or f"{COLLECTION_PREFIX}_A"
+    with _handle_lock:
+        if sig != _pointer_sig:
+            # 포인터가 바뀜 → 다른 프로세스가 재빌드/삭제했을 수 있으니 컬렉션 핸들 전부 폐기
+            _collections.clear()
+        _pointer_sig, _pointer_name = sig, name
+    return name
+
+def invalidate_handles() -> None:
+    """캐시된 client/collection 핸들 전부 폐기(디렉터리 교체 등 수동 갱신용)"""
+    global _pointer_sig, _pointer_name
+    with _handle_lock:
+        _clients.clear()
+        _collections.clear()
+        _pointer_sig = _pointer_name = None
 
 def get_client(persist_dir: str = CHROMA_DIR):
-    return chromadb.Client(chromadb.config.Settings(
-        is_persistent=True, persist_directory=persist_dir
-    ))
+    key = os.path.abspath(persist_dir)
+    client = _clients.get(key)
+    if client is not None and os.path.isdir(key):
+        return client
+    with _handle_lock:
+        client = _clients.get(key)
+        if client is None or not os.path.isdir(key):
+            # 디렉터리가 지워졌다 다시 만들어졌으면 이전 client의 컬렉션 핸들도 폐기
+            if client is not None:
+                for k in [k for k in _collections if k[0] == id(client)]:
+                    del _collections[k]
+            client = chromadb.Client(chromadb.config.Settings(
+                is_persistent=True, persist_directory=persist_dir
+            ))
+            _clients[key] = client
+    return client
+
+def active_collection_name() -> str:
+    return _read_active_name()
+
+def inactive_collection_name() -> str:
+    """현재 활성 컬렉션의 반대편(A↔B)"""
+    active = _read_active_name()
+    a, b = f"{COLLECTION_PREFIX}_A", f"{COLLECTION_PREFIX}_B"
+    return b if active == a else a
+
+def set_active_name(name: str) -> None:
+    """포인터 파일을 임시 파일 + os.replace로 원자적으로 교체"""
+    os.makedirs(os.path.dirname(ACTIVE_NAME_FILE) or ".", exist_ok=True)
+    tmp = ACTIVE_NAME_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp, ACTIVE_NAME_FILE)
 
 def get_collection(client, name: str | None = None):
     name = name or _read_active_name()
+    key = (id(client), name)
+    hit = _collections.get(key)
+    if hit is not None:
+        return hit[1]
+    with _handle_lock:
+        hit = _collections.get(key)
+        if hit is None:
+            try:
+                col = client.get_collection(name=name)
+            except Exception:
+                col = client.create_collection(name=name)
+            # client 참조도 함께 보관해 id() 재사용으로 키가 겹치지 않게 함
+            hit = _collections[key] = (client, col)
+    return hit[1]
+
+# ---- 삭제 예약 / 재빌드 대상 ----
+# 스왑 직후 이전 컬렉션 삭제를 예약해 두는데, 유예 시간 안에 다시 재빌드가 시작되면
+# 그 대상이 바로 이 컬렉션 → 예약을 취소하고 재빌드가 끝날 때까지 삭제 금지
+_drop_lock = threading.RLock()
+_drop_timers: dict = {}     # 이름 → threading.Timer
+_rebuilding: set = set()    # 재빌드 중인 컬렉션 이름
+
+def _delete(client, name: str) -> bool:
+    with _handle_lock:
+        _collections.pop((id(client), name), None)
     try:
-        return client.get_collection(name=name)
+        client.delete_collection(name=name)
+        return True
     except Exception:
-        return client.create_collection(name=name)
\ No newline at end of file
+        return False
+
+def drop_collection(client, name: str) -> bool:
+    """활성 컬렉션/재빌드 중인 컬렉션은 삭제하지 않음"""
+    with _drop_lock:
+        if name == _read_active_name() or name in _rebuilding:
+            return False
+        return _delete(client, name)
+
+def cancel_drop(name: str) -> bool:
+    """예약된 지연 삭제 취소"""
+    with _drop_lock:
+        t = _drop_timers.pop(name, None)
+    if t is None:
+        return False
+    t.cancel()
+    return True
+
+def drop_collection_later(client, name: str, delay_s: int = SWAP_GRACE_S) -> None:
+    """유예 시간 뒤 백그라운드에서 이전 컬렉션 삭제(프로세스가 먼저 끝나면 다음 재빌드 때 정리)"""
+    def run():
+        with _drop_lock:
+            if _drop_timers.get(name) is not t:
+                return  # 취소/재예약됨
+            del _drop_timers[name]
+            drop_collection(client, name)
+
+    t = threading.Timer(delay_s, run)
+    t.daemon = True
+    with _drop_lock:
+        prev = _drop_timers.get(name)
+        if prev is not None:
+            prev.cancel()
+        _drop_timers[name] = t
+    t.start()
+
+def begin_rebuild(client, name: str, reset: bool = True) -> None:
+    """
+    name을 재빌드 대상으로 표시: 예약된 삭제를 취소하고 end_rebuild()까지 drop_collection 금지.
+    reset=True면 비우고 시작(이전 내용 삭제)
+    """
+    with _drop_lock:
+        cancel_drop(name)
+        _rebuilding.add(name)
+        if reset:
+            _delete(client, name)
+
+def end_rebuild(name: str) -> None:
+    with _drop_lock:
+        _rebuilding.discard(name)
\ No newline at end of file
@@ -0,0 +1,116 @@
+# ai/rag/test_answer_cache.py
+# ================================================================
+# 역할
+# - 시맨틱 답변 캐시 확인
+#   · 코사인 유사도 임계값, scope(필터/top_k)별 분리
+#   · 인덱스 버전: 전체 재빌드(built_at/collection)는 전부 무효, dataset 버전은 그 출처 답변만 무효
+#   · 마지막 사용 기준 LRU 축출, TTL 만료, invalidate(dataset)
+# ================================================================
+import types
+
+import pytest
+
+from rag import answer_cache
+from rag.answer_cache import SemanticAnswerCache
+
+Q_LEAVE = [1.0, 0.0, 0.0]
+Q_LEAVE_REPHRASED = [0.99, 0.1, 0.0]
+Q_SCHOLAR = [0.0, 1.0, 0.0]
+Q_EXAM = [0.0, 0.0, 1.0]
+
+
+@pytest.fixture
+def ticks(monkeypatch):
+    """time.monotonic() 대신 tick만큼씩 직접 움직이는 시계"""
+    t = types.SimpleNamespace(now=0.0)
+    monkeypatch.setattr(answer_cache, "time", types.SimpleNamespace(monotonic=lambda: t.now))
+    return t
+
+
+@pytest.fixture
+def index_state():
+    return {"collection": "school_corpus_A", "built_at": 100, "datasets": {"pdf": 1, "notices": 1}}
+
+
+def _cache(index_state, **kw):
+    kw.setdefault("ttl_s", 0)
+    kw.setdefault("threshold", 0.95)
+    return SemanticAnswerCache(lambda: index_state, **kw)
+
+
+def test_rephrased_question_hits_within_scope(index_state):
+    c = _cache(index_state)
+    c.put(Q_LEAVE, "k=6", {"answer": "휴학은 개강 전 2주"}, ["pdf"])
+    hit = c.lookup(Q_LEAVE_REPHRASED, "k=6")
+    assert hit["answer"] == {"answer": "휴학은 개강 전 2주"} and hit["similarity"] >= 0.95
+    assert c.lookup(Q_LEAVE_REPHRASED, "k=6|dataset=notices") is None
+    assert c.lookup(Q_SCHOLAR, "k=6") is None
+    assert (c.stats()["hits"], c.stats()["misses"]) == (1, 2)
+
+
+def test_dataset_bump_drops_only_its_answers(index_state):
+    c = _cache(index_state)
+    c.put(Q_LEAVE, "s", {"a": "pdf"}, ["pdf"])
+    c.put(Q_SCHOLAR, "s", {"a": "notices"}, ["notices", ""])
+    index_state["datasets"]["notices"] = 2
+    assert c.lookup(Q_SCHOLAR, "s") is None
+    assert c.lookup(Q_LEAVE, "s")["answer"] == {"a": "pdf"}
+    assert c.stats()["stale"] == 1
+
+
+def test_new_dataset_version_does_not_touch_unrelated_answers(index_state):
+    c = _cache(index_state)
+    c.put(Q_LEAVE, "s", {"a": 1}, ["pdf"])
+    index_state["datasets"]["haksa"] = 5
+    assert c.lookup(Q_LEAVE, "s") is not None
+
+
+@pytest.mark.parametrize("change", [{"built_at": 200}, {"collection": "school_corpus_B"}])
+def test_full_rebuild_drops_everything(index_state, change):
+    c = _cache(index_state)
+    c.put(Q_LEAVE, "s", {"a": 1}, ["pdf"])
+    c.put(Q_EXAM, "s", {"a": 2}, [])
+    index_state.update(change)
+    assert c.lookup(Q_LEAVE, "s") is None and c.lookup(Q_EXAM, "s") is None
+    assert c.stats()["size"] == 0
+
+
+def test_lru_keeps_recently_used(index_state, ticks):
+    c = _cache(index_state, max_entries=2)
+    c.put(Q_LEAVE, "s", {"a": "leave"}, ["pdf"])
+    ticks.now = 1
+    c.put(Q_SCHOLAR, "s", {"a": "scholar"}, ["pdf"])
+    ticks.now = 2
+    assert c.lookup(Q_LEAVE, "s") is not None
+    ticks.now = 3
+    c.put(Q_EXAM, "s", {"a": "exam"}, ["pdf"])
+    assert c.lookup(Q_SCHOLAR, "s") is None
+    assert c.lookup(Q_LEAVE, "s") and c.lookup(Q_EXAM, "s")
+    assert c.stats()["evictions"] == 1
+
+
+def test_ttl_counts_from_creation(index_state, ticks):
+    c = _cache(index_state, ttl_s=30)
+    c.put(Q_EXAM, "s", {"a": 1}, ["pdf"])
+    ticks.now = 20
+    assert c.lookup(Q_EXAM, "s") is not None
+    ticks.now = 31
+    assert c.lookup(Q_EXAM, "s") is None
+    assert c.stats()["expired"] == 1
+
+
+def test_invalidate_by_dataset_and_all(index_state):
+    c = _cache(index_state)
+    c.put(Q_LEAVE, "s", {"a": 1}, ["pdf", "notices"])
+    c.put(Q_SCHOLAR, "s", {"a": 2}, ["notices"])
+    c.put(Q_EXAM, "s", {"a": 3}, ["pdf"])
+    assert c.invalidate("notices") == 2
+    assert c.lookup(Q_EXAM, "s") is not None
+    assert c.invalidate() == 1
+    assert c.stats()["invalidated"] == 3
+
+
+def test_disabled_cache(index_state):
+    c = _cache(index_state, max_entries=0)
+    c.put(Q_LEAVE, "s", {"a": 1}, ["pdf"])
+    assert c.lookup(Q_LEAVE, "s") is None and c.stats()["size"] == 0
@@ -0,0 +1,71 @@
+# ai/rag/test_auto_index.py
+# ================================================================
+# 역할
+# - manifest diff 기반 소스 단위 증분 재인덱싱(auto_index) 확인
+#   · 바뀐/사라진 PDF·Mongo 컬렉션만 plan에 포함, 샘플링 시 미확인 컬렉션은 삭제로 보지 않음
+#   · 반영 실패한 컬렉션은 mongo_latest/dataset_versions를 전진시키지 않음
+#   · bump_dataset_versions는 같은 초에 다시 불러도 버전을 바꿈
+# ================================================================
+import json
+
+import pytest
+
+auto_index = pytest.importorskip("rag.auto_index")
+
+
+@pytest.fixture
+def manifest_path(tmp_path, monkeypatch):
+    path = tmp_path / "manifest.json"
+    monkeypatch.setattr(auto_index, "CHROMA_DIR", str(tmp_path))
+    monkeypatch.setattr(auto_index, "_MANIFEST_PATH", str(path))
+    monkeypatch.setattr(auto_index, "active_collection_name", lambda: "school_corpus_A")
+    return path
+
+
+def test_diff_manifest_reports_changed_sources_only():
+    old = {"pdf": [{"path": "a.pdf", "size": 1, "mtime": 1}, {"path": "gone.pdf", "size": 1, "mtime": 1}],
+           "mongo_latest": {"notices": 100, "events": 50, "old": 10}}
+    cur = {"pdf": [{"path": "a.pdf", "size": 2, "mtime": 1}, {"path": "new.pdf", "size": 1, "mtime": 3}],
+           "mongo_latest": {"notices": 100, "events": 60}}
+    plan = auto_index._diff_manifest(old, cur, mongo_complete=True)
+    assert plan == {"pdf_changed": ["a.pdf", "new.pdf"], "pdf_removed": ["gone.pdf"],
+                    "mongo_changed": ["events"], "mongo_removed": ["old"]}
+    assert auto_index._diff_manifest(old, cur, mongo_complete=False)["mongo_removed"] == []
+    assert auto_index._changed_datasets(plan) == sorted(["events", "old", auto_index.PDF_DATASET])
+
+
+def test_incremental_run_skips_failed_collections(manifest_path, monkeypatch):
+    manifest_path.write_text(json.dumps({
+        "pdf": [], "mongo_latest": {"notices": 100, "events": 50},
+        "built_at": 7, "dataset_versions": {"notices": 1, "events": 1},
+    }))
+    monkeypatch.setattr(auto_index, "AUTO_INDEX_ON_QUERY", True)
+    monkeypatch.setattr(auto_index, "_pdf_fingerprint", lambda: [])
+    monkeypatch.setattr(auto_index, "_mongo_latest_map", lambda sample: {"notices": 120, "events": 70})
+    monkeypatch.setattr(auto_index, "_collection_has_data", lambda: True)
+    applied = []
+
+    def fake_apply(plan):
+        applied.append(plan)
+        return {"result": {"mongo": {"mongo_error": "events: timeout"}}, "timing": {}}
+
+    monkeypatch.setattr(auto_index, "_apply_plan", fake_apply)
+    monkeypatch.setattr(auto_index, "_failed_mongo", lambda plan, res: ["events"])
+    out = auto_index.ensure_index_ready()
+
+    assert out["reason"] == "incremental" and out["failed"] == ["events"]
+    assert sorted(applied[0]["mongo_changed"]) == ["events", "notices"]
+    saved = json.loads(manifest_path.read_text())
+    assert saved["mongo_latest"] == {"notices": 120, "events": 50}
+    assert saved["built_at"] == 7
+    assert saved["dataset_versions"]["events"] == 1
+    assert saved["dataset_versions"]["notices"] > 1
+
+
+def test_bump_dataset_versions_always_moves_forward(manifest_path):
+    manifest_path.write_text(json.dumps({"pdf": [], "dataset_versions": {"notices": 10**12}}))
+    first = auto_index.bump_dataset_versions(["notices", "", "events"])
+    second = auto_index.bump_dataset_versions(["notices"])
+    assert first["notices"] == 10**12 + 1 and second["notices"] == 10**12 + 2
+    assert auto_index.index_state()["datasets"] == second
+    assert auto_index.bump_dataset_versions([]) == second
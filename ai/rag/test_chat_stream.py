@@ -0,0 +1,114 @@
+# ai/rag/test_chat_stream.py
+# ================================================================
+# 역할
+# - /chat/stream(SSE) 이벤트 순서 확인
+#   · 캐시 미스: sources(LLM 호출 전) → token* → done(answer, ttft_ms), 답변 캐시 저장은 1번
+#   · 캐시/FAQ 적중: sources → token(전체 답변 1회) → done(cached=true)
+#   · 검색 실패는 error(RAG), 토큰 일부를 보낸 뒤 LLM 실패는 error(partial 포함)
+# ================================================================
+import json, os
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+testclient = pytest.importorskip("fastapi.testclient")
+app_mod = pytest.importorskip("rag.app")
+from langchain_core.documents import Document
+
+
+class _Chunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class _ScriptedLLM:
+    """토큰 목록을 순서대로 흘리고, fail_after개 뒤에 예외"""
+    def __init__(self, tokens, fail_after=None):
+        self.tokens, self.fail_after = tokens, fail_after
+        self.prompts = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        for i, t in enumerate(self.tokens):
+            if self.fail_after is not None and i == self.fail_after:
+                raise TimeoutError("upstream timeout")
+            yield _Chunk(t)
+
+
+class _Shelf:
+    docs = [Document(page_content="휴학은 개강 전 2주까지 신청", metadata={"_id": "p1", "dataset": "규정집"})]
+
+    def __init__(self, k, where):
+        self.k, self.where = k, where
+
+    def invoke(self, q):
+        if "실패" in q:
+            raise ConnectionError("chroma unavailable")
+        return list(self.docs)
+
+
+def _events(resp):
+    out = []
+    for block in resp.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    remembered = []
+    monkeypatch.setattr(app_mod.config, "RAG_COALESCE", False)
+    monkeypatch.setattr(app_mod, "_cached_answer", lambda q, k, where: (None, None, None))
+    monkeypatch.setattr(app_mod, "_remember", lambda qvec, scope, where, res: remembered.append(res))
+    monkeypatch.setattr(app_mod, "ActiveRetriever", _Shelf)
+    client = testclient.TestClient(app_mod.app)
+    return client, remembered
+
+
+def test_sources_then_tokens_then_done(chat, monkeypatch):
+    client, remembered = chat
+    llm = _ScriptedLLM(["휴학은 ", "개강 전 ", "2주까지."])
+    monkeypatch.setattr(app_mod, "llm", llm)
+    resp = client.post("/chat/stream", json={"query": "휴학 언제까지?"})
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    ev = _events(resp)
+    assert [e for e, _ in ev] == ["sources", "token", "token", "token", "done"]
+    assert ev[0][1]["sources"][0]["dataset"] == "규정집" and "retrieval_ms" in ev[0][1]
+    assert "".join(d["text"] for e, d in ev if e == "token") == "휴학은 개강 전 2주까지."
+    done = ev[-1][1]
+    assert done["answer"] == "휴학은 개강 전 2주까지." and done["ttft_ms"] <= done["latency_ms"]
+    assert len(llm.prompts) == 1 and remembered[0]["sources"] == ev[0][1]["sources"]
+
+
+def test_cache_hit_replays_whole_answer(chat, monkeypatch):
+    client, remembered = chat
+    hit = {"answer": "시험은 15주차", "sources": [{"_id": "n9", "dataset": "notices"}], "cached": True}
+    monkeypatch.setattr(app_mod, "_cached_answer", lambda q, k, where: (dict(hit), None, None))
+    monkeypatch.setattr(app_mod, "llm", _ScriptedLLM(["쓰이면 안 됨"], fail_after=0))
+    ev = _events(client.post("/chat/stream", json={"query": "기말 언제"}))
+    assert ev == [("sources", {"sources": hit["sources"]}), ("token", {"text": "시험은 15주차"}),
+                  ("done", {**ev[-1][1], "answer": "시험은 15주차", "cached": True})]
+    assert remembered == []
+
+
+def test_retrieval_failure_is_rag_error(chat, monkeypatch):
+    client, _ = chat
+    monkeypatch.setattr(app_mod, "llm", _ScriptedLLM(["x"]))
+    ev = _events(client.post("/chat/stream", json={"query": "검색 실패"}))
+    assert ev == [("error", {"detail": "RAG failed: chroma unavailable"})]
+
+
+def test_llm_failure_keeps_partial_answer(chat, monkeypatch):
+    client, remembered = chat
+    monkeypatch.setattr(app_mod, "llm", _ScriptedLLM(["장학금은 ", "12학점 ", "이상"], fail_after=2))
+    ev = _events(client.post("/chat/stream", json={"query": "장학금 기준"}))
+    assert [e for e, _ in ev] == ["sources", "token", "token", "error"]
+    assert ev[-1][1] == {"detail": "LLM failed: upstream timeout", "partial": "장학금은 12학점 "}
+    assert remembered == []
+
+
+def test_empty_query_and_bad_filters_rejected(chat):
+    client, _ = chat
+    assert client.post("/chat/stream", json={"query": "  "}).status_code == 400
+    assert client.post("/chat/stream", json={"query": "q", "filters": {"$or": []}}).status_code == 400
@@ -0,0 +1,90 @@
+# ai/rag/test_chunker.py
+# ================================================================
+# 역할
+# - 토큰 기준 청커(TokenChunker) 확인 — 공백 단위 토크나이저(offset 포함)로 대체
+#   · 모든 청크가 토큰 예산(모델 한도 - 프리픽스/special) 이하
+#   · 예산을 넘는 문단은 토큰 경계에서 잘리고 내용이 빠지지 않음
+#   · overlap 토큰이 다음 청크 앞에 붙음
+#   · over_limit / legacy_report: 문자 기준 청크가 한도를 넘어 잘리는 수
+# ================================================================
+import re
+
+import pytest
+
+from rag.chunker import TokenChunker
+
+
+class _WordTokenizer:
+    """공백 구분 단어 = 토큰, offset_mapping 지원(fast tokenizer 흉내)"""
+
+    def __init__(self, model_max_length=16):
+        self.model_max_length = model_max_length
+
+    def _encode(self, text):
+        return [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False):
+        single = isinstance(texts, str)
+        offs = [self._encode(t) for t in ([texts] if single else texts)]
+        out = {"input_ids": [list(range(len(o))) for o in offs]}
+        if return_offsets_mapping:
+            out["offset_mapping"] = offs
+        if single:
+            out = {k: v[0] for k, v in out.items()}
+        return out
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+
+def _words(n, tag="w"):
+    return " ".join(f"{tag}{i}" for i in range(n))
+
+
+def test_budget_accounts_for_prefix_and_specials():
+    c = TokenChunker(_WordTokenizer(16))
+    assert c.reserve == 1 + 2  # "passage:" 1토큰 + special 2
+    assert c.max_tokens == 13
+    assert TokenChunker(_WordTokenizer(10**30)).model_limit == 512
+    assert TokenChunker(_WordTokenizer(16), max_tokens=8).max_tokens == 5
+
+
+def test_chunks_fit_budget_and_keep_every_word():
+    c = TokenChunker(_WordTokenizer(16))
+    paras = [_words(4, "a"), _words(30, "long"), _words(3, "b"), "", "  "]
+    chunks = c.chunk(paras)
+    assert all(n <= c.max_tokens for n in c.count(chunks))
+    assert " ".join(chunks).split() == " ".join(paras).split()
+
+
+def test_overlap_repeats_previous_tail():
+    c = TokenChunker(_WordTokenizer(16), overlap_tokens=3)
+    chunks = c.chunk([_words(40)])
+    assert len(chunks) > 1
+    assert all(n <= c.max_tokens for n in c.count(chunks))
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.split()[:3] == prev.split()[-3:]
+
+
+def test_over_limit_and_legacy_report():
+    c = TokenChunker(_WordTokenizer(16))
+    legacy = lambda paras: ["\n".join(paras)]  # 문서를 통째로 한 청크로 만드는 문자 기준 청커 흉내
+    assert c.over_limit([_words(13), _words(14)]) == 1
+    rep = c.legacy_report([_words(10), _words(10)], legacy)
+    assert rep == {"legacy_chunks": 1, "legacy_truncated": 1, "legacy_max_tokens": 20, "token_chunks": 2}
+
+
+def test_ingest_reports_char_truncation(monkeypatch):
+    ingest = pytest.importorskip("rag.ingest")
+    c = TokenChunker(_WordTokenizer(16))
+    monkeypatch.setattr(ingest, "token_chunker", lambda: c)
+    monkeypatch.setattr(ingest, "to_chunks_chars", lambda paras: ["\n".join(paras)])
+    paras = [_words(10, "x"), _words(10, "y")]
+
+    monkeypatch.setattr(ingest, "CHUNK_MODE", "token")
+    chunks, truncated = ingest.to_chunks_counted(paras)
+    assert truncated == 1 and len(chunks) == 2
+
+    monkeypatch.setattr(ingest, "CHUNK_MODE", "char")
+    chunks, truncated = ingest.to_chunks_counted(paras)
+    assert truncated == 1 and chunks == ["\n".join(paras)]
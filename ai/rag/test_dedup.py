@@ -0,0 +1,68 @@
+# ai/rag/test_dedup.py
+# ================================================================
+# 역할
+# - MinHash/LSH 근사 중복 탐지(NearDupIndex) 확인
+#   · 공백/대소문자만 다르거나 한두 글자 다른 공지는 먼저 본 청크로 통합, 다른 내용은 통과
+#   · 같은 seed의 인덱스끼리 서명 공유 가능(컬렉션별 + 전체 집계 인덱스)
+# - ingest dedup 단계: 컬렉션 안 중복만 제거, 컬렉션 간 중복은 남기고 개수만 집계
+# ================================================================
+import numpy as np
+import pytest
+
+from rag.dedup import NearDupIndex
+
+NOTICE = ("2024학년도 1학기 수강신청 정정 기간은 3월 4일부터 3월 8일까지이며, "
+          "정정은 학사정보시스템에서만 가능합니다. 정정 기간 이후에는 과목 추가와 삭제가 불가하며, "
+          "폐강 과목 수강생은 별도 안내에 따라 대체 과목을 신청해야 합니다. "
+          "수강 학점은 학기당 최대 21학점이며 직전 학기 성적 우수자는 24학점까지 신청할 수 있습니다. "
+          "문의는 학사지원팀(02-2610-0000)으로 연락 바랍니다.")
+
+
+def test_near_duplicates_collapse_to_first_seen():
+    idx = NearDupIndex(threshold=0.8)
+    assert idx.match_or_add("notices::1", NOTICE) is None
+    assert idx.match_or_add("notices::2", "  " + NOTICE.upper().replace(" ", "   ") + " ") == "notices::1"
+    assert idx.match_or_add("notices::3", NOTICE.replace("3월 8일", "3월 9일")) == "notices::1"
+    assert idx.match_or_add("notices::4", "도서관 휴관 안내: 시험 기간에는 24시간 운영합니다.") is None
+    assert idx.stats() == {"chunks_seen": 4, "duplicates": 2, "dedup_ratio": 0.5}
+
+
+def test_threshold_controls_what_counts_as_duplicate():
+    edited = NOTICE[: len(NOTICE) * 4 // 5] + " 학과 사무실에서도 정정 신청을 받습니다."
+    strict, loose = NearDupIndex(threshold=0.95), NearDupIndex(threshold=0.5)
+    for idx in (strict, loose):
+        idx.match_or_add("a", NOTICE)
+    assert strict.match_or_add("b", edited) is None
+    assert loose.match_or_add("b", edited) == "a"
+
+
+def test_signatures_are_shared_across_indexes():
+    a, b = NearDupIndex(), NearDupIndex(threshold=0.5)
+    sig = a.signature(NOTICE)
+    np.testing.assert_array_equal(sig, b.signature(NOTICE))
+    assert NearDupIndex(seed=2).signature(NOTICE).tolist() != sig.tolist()
+    b.match_or_add("x", NOTICE, sig)
+    assert b.match_or_add("y", "무관한 텍스트", sig) == "x"  # 넘긴 서명을 그대로 사용
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        NearDupIndex(num_perm=64, bands=10)
+
+
+def test_ingest_stage_keeps_cross_collection_copies():
+    ingest = pytest.importorskip("rag.ingest")
+    cross, merges = NearDupIndex(), {}
+
+    def window(cname, sid):
+        return {"docs": [NOTICE, NOTICE + " "], "ids": [f"mongo::{cname}::{sid}::0", f"mongo::{cname}::{sid}x::0"],
+                "metas": [{"source_id": sid}, {"source_id": f"{sid}x"}], "source_ids": [sid, f"{sid}x"]}
+
+    out = []
+    for cname, sid in (("notices", "1"), ("events", "9")):
+        stage = ingest._dedup_stage(NearDupIndex(), merges, cross)
+        out.extend(stage([window(cname, sid)]))
+    assert [w["ids"] for w in out] == [["mongo::notices::1::0"], ["mongo::events::9::0"]]
+    assert out[0]["source_ids"] == ["1", "1x"]
+    assert merges == {"mongo::notices::1::0": {"1x"}, "mongo::events::9::0": {"9x"}}
+    assert cross.duplicates == 1
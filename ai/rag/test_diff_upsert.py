@@ -0,0 +1,89 @@
+# ai/rag/test_diff_upsert.py
+# ================================================================
+# 역할
+# - 청크 단위 diff upsert(_plan_diff / _write_diff) 확인 (in-memory Chroma)
+#   · 본문 변경/새 청크만 임베딩, 메타만 바뀐 청크는 update, 사라진 청크는 orphan 삭제
+#   · scope(source_type/dataset)로 조회 → 다른 컬렉션의 같은 _id 청크를 지우지 않음
+# ================================================================
+import uuid
+
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+ingest = pytest.importorskip("rag.ingest")
+
+
+@pytest.fixture
+def col():
+    client = chromadb.EphemeralClient()
+    name = f"diff_{uuid.uuid4().hex[:8]}"
+    c = client.create_collection(name, embedding_function=None, metadata={"hnsw:space": "cosine"})
+    yield c
+    client.delete_collection(name)
+
+
+def _meta(sid, dataset, page=0):
+    return {"source_type": "mongo", "source_id": sid, "dataset": dataset, "page": page}
+
+
+def _seed(col, rows):
+    col.add(ids=[r[0] for r in rows], documents=[r[1] for r in rows],
+            metadatas=[r[2] for r in rows], embeddings=[[1.0, 0.0, 0.0]] * len(rows))
+
+
+def _apply(col, docs, metas, ids, source_ids, scope):
+    plan = ingest._plan_diff(col, docs, metas, ids, source_ids, scope)
+    embeds = [[0.0, 1.0, 0.0]] * len(plan["embed_idx"])
+    return plan, ingest._write_diff(col, plan, embeds)
+
+
+def test_only_changed_chunks_are_embedded(col):
+    _seed(col, [
+        ("n::7::0", "수강신청 기간 안내", _meta("7", "notices")),
+        ("n::7::1", "정정 기간은 1주", _meta("7", "notices")),
+        ("n::7::2", "문의는 학사지원팀", _meta("7", "notices")),
+    ])
+    scope = {"source_type": "mongo", "dataset": "notices"}
+    plan, counts = _apply(
+        col,
+        ["수강신청 기간 안내", "정정 기간은 2주", "새 문단"],
+        [_meta("7", "notices", page=1), _meta("7", "notices"), _meta("7", "notices")],
+        ["n::7::0", "n::7::1", "n::7::3"],
+        ["7"], scope,
+    )
+    assert plan["embed_idx"] == [1, 2]
+    assert plan["meta_idx"] == [0]
+    assert plan["orphans"] == ["n::7::2"]
+    assert counts == {"added": 2, "updated": 1, "unchanged": 0, "removed": 1}
+    got = col.get(ids=["n::7::0", "n::7::1", "n::7::2"], include=["documents", "metadatas"])
+    by_id = dict(zip(got["ids"], zip(got["documents"], got["metadatas"])))
+    assert "n::7::2" not in by_id
+    assert by_id["n::7::1"][0] == "정정 기간은 2주"
+    assert by_id["n::7::0"][1]["page"] == 1
+
+
+def test_identical_input_is_a_noop(col):
+    _seed(col, [("p::a::1-0", "제1조 목적", _meta("a", "규정집"))])
+    plan, counts = _apply(col, ["제1조 목적"], [_meta("a", "규정집")], ["p::a::1-0"], ["a"], None)
+    assert plan["embed_idx"] == [] and plan["meta_idx"] == []
+    assert counts["unchanged"] == 1
+
+
+def test_scope_keeps_other_collections_with_same_id(col):
+    _seed(col, [
+        ("mongo::notices::42::0", "공지 본문", _meta("42", "notices")),
+        ("mongo::events::42::0", "행사 본문", _meta("42", "events")),
+    ])
+    scope = {"source_type": "mongo", "dataset": "notices"}
+    plan, counts = _apply(col, [], [], [], ["42"], scope)
+    assert plan["orphans"] == ["mongo::notices::42::0"]
+    assert col.get(ids=["mongo::events::42::0"])["ids"] == ["mongo::events::42::0"]
+
+
+def test_unchanged_canonical_keeps_merged_source_ids(col):
+    merged = {**_meta("9", "notices"), "source_ids": "11|9"}
+    _seed(col, [("mongo::notices::9::0", "같은 공지", merged)])
+    plan, _ = _apply(col, ["같은 공지"], [_meta("9", "notices")], ["mongo::notices::9::0"], ["9"],
+                     {"source_type": "mongo", "dataset": "notices"})
+    assert plan["metas"][0]["source_ids"] == "11|9"
+    assert plan["meta_idx"] == []
@@ -0,0 +1,54 @@
+# ai/rag/test_embed_backend.py
+# ================================================================
+# 역할
+# - EMBED_BACKEND=onnx(int8 양자화)와 torch 임베더의 코사인 일치도 확인
+# - onnx export 실패가 PyTorch/fp32 폴백 없이 예외로 드러나는지 확인
+# - sentence_transformers[onnx]가 없거나 모델을 받을 수 없으면 skip
+# ================================================================
+import pytest
+
+ingest = pytest.importorskip("rag.ingest")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("optimum")
+
+TEXTS = [
+    "query: 수강신청 정정 기간",
+    "query: 재학연기 조건 알려줘",
+    "passage: 성적 평가는 중간고사, 기말고사, 과제 및 출석 등을 종합하여 평가한다.",
+    "passage: 제1조(목적) 이 학칙은 동양미래대학교의 학사 운영에 관한 사항을 규정함을 목적으로 한다.",
+]
+
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    mp = pytest.MonkeyPatch()
+    mp.setattr(ingest, "EMBED_ONNX_DIR", str(tmp_path_factory.mktemp("onnx")))
+    try:
+        yield ingest.load_embedder("torch"), ingest.load_embedder("onnx")
+    except OSError as e:  # 오프라인 등으로 모델 다운로드 불가
+        pytest.skip(f"embedder unavailable: {e}")
+    finally:
+        mp.undo()
+
+
+def test_onnx_matches_torch(backends):
+    cos = ingest.embed_parity(*backends, TEXTS)
+    assert cos.mean() > 0.99
+    assert cos.min() >= ingest.EMBED_ONNX_MIN_COS
+
+
+def test_export_failure_raises(monkeypatch, tmp_path):
+    import sentence_transformers
+
+    def broken(*_a, **_k):
+        raise ValueError("quantization unsupported")
+
+    monkeypatch.setattr(ingest, "EMBED_ONNX_DIR", str(tmp_path))
+    monkeypatch.setattr(sentence_transformers, "export_dynamic_quantized_onnx_model", broken)
+    with pytest.raises(RuntimeError, match="export"):
+        ingest.load_embedder("onnx")
+
+
+def test_unknown_backend_raises():
+    with pytest.raises(ValueError):
+        ingest.load_embedder("openvino")
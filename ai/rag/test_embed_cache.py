@@ -0,0 +1,81 @@
+# ai/rag/test_embed_cache.py
+# ================================================================
+# 역할
+# - SQLite 임베딩 캐시(EmbeddingCache / cached_encode) 확인
+#   · 모델명별 키 분리, hit/miss 카운터, 오래 안 쓴 항목부터 eviction
+#   · 조회 시 atime 갱신은 모아 두었다가 put에서 반영(읽기 경로에서 쓰지 않음)
+#   · cached_encode는 캐시에 없는 텍스트만 encode
+# ================================================================
+import numpy as np
+import pytest
+
+from rag import embed_cache
+from rag.embed_cache import EmbeddingCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = EmbeddingCache(str(tmp_path / "emb.sqlite3"), max_entries=10, touch_s=0)
+    yield c
+    c._conn.close()
+
+
+def _vec(seed: int, dim: int = 4) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def test_roundtrip_and_model_isolation(cache):
+    cache.put_many("e5-small", ["passage: 휴학"], [_vec(1)])
+    got = cache.get_many("e5-small", ["passage: 휴학", "passage: 복학"])
+    np.testing.assert_array_equal(got[0], _vec(1))
+    assert got[1] is None
+    assert cache.get_many("e5-small@onnx", ["passage: 휴학"]) == [None]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lookup_defers_atime_write(cache):
+    cache.put_many("m", ["a"], [_vec(2)])
+    cache._conn.execute("UPDATE emb SET atime=0")
+    cache._conn.commit()
+    cache.get_many("m", ["a"])
+    (atime,) = cache._conn.execute("SELECT atime FROM emb").fetchone()
+    assert atime == 0 and len(cache._touch) == 1
+    cache.put_many("m", ["b"], [_vec(3)])
+    (atime,) = cache._conn.execute("SELECT atime FROM emb WHERE key=?", (embed_cache._key("m", "a"),)).fetchone()
+    assert atime > 0 and not cache._touch
+
+
+def test_recent_rows_are_not_touched(tmp_path):
+    c = EmbeddingCache(str(tmp_path / "emb.sqlite3"), touch_s=3600)
+    c.put_many("m", ["a"], [_vec(4)])
+    c.get_many("m", ["a"])
+    assert not c._touch
+    c._conn.close()
+
+
+def test_evicts_least_recently_used(cache):
+    texts = [f"t{i}" for i in range(10)]
+    cache.put_many("m", texts, [_vec(i) for i in range(10)])
+    # t0만 최근에 읽힌 것으로 표시, 나머지는 오래된 것으로
+    cache._conn.execute("UPDATE emb SET atime=1")
+    cache._conn.commit()
+    cache.get_many("m", ["t0"])
+    cache.put_many("m", ["t10"], [_vec(10)])
+    left = cache.get_many("m", texts + ["t10"])
+    assert left[0] is not None and left[-1] is not None
+    assert cache.stats()["entries"] <= 10
+
+
+def test_cached_encode_only_encodes_misses(cache, monkeypatch):
+    monkeypatch.setattr(embed_cache, "get_cache", lambda: cache)
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.stack([_vec(len(t)) for t in texts])
+
+    first = embed_cache.cached_encode("m", ["query: 가", "query: 나다"], encode)
+    second = embed_cache.cached_encode("m", ["query: 나다", "query: 라마바"], encode)
+    assert calls == [["query: 가", "query: 나다"], ["query: 라마바"]]
+    np.testing.assert_array_equal(second[0], first[1])
+    assert second.shape == (2, 4) and second.dtype == np.float32
@@ -0,0 +1,49 @@
+# ai/rag/test_embed_pool.py
+# ================================================================
+# 역할
+# - 대량 인덱싱 임베딩 경로(_encode_in_batches) 확인
+#   · EMBED_POOL_MIN_CHUNKS 이상일 때만 멀티 프로세스 풀로 한 번에 넘김, 미만이면 EMBED_BATCH 단위 프로세스 내 인코딩
+#   · 어느 경로든 passage: 프리픽스 + 입력 순서 유지
+# ================================================================
+import numpy as np
+import pytest
+
+ingest = pytest.importorskip("rag.ingest")
+from rag import embed_cache
+
+POOL = object()
+
+
+class _RecordingModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, pool=None, batch_size=None, convert_to_numpy=True, normalize_embeddings=True):
+        self.calls.append((list(texts), pool))
+        return np.array([[float(len(t)), float(i)] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setattr(embed_cache, "get_cache", lambda: None)
+    monkeypatch.setattr(ingest, "embed_pool", lambda: POOL)
+    monkeypatch.setattr(ingest, "EMBED_POOL_MIN_CHUNKS", 4)
+    monkeypatch.setattr(ingest, "EMBED_BATCH", 2)
+    return _RecordingModel()
+
+
+def test_small_batches_stay_in_process(model, monkeypatch):
+    # 풀 기동 자체를 하지 않아야 함
+    monkeypatch.setattr(ingest, "embed_pool", lambda: pytest.fail("pool started for a small batch"))
+    vecs = ingest._encode_in_batches(model, ["가", "나나", "다다다"])
+    assert [c[1] for c in model.calls] == [None, None]
+    assert [c[0] for c in model.calls] == [["passage: 가", "passage: 나나"], ["passage: 다다다"]]
+    assert [v[0] for v in vecs] == [10.0, 11.0, 12.0]
+
+
+def test_large_batches_go_to_pool_in_order(model):
+    docs = [f"제{i}조" for i in range(6)]
+    vecs = ingest._encode_in_batches(model, docs)
+    assert len(model.calls) == 1 and model.calls[0][1] is POOL
+    assert model.calls[0][0] == [f"passage: {d}" for d in docs]
+    assert [v[1] for v in vecs] == [float(i) for i in range(6)]
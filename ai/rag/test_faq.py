@@ -0,0 +1,133 @@
+# ai/rag/test_faq.py
+# ================================================================
+# 역할
+# - FAQ 사전 계산 확인
+#   · mine_intents: 정규화 질의 합치기, 의도 클러스터링, 최소 빈도/상위 N, 대표 표현
+#   · build_faq → FaqStore.lookup: 표현 벡터 매칭, 근거 없는 답변 제외, 임베더/버전 불일치는 stale
+#   · stale 감지 재계산은 인덱스 버전당 1번, 실패하면 쿨다운 동안 다시 시도하지 않음(프로세스 간 공유)
+# ================================================================
+import numpy as np
+import pytest
+
+from rag import faq
+from rag.faq import FaqStore, build_faq, mine_intents
+
+TOPICS = {"휴학": 0, "장학금": 1, "시험": 2, "주차": 3}
+
+
+def topic_embed(texts):
+    """주제 단어 축 + 표현마다 다른 작은 성분(같은 주제끼리 코사인 ≈ 0.99)"""
+    out = np.zeros((len(texts), 8), dtype=np.float32)
+    for r, t in enumerate(texts):
+        for word, axis in TOPICS.items():
+            if word in t:
+                out[r, axis] = 1.0
+        out[r, 4 + len(t) % 4] = 0.1
+    return out
+
+
+LOGS = (["휴학 신청 언제까지야?"] * 4 + ["휴학신청 언제까지야"] * 2 + ["휴학 어떻게 해요"] * 2
+        + ["장학금 기준 알려줘"] * 3 + ["시험 일정"] * 3 + ["주차 되나요"] + ["   ", "?!"])
+
+
+def test_mine_intents_groups_and_ranks():
+    intents = mine_intents(LOGS, topic_embed, top_n=5, threshold=0.9, min_count=3)
+    assert [(it["question"], it["count"]) for it in intents] == [
+        ("휴학 신청 언제까지야?", 8), ("장학금 기준 알려줘", 3), ("시험 일정", 3)]
+    assert intents[0]["variants"] == ["휴학 신청 언제까지야?", "휴학 어떻게 해요"]
+    assert intents[0]["vecs"].shape == (2, 8)
+
+
+def test_mine_intents_top_n_and_empty():
+    assert len(mine_intents(LOGS, topic_embed, top_n=1, threshold=0.9, min_count=1)) == 1
+    assert mine_intents(["", " ?"], topic_embed) == []
+
+
+class _Index:
+    def __init__(self):
+        self.state = {"collection": "school_corpus_A", "built_at": 10, "datasets": {"규정집": 1, "notices": 1}}
+
+    def __call__(self):
+        return self.state
+
+
+def _answer(question):
+    if "시험" in question:
+        return {"answer": "모르겠어요", "sources": []}
+    ds = "규정집" if "휴학" in question else "notices"
+    return {"answer": f"{question} 답변", "sources": [{"dataset": ds, "page": 3}]}
+
+
+@pytest.fixture
+def built(tmp_path):
+    index = _Index()
+    path = str(tmp_path / "faq_answers.npz")
+    res = build_faq(_answer, topic_embed, index, messages=LOGS, path=path, top_n=10, model="e5")
+    return index, path, res
+
+
+def test_build_skips_answers_without_sources(built):
+    index, path, res = built
+    assert (res["intents"], res["entries"], res["skipped"]) == (3, 2, 1)
+    st = FaqStore(index, path=path, threshold=0.95, model="e5").stats()
+    assert [q["question"] for q in st["questions"]] == ["휴학 신청 언제까지야?", "장학금 기준 알려줘"]
+
+
+def test_lookup_matches_variants(built):
+    index, path, _ = built
+    store = FaqStore(index, path=path, threshold=0.95, model="e5")
+    hit = store.lookup(topic_embed(["휴학은 어떻게 해요"])[0])
+    assert hit["question"] == "휴학 신청 언제까지야?" and hit["answer"]["answer"].endswith("답변")
+    assert store.lookup(topic_embed(["주차 되나요"])[0]) is None
+    assert (store.hits, store.misses, store.stale) == (1, 1, 0)
+
+
+def test_other_embedder_is_stale(built):
+    index, path, _ = built
+    store = FaqStore(index, path=path, threshold=0.95, model="bge-m3")
+    assert store.lookup(topic_embed(["휴학 신청"])[0]) is None
+    assert store.stale == 1
+
+
+def test_unrelated_dataset_bump_keeps_entry(built):
+    index, path, _ = built
+    store = FaqStore(index, path=path, threshold=0.95, model="e5")
+    index.state["datasets"]["notices"] = 2
+    assert store.lookup(topic_embed(["휴학 신청"])[0]) is not None
+    assert store.lookup(topic_embed(["장학금 기준"])[0]) is None and store.stale == 1
+
+
+def test_stale_rebuild_once_per_version_with_cooldown(built, monkeypatch):
+    index, path, _ = built
+    monkeypatch.setattr(faq, "FAQ_RETRY_COOLDOWN_S", 300)
+    store = FaqStore(index, path=path, threshold=0.95, model="e5")
+    scheduled = []
+    store.schedule_rebuild = lambda: scheduled.append(1) or store.rebuild()
+    store.set_job(lambda: (_ for _ in ()).throw(RuntimeError("LLM down")))
+
+    index.state["built_at"] = 11
+    q = topic_embed(["휴학 신청"])[0]
+    for _ in range(3):
+        assert store.lookup(q) is None
+    assert len(scheduled) == 1 and store.skipped_rebuilds == 2
+    assert store.stats()["last_attempt"]["failed_at"]
+
+    # 같은 파일을 보는 다른 프로세스도 같은 버전으로는 재시도하지 않음
+    other = FaqStore(index, path=path, threshold=0.95, model="e5")
+    other.schedule_rebuild = lambda: scheduled.append(2)
+    other.lookup(q)
+    assert scheduled == [1] and other.skipped_rebuilds == 1
+
+    monkeypatch.setattr(faq, "FAQ_RETRY_COOLDOWN_S", 0)
+    other.lookup(q)
+    assert scheduled == [1, 2]
+
+
+def test_successful_rebuild_is_not_repeated(built):
+    index, path, _ = built
+    store = FaqStore(index, path=path, threshold=0.95, model="e5")
+    store.set_job(lambda: build_faq(_answer, topic_embed, index, messages=LOGS[:4], path=path, model="e5"))
+    index.state["datasets"]["규정집"] = 2
+    assert store.rebuild()["entries"] == 1
+    assert store.lookup(topic_embed(["휴학 신청"])[0]) is not None
+    assert not store._should_rebuild(faq._version_key(index.state))
@@ -0,0 +1,102 @@
+# ai/rag/test_filters.py
+# ================================================================
+# 역할
+# - 친화적 필터 → Chroma where 컴파일 확인(compile_filters)
+#   · dataset 목록/단일값, 날짜 범위(날짜만 주면 to는 그날 23:59:59), 밀리초 타임스탬프
+#   · 조건 2개 이상이면 $and, 빈 값은 조건 없음
+# - 원시 where 검증(_validate_where): $and/$or 피연산자 2개 미만, 알 수 없는 연산자 → FilterError
+# - partition_values: 최상위/$and 안의 dataset 고정만 인식
+# ================================================================
+import pytest
+
+from rag.filters import FilterError, compile_filters, partition_values, _validate_where
+
+KST_0301 = 1709218800  # 2024-03-01T00:00:00+09:00
+
+
+@pytest.mark.parametrize("filters, where", [
+    (None, None),
+    ({}, None),
+    ({"dataset": []}, None),
+    ({"dataset": ["규정집"]}, {"dataset": "규정집"}),
+    ({"dataset": "notices"}, {"dataset": "notices"}),
+    ({"dataset": ["규정집", "notices", "규정집", ""]}, {"dataset": {"$in": ["규정집", "notices"]}}),
+    ({"updated_from": "", "dataset": None}, None),
+])
+def test_dataset_and_empty_values(filters, where):
+    assert compile_filters(filters) == where
+
+
+def test_date_range_to_is_inclusive_end_of_day():
+    where = compile_filters({"dataset": ["pdf"], "updated_from": "2024-03-01T00:00:00+09:00",
+                             "updated_to": KST_0301 * 1000})
+    assert where == {"$and": [{"dataset": "pdf"},
+                              {"updated_at": {"$gte": KST_0301}},
+                              {"updated_at": {"$lte": KST_0301}}]}
+    day = compile_filters({"updated_at": {"to": "2024-03-01"}})
+    start = compile_filters({"updated_at": {"from": "2024-03-01"}})
+    assert day["updated_at"]["$lte"] - start["updated_at"]["$gte"] == 86399
+
+
+def test_operator_dicts_are_split_per_operator():
+    where = compile_filters({"updated_at": {"$gt": "1709218800", "$lt": 1709305200}, "page": {"$gte": 3}})
+    assert where == {"$and": [{"updated_at": {"$gt": KST_0301}},
+                              {"updated_at": {"$lt": 1709305200}},
+                              {"page": {"$gte": 3}}]}
+
+
+@pytest.mark.parametrize("bad", [
+    {"$and": [{"dataset": "pdf"}]},
+    {"$or": []},
+    {"$or": {"dataset": "pdf"}},
+    {"$and": [{"dataset": "pdf"}, "notices"]},
+    {"$and": [{"dataset": "pdf"}, {"$or": [{"page": 1}]}]},
+    {"$not": [{"dataset": "pdf"}]},
+    {"$and": [{"page": {"$gte": 1, "$lte": 3}}, {"dataset": "pdf"}]},
+    {"$and": [{"page": {"$regex": "1"}}, {"dataset": "pdf"}]},
+])
+def test_invalid_raw_where_raises(bad):
+    with pytest.raises(FilterError):
+        compile_filters(bad)
+
+
+def test_valid_raw_where_passes_through():
+    where = {"$or": [{"dataset": "pdf"}, {"$and": [{"page": {"$gte": 2}}, {"lang": "ko"}]}]}
+    _validate_where(where)
+    assert compile_filters(where) is where
+
+
+@pytest.mark.parametrize("bad", [
+    "dataset=pdf",
+    {"updated_from": "3월 1일"},
+    {"updated_to": True},
+    {"dataset": {"$in": []}},
+    {"dataset": {"$like": "pdf"}},
+])
+def test_invalid_friendly_filters_raise(bad):
+    with pytest.raises(FilterError):
+        compile_filters(bad)
+
+
+def test_filter_error_is_value_error():
+    assert issubclass(FilterError, ValueError)
+
+
+@pytest.mark.parametrize("where, vals, rest", [
+    ({"dataset": "pdf"}, ["pdf"], None),
+    ({"dataset": {"$in": ["pdf", "notices"]}}, ["pdf", "notices"], None),
+    ({"$and": [{"page": {"$gte": 2}}, {"dataset": {"$eq": "pdf"}}]}, ["pdf"], {"page": {"$gte": 2}}),
+    ({"$and": [{"dataset": "pdf"}, {"page": 1}, {"lang": "ko"}]}, ["pdf"], {"$and": [{"page": 1}, {"lang": "ko"}]}),
+])
+def test_partition_values_pinned(where, vals, rest):
+    assert partition_values(where, "dataset") == (vals, rest)
+
+
+@pytest.mark.parametrize("where", [
+    None,
+    {"dataset": {"$ne": "pdf"}},
+    {"$or": [{"dataset": "pdf"}, {"dataset": "notices"}]},
+    {"$and": [{"page": 1}, {"lang": "ko"}]},
+])
+def test_partition_values_not_pinned(where):
+    assert partition_values(where, "dataset") == (None, where)
@@ -0,0 +1,55 @@
+# ai/rag/test_ingest_pdfs.py
+# ================================================================
+# 역할
+# - 멀티 프로세스 PDF 준비(_prepared_pdfs, workers>1)가 직렬 결과와 같은지 확인
+# - 파이프라인이 중간에 멈추면 워커 프로세스가 남지 않는지 확인
+# - PyMuPDF/ingest 의존성 또는 토크나이저가 없으면 skip
+# ================================================================
+import multiprocessing
+
+import pytest
+
+ingest = pytest.importorskip("rag.ingest")
+fitz = pytest.importorskip("fitz")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def tokenizer():
+    try:
+        ingest.token_chunker()
+    except OSError as e:  # 오프라인 등으로 토크나이저를 받을 수 없음
+        pytest.skip(f"tokenizer unavailable: {e}")
+
+
+@pytest.fixture
+def rulebooks(tmp_path):
+    paths = []
+    for n in range(4):
+        doc = fitz.open()
+        for page_no in range(2):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Article {n}-{page_no}. Students must apply for leave before the term.")
+        p = tmp_path / f"rules_{n}.pdf"
+        doc.save(str(p))
+        doc.close()
+        paths.append(str(p))
+    return paths
+
+
+def test_parallel_matches_serial(rulebooks):
+    serial = {p["path"]: p for p in ingest._prepared_pdfs(rulebooks, 1)}
+    parallel = {p["path"]: p for p in ingest._prepared_pdfs(rulebooks, 2)}
+    assert sorted(parallel) == sorted(rulebooks)
+    for path in rulebooks:
+        assert parallel[path]["ids"] == serial[path]["ids"]
+        assert parallel[path]["docs"] == serial[path]["docs"]
+        assert parallel[path]["pages"] == 2
+        assert parallel[path]["source_ids"] == [parallel[path]["source_id"]]
+
+
+def test_closing_early_leaves_no_workers(rulebooks):
+    gen = ingest._prepared_pdfs(rulebooks, 2)
+    first = next(gen)
+    gen.close()
+    assert first["path"] in rulebooks
+    assert multiprocessing.active_children() == []
@@ -0,0 +1,83 @@
+# ai/rag/test_ingest_resume.py
+# ================================================================
+# 역할
+# - 중단 후 재개용 위치 기록 확인
+#   · _resume_query: 체크포인트/워터마크 중 더 뒤 위치 이후만, 경계 타임스탬프 문서는 _id로 이어 읽음
+#   · _advance: 워터마크는 뒤로 가지 않음
+#   · 워터마크는 대상 Chroma 컬렉션(A/B)별로 따로 저장, 이전 형식은 활성 컬렉션 것으로 읽음
+#   · 체크포인트 저장/로드 왕복
+# ================================================================
+import datetime, json
+
+import pytest
+
+ingest = pytest.importorskip("rag.ingest")
+from bson import ObjectId
+
+UF = "updated_at"
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "CHROMA_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest, "_WATERMARK", str(tmp_path / "mongo_watermarks.json"))
+    monkeypatch.setattr(ingest, "_CHECKPOINT", str(tmp_path / "ingest_checkpoint.json"))
+    monkeypatch.setattr(ingest, "active_collection_name", lambda: "school_corpus_A")
+    return tmp_path
+
+
+def _ts(day: int) -> int:
+    return int(datetime.datetime(2024, 5, day).timestamp())
+
+
+def test_boundary_documents_resume_by_id():
+    oid = ObjectId()
+    q = ingest._resume_query({}, UF, {"ts": _ts(3), "last_id": str(oid)})
+    ts = datetime.datetime.fromtimestamp(_ts(3))
+    assert q == {"$or": [{UF: {"$gt": ts}}, {UF: ts, "_id": {"$gt": oid}}]}
+
+
+def test_later_watermark_wins_over_checkpoint():
+    base = {"board": "notice"}
+    q = ingest._resume_query(base, UF, {"ts": _ts(1), "last_id": 7}, since={"ts": _ts(9), "last_id": None})
+    assert q == {"$and": [base, {UF: {"$gte": datetime.datetime.fromtimestamp(_ts(9))}}]}
+
+
+def test_id_only_checkpoint_and_fresh_start():
+    oid = ObjectId()
+    assert ingest._resume_query({}, UF, {"last_id": str(oid)}) == {"_id": {"$gt": oid}}
+    assert ingest._resume_query({"a": 1}, UF, {}) == {"a": 1}
+
+
+def test_advance_never_moves_backwards():
+    wm = {}
+    assert ingest._advance(wm, "notices", _ts(5), ObjectId("65f000000000000000000001"))
+    assert wm["notices"] == {"ts": _ts(5), "last_id": "65f000000000000000000001"}
+    assert not ingest._advance(wm, "notices", _ts(4), 3)
+    assert not ingest._advance(wm, "notices", 0, 3)
+    assert wm["notices"]["ts"] == _ts(5)
+
+
+def test_watermarks_are_kept_per_target(state_dir):
+    ingest._save_watermarks("school_corpus_A", {"notices": {"ts": _ts(2), "last_id": 11}})
+    ingest._save_watermarks("school_corpus_B", {"notices": {"ts": _ts(8), "last_id": 12}})
+    ingest._reset_watermarks("school_corpus_B")
+    assert ingest._load_watermarks("school_corpus_A") == {"notices": {"ts": _ts(2), "last_id": 11}}
+    assert ingest._load_watermarks("school_corpus_B") == {}
+
+
+def test_legacy_watermarks_belong_to_active(state_dir):
+    (state_dir / "mongo_watermarks.json").write_text(json.dumps({"notices": _ts(4)}), encoding="utf-8")
+    assert ingest._load_watermarks("school_corpus_A") == {"notices": {"ts": _ts(4), "last_id": None}}
+    assert ingest._load_watermarks("school_corpus_B") == {}
+
+
+def test_checkpoint_roundtrip(state_dir):
+    assert ingest._load_checkpoint() == {"pdf_done": {}, "mongo": {}}
+    cp = {"collection": "school_corpus_B", "pdf_done": {"/x.pdf": {"mtime": 1.0, "pages": 2, "chunks": 5}},
+          "mongo": {"notices": {"ts": _ts(6), "last_id": 40, "done": False}}}
+    ingest._save_checkpoint(cp)
+    assert ingest._load_checkpoint() == cp
+    ingest._clear_checkpoint()
+    ingest._clear_checkpoint()
+    assert ingest._load_checkpoint()["mongo"] == {}
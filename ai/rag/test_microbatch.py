@@ -0,0 +1,87 @@
+# ai/rag/test_microbatch.py
+# ================================================================
+# 역할
+# - 마이크로 배처 확인
+#   · 동시 호출이 한 배치로 묶이고 각 호출자는 자기 입력의 결과만 받음
+#   · max_batch 한도, 배치 함수 예외는 그 배치의 호출자 전원에게 전달(워커는 계속 동작)
+#   · 결과 개수가 입력과 다르면 RuntimeError
+#   · 배치 크기 분포 통계
+# ================================================================
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rag.microbatch import MicroBatcher
+
+
+class _GatedSquare:
+    """첫 배치를 gate가 열릴 때까지 붙잡아 그동안 들어온 요청이 큐에 쌓이게 함"""
+    def __init__(self):
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+        self.sizes = []
+
+    def __call__(self, xs):
+        self.sizes.append(len(xs))
+        if len(self.sizes) == 1:
+            self.entered.set()
+            self.gate.wait(5)
+        return [x * x for x in xs]
+
+
+def _submit_while_blocked(fn, batcher, values):
+    with ThreadPoolExecutor(len(values) + 1) as pool:
+        head = pool.submit(batcher.submit, -1)
+        assert fn.entered.wait(5)
+        futs = [pool.submit(batcher.submit, v) for v in values]
+        while batcher._q.qsize() < len(values):
+            time.sleep(0.005)
+        fn.gate.set()
+        return head.result(5), [f.result(5) for f in futs]
+
+
+def test_concurrent_calls_share_a_batch():
+    fn = _GatedSquare()
+    b = MicroBatcher(fn, max_batch=32, max_wait_ms=50, name="t-share")
+    head, rest = _submit_while_blocked(fn, b, list(range(10)))
+    assert head == 1 and rest == [v * v for v in range(10)]
+    assert fn.sizes == [1, 10]
+    st = b.stats()
+    assert st["batches"] == 2 and st["items"] == 11
+    assert st["batch_size_hist"]["<=1"] == 1 and st["batch_size_hist"]["<=16"] == 1
+
+
+def test_max_batch_caps_collection():
+    fn = _GatedSquare()
+    b = MicroBatcher(fn, max_batch=4, max_wait_ms=50, name="t-cap")
+    _, rest = _submit_while_blocked(fn, b, list(range(9)))
+    assert rest == [v * v for v in range(9)]
+    assert fn.sizes[0] == 1 and max(fn.sizes[1:]) <= 4 and sum(fn.sizes[1:]) == 9
+
+
+def test_submit_many_keeps_order():
+    b = MicroBatcher(lambda xs: [f"<{x}>" for x in xs], max_batch=3, max_wait_ms=1, name="t-order")
+    assert b.submit_many(list("abcdefg")) == [f"<{c}>" for c in "abcdefg"]
+
+
+def test_failure_reaches_callers_and_worker_survives():
+    calls = []
+
+    def flaky(xs):
+        calls.append(list(xs))
+        if len(calls) == 1:
+            raise ValueError("encoder OOM")
+        return xs
+
+    b = MicroBatcher(flaky, max_batch=8, max_wait_ms=1, name="t-fail")
+    with pytest.raises(ValueError, match="OOM"):
+        b.submit("x")
+    assert b.submit("y") == "y"
+    assert b.stats()["failures"] == 1
+
+
+def test_wrong_result_count_is_an_error():
+    b = MicroBatcher(lambda xs: xs[:-1], max_batch=8, max_wait_ms=1, name="t-short")
+    with pytest.raises(RuntimeError, match="returned 0 results for 1 inputs"):
+        b.submit("q")
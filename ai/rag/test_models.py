@@ -0,0 +1,93 @@
+# ai/rag/test_models.py
+# ================================================================
+# 역할
+# - 모델 레지스트리 확인(get_model / unload / model_stats)
+#   · 동시 요청이 몰려도 키당 loader 1회, 모두 같은 객체
+#   · on_load는 다른 스레드가 모델을 받기 전에 1번 실행
+#   · 다른 키의 로드는 서로 막지 않음, loader 예외는 캐시하지 않음
+# ================================================================
+import threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rag import models
+
+
+@pytest.fixture
+def key():
+    k = f"test-{uuid.uuid4().hex[:8]}"
+    yield k
+    models.unload(k)
+
+
+class _SlowLoader:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {"weights": object()}
+
+
+def test_concurrent_first_use_loads_once(key):
+    loader, warmed = _SlowLoader(), []
+    start = threading.Barrier(16)
+
+    def use():
+        start.wait()
+        m = models.get_model(key, loader, on_load=lambda m: warmed.append(m))
+        return m, len(warmed)
+
+    with ThreadPoolExecutor(16) as pool:
+        got = list(pool.map(lambda _: use(), range(16)))
+    assert loader.calls == 1 and len(warmed) == 1
+    assert all(m is warmed[0] and n == 1 for m, n in got)
+    assert key in models.model_stats()["models"]
+
+
+def test_keys_load_independently(key):
+    other = key + "-b"
+    release = threading.Event()
+
+    def waits_for_other():
+        assert release.wait(2), "다른 키 로드가 막힘"
+        return "a"
+
+    def releases():
+        release.set()
+        return "b"
+
+    try:
+        with ThreadPoolExecutor(2) as pool:
+            fa = pool.submit(models.get_model, key, waits_for_other)
+            time.sleep(0.05)
+            fb = pool.submit(models.get_model, other, releases)
+            assert (fa.result(3), fb.result(3)) == ("a", "b")
+    finally:
+        models.unload(other)
+
+
+def test_failed_load_is_retried(key):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("model file missing")
+        return "ok"
+
+    with pytest.raises(OSError):
+        models.get_model(key, flaky)
+    assert key not in models.model_stats()["models"]
+    assert models.get_model(key, flaky) == "ok" and len(attempts) == 2
+
+
+def test_unload_forces_reload(key):
+    loader = _SlowLoader(delay=0)
+    first = models.get_model(key, loader)
+    assert models.get_model(key, loader) is first
+    assert models.unload(key) and not models.unload(key)
+    assert models.get_model(key, loader) is not first and loader.calls == 2
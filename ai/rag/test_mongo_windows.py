@@ -0,0 +1,65 @@
+# ai/rag/test_mongo_windows.py
+# ================================================================
+# 역할
+# - 스트리밍 Mongo 인덱싱의 배치/윈도우 구성 확인(_iter_batches / _iter_windows)
+#   · 커서를 끝까지 읽지 않고 윈도우 단위로 내보냄(메모리 사용량이 컬렉션 크기와 무관)
+#   · 문서 1건의 청크는 한 윈도우에만, 본문 없는 문서도 source_ids에 포함(옛 청크 정리용)
+#   · 윈도우의 (max_ts, max_id)는 uf가 가장 큰 문서 위치
+# ================================================================
+import datetime, itertools
+
+import pytest
+
+ingest = pytest.importorskip("rag.ingest")
+from bson import ObjectId
+
+
+@pytest.fixture(autouse=True)
+def paragraph_chunks(monkeypatch):
+    # 문단 = 청크(토크나이저 없이 윈도우 경계만 확인)
+    monkeypatch.setattr(ingest, "to_chunks_counted", lambda paras: (list(paras), 0))
+
+
+def _notice(day: int, paras: int):
+    body = "\n\n".join(f"{day}일 공지 {i}번째 문단" for i in range(paras))
+    return {"_id": ObjectId(), "content": body,
+            "updated_at": datetime.datetime(2024, 3, day, tzinfo=datetime.timezone.utc)}
+
+
+def test_iter_batches_groups_cursor():
+    assert list(ingest._iter_batches(iter(range(7)), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_documents_never_straddle_windows():
+    recs = [_notice(d, paras=1 + d % 3) for d in range(1, 13)]
+    wins = list(ingest._iter_windows(iter(recs), "notices", "updated_at", window=4))
+    owner = {}
+    for w_no, w in enumerate(wins):
+        for cid in w["ids"]:
+            owner.setdefault(cid.rsplit("::", 1)[0], set()).add(w_no)
+    assert all(len(ws) == 1 for ws in owner.values())
+    assert all(len(w["ids"]) >= 4 for w in wins[:-1])
+    assert sum(len(w["source_ids"]) for w in wins) == len(recs)
+    assert wins[-1]["last_id"] == recs[-1]["_id"]
+    assert wins[0]["scope"] == {"source_type": "mongo", "dataset": "notices"}
+
+
+def test_window_position_and_textless_documents():
+    late, early = _notice(20, 1), _notice(5, 1)
+    empty = {"_id": ObjectId(), "content": "   ", "updated_at": early["updated_at"]}
+    (win,) = ingest._iter_windows(iter([early, late, empty]), "notices", "updated_at", window=100)
+    assert win["source_ids"] == [str(early["_id"]), str(late["_id"]), str(empty["_id"])]
+    assert win["max_ts"] == int(late["updated_at"].timestamp()) and win["max_id"] == late["_id"]
+    assert win["last_id"] == empty["_id"]
+
+
+def test_windows_stream_without_draining_the_cursor():
+    pulled = []
+
+    def endless():
+        for d in itertools.count(1):
+            pulled.append(d)
+            yield _notice(1 + d % 28, paras=2)
+
+    first = next(ingest._iter_windows(endless(), "notices", "updated_at", window=6))
+    assert len(first["ids"]) == 6 and len(pulled) == 3
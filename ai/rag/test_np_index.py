@@ -0,0 +1,129 @@
+# ai/rag/test_np_index.py
+# ================================================================
+# 역할
+# - NumPy 인덱스 export → 검색이 brute-force 결과와 같은지 확인
+#   · col.get 페이지 단위 export, 파티션 키(dataset) 순 정렬 + 값별 연속 구간
+#   · dataset 고정 where는 파티션 구간(view)만 검색, 나머지 조건은 구간 안 마스크
+#   · 숫자/문자열 컬럼 where 마스크, float16 저장본 블록 검색
+# - export_index가 읽는 rag.store는 메모리 컬렉션으로 대체(chromadb 없이 실행)
+# ================================================================
+import sys, types
+
+import numpy as np
+import pytest
+
+from rag import np_index
+
+DATASETS = ["haksa", "notice", "pdf"]
+
+
+class _PagedCollection:
+    """Chroma Collection.get(limit, offset) 페이지 읽기만 흉내"""
+    metadata = {"hnsw:space": "cosine"}
+
+    def __init__(self, n=240, dim=24, seed=7):
+        rng = np.random.default_rng(seed)
+        self.vecs = rng.normal(size=(n, dim)).astype(np.float32)
+        self.ids = [f"doc{i:04d}" for i in range(n)]
+        self.metas = [{"dataset": DATASETS[i % 3], "year": 2015 + i % 10,
+                       **({"lang": "en"} if i % 7 == 0 else {})} for i in range(n)]
+        self.pages = 0
+
+    def get(self, include, limit, offset):
+        self.pages += 1
+        sl = slice(offset, offset + limit)
+        return {"ids": self.ids[sl], "embeddings": self.vecs[sl].tolist(),
+                "documents": [f"본문 {cid}" for cid in self.ids[sl]], "metadatas": self.metas[sl]}
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    col = _PagedCollection()
+    fake_store = types.ModuleType("rag.store")
+    fake_store.get_client = lambda d: None
+    fake_store.get_collection = lambda client, name=None: col
+    fake_store.active_collection_name = lambda: "school_corpus_A"
+    monkeypatch.setitem(sys.modules, "rag.store", fake_store)
+    monkeypatch.setattr(np_index, "NP_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(np_index, "_EXPORT_PAGE", 64)
+    monkeypatch.setattr(np_index, "_loaded", {})
+    return col
+
+
+def _export(col):
+    res = np_index.export_index("school_corpus_A")
+    assert res["count"] == len(col.ids) and res["partitions"] == 3
+    return np_index.load_index("school_corpus_A")
+
+
+def _brute(col, q, k, keep=lambda m: True):
+    v = col.vecs / np.linalg.norm(col.vecs, axis=1, keepdims=True)
+    sims = v @ (q / np.linalg.norm(q))
+    rows = [i for i in np.argsort(-sims, kind="stable") if keep(col.metas[i])]
+    return [col.ids[i] for i in rows[:k]]
+
+
+def _ids(idx, hits):
+    return [str(idx.ids[i]) for i, _ in hits]
+
+
+def test_export_pages_and_partitions(corpus):
+    idx = _export(corpus)
+    assert corpus.pages == 4  # 240행 / 64행 페이지
+    assert idx.partition_key == "dataset"
+    assert idx.partition_sizes() == {"haksa": 80, "notice": 80, "pdf": 80}
+    a, b = idx.partitions["notice"]
+    assert {idx.meta(i)["dataset"] for i in range(a, b)} == {"notice"}
+    assert idx.doc(a) == f"본문 {idx.ids[a]}"
+
+
+def test_unfiltered_search_matches_brute_force(corpus):
+    idx = _export(corpus)
+    q = np.random.default_rng(1).normal(size=(3, 24)).astype(np.float32)
+    qn = q / np.linalg.norm(q, axis=1, keepdims=True)
+    for b, hits in enumerate(idx.search(qn, 5)):
+        assert _ids(idx, hits) == _brute(corpus, q[b], 5)
+        dists = [d for _, d in hits]
+        assert dists == sorted(dists) and 0.0 <= dists[0] <= 2.0
+
+
+def test_partition_path_searches_only_that_range(corpus, monkeypatch):
+    idx = _export(corpus)
+    seen = []
+    real = idx._scores
+    monkeypatch.setattr(idx, "_scores", lambda s, e, rows, q: seen.append((s, e, rows)) or real(s, e, rows, q))
+    q = np.random.default_rng(2).normal(size=24).astype(np.float32)
+    hits = idx.search(q / np.linalg.norm(q), 4, where={"dataset": "pdf"})[0]
+    assert seen == [(*idx.partitions["pdf"], None)]
+    assert _ids(idx, hits) == _brute(corpus, q, 4, lambda m: m["dataset"] == "pdf")
+
+
+@pytest.mark.parametrize("where, keep", [
+    ({"$and": [{"dataset": {"$in": ["haksa", "notice"]}}, {"year": {"$gte": 2020}}]},
+     lambda m: m["dataset"] in ("haksa", "notice") and m["year"] >= 2020),
+    ({"$or": [{"lang": "en"}, {"year": {"$lt": 2017}}]},
+     lambda m: m.get("lang") == "en" or m["year"] < 2017),
+    ({"dataset": {"$ne": "pdf"}}, lambda m: m["dataset"] != "pdf"),
+    ({"lang": {"$nin": ["en"]}}, lambda m: m.get("lang") != "en"),
+])
+def test_where_masks_match_brute_force(corpus, where, keep):
+    idx = _export(corpus)
+    q = np.random.default_rng(3).normal(size=24).astype(np.float32)
+    hits = idx.search(q / np.linalg.norm(q), 6, where=where)[0]
+    assert _ids(idx, hits) == _brute(corpus, q, 6, keep)
+
+
+def test_unknown_partition_value_returns_nothing(corpus):
+    idx = _export(corpus)
+    assert idx.search(np.ones(24, dtype=np.float32), 3, where={"dataset": "missing"}) == [[]]
+
+
+def test_float16_blocks_keep_ranking(corpus, monkeypatch):
+    monkeypatch.setattr(np_index, "NP_INDEX_DTYPE", "float16")
+    monkeypatch.setattr(np_index, "NP_INDEX_UPCAST", False)
+    monkeypatch.setattr(np_index, "_SEARCH_BLOCK", 50)
+    idx = _export(corpus)
+    assert idx.vectors.dtype == np.float16
+    q = np.random.default_rng(4).normal(size=24).astype(np.float32)
+    got = _ids(idx, idx.search(q / np.linalg.norm(q), 10)[0])
+    assert len(set(got[:5]) & set(_brute(corpus, q, 10))) == 5
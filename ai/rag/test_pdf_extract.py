@@ -0,0 +1,75 @@
+# ai/rag/test_pdf_extract.py
+# ================================================================
+# 역할
+# - 단일 패스 PDF 추출(extract_pages) 확인
+#   · 괘선이 없는 문서는 pdfplumber를 열지 않음, 표가 있을 법한 문서는 1번만 엶
+#   · 표 → '헤더: 값 | ...' 줄 변환(_table_lines), 괘선 수 기반 표 추정(_likely_has_table)
+# ================================================================
+import pytest
+
+ingest = pytest.importorskip("rag.ingest")
+
+
+class _Page:
+    def __init__(self, drawings=None, broken=False):
+        self._drawings = drawings or []
+        self._broken = broken
+
+    def get_drawings(self):
+        if self._broken:
+            raise RuntimeError("corrupt content stream")
+        return self._drawings
+
+
+def test_table_lines_uses_header_as_keys():
+    tables = [[["학기", "기간"], ["1학기", "3월~6월"], ["", ""], ["2학기", "9월~12월"]]]
+    assert ingest._table_lines(tables).splitlines() == [
+        "학기: 1학기 | 기간: 3월~6월",
+        "학기: 2학기 | 기간: 9월~12월",
+    ]
+
+
+def test_table_lines_without_matching_header():
+    tables = [[["구분"], ["휴학", "4학기 이내"]]]
+    assert ingest._table_lines(tables) == "휴학 | 4학기 이내"
+
+
+def test_likely_has_table_counts_rulings(monkeypatch):
+    monkeypatch.setattr(ingest, "TABLE_MIN_RULINGS", 3)
+    line = ("l", None, None)
+    assert not ingest._likely_has_table(_Page([{"items": [line, line]}]))
+    assert ingest._likely_has_table(_Page([{"items": [line]}, {"items": [("re", None), line]}]))
+    assert ingest._likely_has_table(_Page(broken=True))  # 판단 불가 → pdfplumber로 확인
+
+
+@pytest.mark.skipif(not ingest.USE_FITZ, reason="PyMuPDF not installed")
+def test_extract_pages_opens_plumber_only_for_ruled_pages(tmp_path, monkeypatch):
+    import fitz
+
+    opened = []
+    real_open = ingest.pdfplumber.open
+    monkeypatch.setattr(ingest.pdfplumber, "open", lambda p: opened.append(p) or real_open(p))
+
+    plain = tmp_path / "plain.pdf"
+    doc = fitz.open()
+    for text in ("first page body", "second page body"):
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(plain))
+    doc.close()
+
+    pages = ingest.extract_pages(str(plain))
+    assert len(pages) == 2 and "second page body" in pages[1]
+    assert opened == []
+
+    ruled = tmp_path / "ruled.pdf"
+    doc = fitz.open()
+    for _ in range(3):
+        page = doc.new_page()
+        for y in (100, 130, 160, 190, 220):
+            page.draw_line((72, y), (400, y))
+        page.insert_text((80, 120), "cell")
+    doc.save(str(ruled))
+    doc.close()
+
+    assert len(ingest.extract_pages(str(ruled))) == 3
+    assert opened == [str(ruled)]  # 페이지가 여러 장이어도 문서는 1번만 open
@@ -0,0 +1,67 @@
+# ai/rag/test_pipeline.py
+# ================================================================
+# 역할
+# - 스레드 파이프라인(Pipeline) 확인
+#   · 단계를 거친 출력이 입력 순서대로 나옴, 단계별 items 통계
+#   · 중간 단계 예외가 소비자에게 그대로 전달되고 상류 generator가 닫힘(finally 실행)
+#   · 소비자가 중간에 그만두면 모든 단계 스레드가 멈춤
+# ================================================================
+import threading, time
+
+import pytest
+
+from rag.pipeline import Pipeline
+
+
+def _double(items):
+    for x in items:
+        yield x * 2
+
+
+def _slow_plus_one(items):
+    for x in items:
+        time.sleep(0.001)
+        yield x + 1
+
+
+def test_output_order_and_stats():
+    pipe = Pipeline(range(50), [("double", _double), ("plus", _slow_plus_one)], maxsize=2)
+    assert list(pipe.run()) == [x * 2 + 1 for x in range(50)]
+    stats = {s["stage"]: s for s in pipe.stats()}
+    assert [s["stage"] for s in pipe.stats()] == ["fetch", "double", "plus"]
+    assert stats["fetch"]["items"] == stats["plus"]["items"] == 50
+    assert stats["double"]["out_queue_max"] <= 2
+
+
+def test_stage_failure_reaches_consumer_and_closes_source():
+    closed = threading.Event()
+
+    def source():
+        try:
+            for i in range(10_000):
+                yield i
+        finally:
+            closed.set()
+
+    def embed(items):
+        for x in items:
+            if x == 5:
+                raise RuntimeError("embedding server down")
+            yield x
+
+    pipe = Pipeline(source(), [("embed", embed), ("write", _double)], maxsize=1)
+    seen = []
+    with pytest.raises(RuntimeError, match="embedding server down"):
+        for out in pipe.run():
+            seen.append(out)
+    assert seen == [0, 2, 4, 6, 8]
+    assert closed.wait(2)
+
+
+def test_consumer_break_stops_all_stages():
+    pipe = Pipeline(iter(range(10_000)), [("double", _double)], maxsize=1, source_name="read")
+    for out in pipe.run():
+        if out >= 10:
+            break
+    time.sleep(0.3)
+    assert not [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
@@ -0,0 +1,78 @@
+# ai/rag/test_query_cache.py
+# ================================================================
+# 역할
+# - 질의 임베딩 캐시 확인
+#   · 정규화: 전각/대소문자/문장부호/띄어쓰기 차이는 같은 키
+#   · TTL 만료(가짜 시계), LRU 축출 순서, 모델별 분리
+#   · 저장된 벡터는 호출자 버퍼와 분리된 읽기 전용 사본
+# ================================================================
+import numpy as np
+import pytest
+
+from rag import query_cache
+from rag.query_cache import QueryEmbeddingCache, normalize_query
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(query_cache, "time", c)
+    return c
+
+
+@pytest.mark.parametrize("variant", ["시험일정 언제야", "시험 일정, 언제야?!", "  시험  일정\t언제야 ~"])
+def test_spelling_variants_share_key(variant):
+    assert normalize_query(variant) == normalize_query("시험 일정 언제야?")
+
+
+def test_fullwidth_and_case_fold():
+    assert normalize_query("ＳＣＨＯＯＬ Bus") == "schoolbus"
+
+
+def test_ttl_expires_entries(clock):
+    cache = QueryEmbeddingCache(max_entries=8, ttl_s=60)
+    cache.put("e5", "휴학 신청", [1.0, 0.0])
+    clock.now += 59
+    assert cache.get("e5", "휴학신청") is not None
+    clock.now += 2
+    assert cache.get("e5", "휴학 신청") is None
+    st = cache.stats()
+    assert (st["hits"], st["misses"], st["expired"], st["size"]) == (1, 1, 1, 0)
+
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = QueryEmbeddingCache(max_entries=2, ttl_s=0)
+    cache.put("e5", "a", [1.0])
+    cache.put("e5", "b", [2.0])
+    cache.get("e5", "a")
+    cache.put("e5", "c", [3.0])
+    assert cache.get("e5", "b") is None
+    assert cache.get("e5", "a")[0] == 1.0 and cache.get("e5", "c")[0] == 3.0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_models_are_separate_and_vectors_read_only():
+    cache = QueryEmbeddingCache(max_entries=4, ttl_s=0)
+    buf = np.array([0.5, 0.5], dtype=np.float64)
+    cache.put("e5-small", "장학금", buf)
+    buf[0] = 9.0
+    assert cache.get("e5-large", "장학금") is None
+    vec = cache.get("e5-small", "장학금")
+    assert vec.dtype == np.float32 and vec[0] == 0.5
+    with pytest.raises(ValueError):
+        vec[0] = 1.0
+    assert cache.stats()["models"] == ["e5-small"]
+
+
+def test_disabled_cache_stores_nothing():
+    cache = QueryEmbeddingCache(max_entries=0)
+    cache.put("e5", "q", [1.0])
+    assert cache.get("e5", "q") is None and cache.stats()["size"] == 0
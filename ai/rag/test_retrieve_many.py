@@ -0,0 +1,87 @@
+# ai/rag/test_retrieve_many.py
+# ================================================================
+# 역할
+# - retrieve_many(질의 N건)가 retrieve()를 N번 부른 결과와 같은지 확인
+#   · 임베딩은 배치 1회, Chroma 질의도 1회(다중 임베딩)
+#   · 표기만 다른 질의는 한 번만 인코딩, 결과 순서는 입력 순서
+#   · 빈 입력은 모델/DB를 건드리지 않음
+# ================================================================
+import numpy as np
+import pytest
+
+retriever = pytest.importorskip("rag.retriever")
+from rag.query_cache import QueryEmbeddingCache
+
+DOCS = ["휴학 신청 기간은 개강 전 2주", "장학금은 직전 학기 12학점 이상", "수강신청 정정은 개강 첫 주",
+        "졸업 요건은 총 140학점", "기말고사는 15주차"]
+
+
+def _bag(text):
+    v = np.zeros(64, dtype=np.float32)
+    for ch in text.replace(" ", ""):
+        v[ord(ch) % 64] += 1.0
+    return v / (np.linalg.norm(v) or 1.0)
+
+
+class _BagModel:
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+        self.batches.append(list(texts))
+        return np.vstack([_bag(t.split(": ", 1)[-1]) for t in texts])
+
+
+class _Corpus:
+    def __init__(self):
+        self.calls = 0
+        self.mat = np.vstack([_bag(d) for d in DOCS])
+
+    def query(self, query_embeddings, n_results, include, where=None):
+        self.calls += 1
+        out = {"documents": [], "metadatas": [], "distances": []}
+        for q in query_embeddings:
+            dist = 1.0 - self.mat @ np.asarray(q, dtype=np.float32)
+            order = np.argsort(dist, kind="stable")[:n_results]
+            out["documents"].append([DOCS[i] for i in order])
+            out["metadatas"].append([{"row": int(i)} for i in order])
+            out["distances"].append([float(dist[i]) for i in order])
+        return out
+
+
+@pytest.fixture
+def wired(monkeypatch):
+    model, corpus = _BagModel(), _Corpus()
+    monkeypatch.setattr(retriever, "embedder", lambda: model)
+    monkeypatch.setattr(retriever, "cached_encode", lambda key, texts, fn: fn(texts))
+    monkeypatch.setattr(retriever, "get_query_cache", lambda c=QueryEmbeddingCache(max_entries=64): c)
+    monkeypatch.setattr(retriever, "QUERY_BATCH", False)
+    monkeypatch.setattr(retriever, "SEARCH_ENGINE", "chroma")
+    monkeypatch.setattr(retriever, "get_client", lambda d: None)
+    monkeypatch.setattr(retriever, "get_collection", lambda client: corpus)
+    return model, corpus
+
+
+def test_many_matches_single(wired):
+    model, corpus = wired
+    queries = ["휴학 기간", "장학금 자격", "졸업 학점"]
+    many = retriever.retrieve_many(queries, k=3)
+    assert corpus.calls == 1 and len(model.batches) == 1
+    singles = [retriever.retrieve(q, k=3) for q in queries]
+    for got, want in zip(many, singles):
+        assert [c["text"] for c in got] == [c["text"] for c in want]
+        assert [c["score"] for c in got] == pytest.approx([c["score"] for c in want])
+
+
+def test_variants_encoded_once_and_order_kept(wired):
+    model, _ = wired
+    out = retriever.retrieve_many(["기말고사 언제", "장학금", "기말고사  언제?"], k=1)
+    assert model.batches == [["query: 기말고사 언제", "query: 장학금"]]
+    assert out[0] == out[2] and out[0][0]["text"] == DOCS[4]
+    assert out[1][0]["text"] == DOCS[1]
+
+
+def test_empty_input_touches_nothing(wired):
+    model, corpus = wired
+    assert retriever.retrieve_many([]) == []
+    assert model.batches == [] and corpus.calls == 0
@@ -0,0 +1,80 @@
+# ai/rag/test_store_handles.py
+# ================================================================
+# 역할
+# - client/collection 핸들 프로세스 전역 캐시 확인
+#   · 같은 persist 디렉터리면 client 1개, 디렉터리가 다시 만들어지면 새로 생성
+#   · 컬렉션 핸들은 (client, 이름)별 1회만 조회, 포인터 파일이 바뀌면 폐기
+#   · 컬렉션 삭제 시 해당 핸들만 무효화
+# ================================================================
+import shutil
+
+import pytest
+
+store = pytest.importorskip("rag.store")
+
+
+class _CountingClient:
+    def __init__(self):
+        self.lookups = []
+
+    def get_collection(self, name):
+        self.lookups.append(name)
+        return object()
+
+    def create_collection(self, name):
+        raise AssertionError("get_collection always succeeds here")
+
+    def delete_collection(self, name):
+        pass
+
+
+@pytest.fixture
+def fresh_handles(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "ACTIVE_NAME_FILE", str(tmp_path / "pointer" / "active.txt"))
+    monkeypatch.setattr(store, "COLLECTION_PREFIX", "school_corpus")
+    store.invalidate_handles()
+    yield tmp_path
+    store.invalidate_handles()
+
+
+def test_client_reused_per_directory(fresh_handles, monkeypatch):
+    made = []
+    monkeypatch.setattr(store.chromadb, "Client", lambda settings: made.append(settings) or object())
+    d = fresh_handles / "chroma"
+    d.mkdir()
+    a = store.get_client(str(d))
+    assert store.get_client(str(d) + "/") is a
+    assert len(made) == 1
+    shutil.rmtree(d)
+    d.mkdir()
+    assert store.get_client(str(d)) is not a
+    assert len(made) == 2
+
+
+def test_collection_looked_up_once(fresh_handles):
+    client = _CountingClient()
+    first = store.get_collection(client)
+    for _ in range(5):
+        assert store.get_collection(client) is first
+    assert store.get_collection(client, "school_corpus_B") is not first
+    assert len(client.lookups) == 2
+
+
+def test_pointer_change_drops_collection_handles(fresh_handles):
+    client = _CountingClient()
+    assert store.active_collection_name() == "school_corpus_A"
+    store.get_collection(client, "school_corpus_A")
+    store.set_active_name("school_corpus_B")
+    assert store.active_collection_name() == "school_corpus_B"
+    store.get_collection(client, "school_corpus_A")
+    assert client.lookups == ["school_corpus_A", "school_corpus_A"]
+
+
+def test_delete_forgets_only_that_handle(fresh_handles):
+    client = _CountingClient()
+    store.get_collection(client, "school_corpus_A")
+    store.get_collection(client, "school_corpus_B")
+    store._delete(client, "school_corpus_B")
+    store.get_collection(client, "school_corpus_A")
+    store.get_collection(client, "school_corpus_B")
+    assert client.lookups == ["school_corpus_A", "school_corpus_B", "school_corpus_B"]
@@ -0,0 +1,96 @@
+# ai/rag/test_store_pointer.py
+# ================================================================
+# 역할
+# - blue/green 포인터 전환과 이전 컬렉션 지연 삭제 확인
+#   · set_active_name은 원자적으로 교체, inactive_collection_name은 반대편(A↔B)
+#   · 활성/재빌드 중 컬렉션은 drop_collection이 지우지 않음
+#   · 유예 시간 안에 재빌드가 그 컬렉션을 대상으로 시작되면 예약된 삭제 취소
+# ================================================================
+import time
+
+import pytest
+
+store = pytest.importorskip("rag.store")
+
+
+class _Shelf:
+    """delete/get/create만 흉내 내는 client"""
+    def __init__(self, *names):
+        self.names = set(names)
+        self.deleted = []
+
+    def get_collection(self, name):
+        if name not in self.names:
+            raise ValueError(name)
+        return ("col", name)
+
+    def create_collection(self, name):
+        self.names.add(name)
+        return ("col", name)
+
+    def delete_collection(self, name):
+        self.names.discard(name)
+        self.deleted.append(name)
+
+
+@pytest.fixture
+def pointer(tmp_path, monkeypatch):
+    path = tmp_path / "active_collection.txt"
+    monkeypatch.setattr(store, "ACTIVE_NAME_FILE", str(path))
+    monkeypatch.setattr(store, "COLLECTION_PREFIX", "corpus")
+    store.invalidate_handles()
+    yield path
+    for name in list(store._drop_timers):
+        store.cancel_drop(name)
+    store._rebuilding.clear()
+    store.invalidate_handles()
+
+
+def test_missing_pointer_defaults_to_a(pointer):
+    assert store.active_collection_name() == "corpus_A"
+    assert store.inactive_collection_name() == "corpus_B"
+
+
+def test_flip_is_atomic_and_visible(pointer):
+    store.set_active_name("corpus_B")
+    assert pointer.read_text(encoding="utf-8") == "corpus_B"
+    assert not (pointer.parent / (pointer.name + ".tmp")).exists()
+    assert store.active_collection_name() == "corpus_B"
+    assert store.inactive_collection_name() == "corpus_A"
+
+
+def test_drop_refuses_active_and_rebuilding(pointer):
+    client = _Shelf("corpus_A", "corpus_B")
+    assert not store.drop_collection(client, "corpus_A")
+    store.begin_rebuild(client, "corpus_B", reset=False)
+    assert not store.drop_collection(client, "corpus_B")
+    store.end_rebuild("corpus_B")
+    assert store.drop_collection(client, "corpus_B")
+    assert client.deleted == ["corpus_B"]
+
+
+def test_rebuild_cancels_scheduled_drop(pointer):
+    client = _Shelf("corpus_A", "corpus_B")
+    store.set_active_name("corpus_B")
+    store.drop_collection_later(client, "corpus_A", delay_s=0.2)
+    store.begin_rebuild(client, "corpus_A", reset=False)
+    time.sleep(0.4)
+    assert "corpus_A" in client.names and client.deleted == []
+    store.end_rebuild("corpus_A")
+
+
+def test_scheduled_drop_runs_after_grace(pointer):
+    client = _Shelf("corpus_A", "corpus_B")
+    store.set_active_name("corpus_B")
+    store.drop_collection_later(client, "corpus_A", delay_s=0.05)
+    deadline = time.time() + 2
+    while "corpus_A" in client.names and time.time() < deadline:
+        time.sleep(0.02)
+    assert client.deleted == ["corpus_A"]
+
+
+def test_reset_rebuild_empties_target(pointer):
+    client = _Shelf("corpus_A", "corpus_B")
+    store.begin_rebuild(client, "corpus_B", reset=True)
+    store.end_rebuild("corpus_B")
+    assert client.deleted == ["corpus_B"]
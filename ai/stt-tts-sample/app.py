@@ -47,7 +47,7 @@ PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from llm_runtime.llm_client import chat
+from llm_runtime.llm_client import achat, llm_stats
 from guard import violates_policy
 
 # -----------------------------------------------------------------------------
@@ -142,7 +142,7 @@ async def _warmup():
         # 위 1)에서 수정한 LLM 핑 호출
         try:
             _step("LLM ping")
-            _ = chat(messages=[{"role": "user", "content": "ping"}], temperature=0.0, max_tokens=1)
+            _ = await achat(messages=[{"role": "user", "content": "ping"}], temperature=0.0, max_tokens=1)
             _step("LLM ping ok")
         except Exception as e:
             _step(f"LLM ping failed: {e}")
@@ -239,10 +239,10 @@ def stt_transcribe_bytes(audio_bytes: bytes) -> Dict[str, Any]:
     language = info.language or "unknown"
     return {"text": text, "language": language, "segments": out_segments}
 
-def chat_answer(user_text: str) -> str:
+async def chat_answer(user_text: str) -> str:
     """
     텍스트 → GPT-4o-mini 답변(str)
-    (기존 TinyLlama/vLLM 호출을 llm_runtime.llm_client.chat()으로 교체)
+    (llm_runtime.llm_client.achat(): 풀링된 비동기 클라이언트, 이벤트 루프를 막지 않음)
     """
     # 🛡️ Guard: 금지어/PII 포함 시 차단 멘트
     if violates_policy(user_text):
@@ -252,7 +252,7 @@ def chat_answer(user_text: str) -> str:
         {"role": "system", "content": "You are a helpful Korean assistant."},
         {"role": "user", "content": user_text.strip()},
     ]
-    return chat(messages)  # <-- GPT-4o-mini 호출
+    return await achat(messages)  # <-- GPT-4o-mini 호출
 
 async def tts_synthesize_mp3(text: str, voice: str) -> bytes:
     """텍스트를 음성(MP3)으로 변환"""
@@ -281,6 +281,11 @@ def health():
         "warmup_running": warmup_state["running"],
     }
 
+@app.get("/llm/stats")
+def llm_client_stats():
+    """LLM 동시 호출/대기/타임아웃 통계"""
+    return llm_stats()
+
 # -----------------------------------------------------------------------------
 # STT 엔드포인트
 # -----------------------------------------------------------------------------
@@ -292,7 +297,8 @@ async def stt_endpoint(file: UploadFile = File(...)):
 
     try:
         audio = await file.read()
-        result = stt_transcribe_bytes(audio)
+        # faster-whisper는 CPU 바운드 → 스레드에서 실행(이벤트 루프 보호)
+        result = await asyncio.to_thread(stt_transcribe_bytes, audio)
         return JSONResponse(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"STT error: {e}")
@@ -307,7 +313,7 @@ async def chat_endpoint(req: ChatRequest):
     if not text:
         raise HTTPException(status_code=400, detail="Empty text")
     try:
-        answer = chat_answer(text)
+        answer = await chat_answer(text)
         return {"answer": answer}
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"LLM request failed: {e}")
@@ -341,7 +347,7 @@ async def voice_chat(file: UploadFile = File(...)):
     # 1) STT
     try:
         audio = await file.read()
-        stt = stt_transcribe_bytes(audio)
+        stt = await asyncio.to_thread(stt_transcribe_bytes, audio)
         user_text = (stt.get("text") or "").strip()
         if not user_text:
             raise HTTPException(status_code=400, detail="STT produced empty text")
@@ -350,7 +356,7 @@ async def voice_chat(file: UploadFile = File(...)):
 
     # 2) LLM (GPT-4o-mini)
     try:
-        assistant_text = chat_answer(user_text) or "죄송해요. 지금은 대답을 생성할 수 없어요."
+        assistant_text = await chat_answer(user_text) or "죄송해요. 지금은 대답을 생성할 수 없어요."
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"voice-chat LLM error: {e}")
 
@@ -396,13 +402,11 @@ app.mount("/", WsgiToAsgi(flask_app), name="front")
 # -----------------------------------------------------------------------------
 # Standalone LLM Ping (for testing)
 # -----------------------------------------------------------------------------
-from llm_runtime.llm_client import chat as llm_chat
-
 @app.get("/llm/ping")
-def llm_ping():
+async def llm_ping():
     try:
         msg = [{"role":"user","content":"ping"}]
-        txt = llm_chat(messages=msg, temperature=0.0, max_tokens=4)
+        txt = await achat(messages=msg, temperature=0.0, max_tokens=4)
         return {"ok": True, "model": "OPENAI_MODEL from llm_runtime/.env", "answer": txt}
     except Exception as e:
         import traceback
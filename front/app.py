@@ -5,7 +5,9 @@ import os
 from pathlib import Path
 from datetime import timedelta, datetime
 from datetime import datetime, timedelta
-from flask import Flask, jsonify, request, send_from_directory, session
+from flask import Flask, Response, jsonify, request, send_from_directory, session, stream_with_context
+import codecs
+import json
 from flask_cors import CORS
 import mysql.connector
 from dotenv import load_dotenv
@@ -274,10 +276,72 @@ def me():
 # ----------------------------
 # 6) Flask → FastAPI 프록시 + 로그 저장
 # ----------------------------
+class _SseParser:
+    """SSE 바이트 조각 → 완성된 (event, data dict) 목록(UTF-8 멀티바이트가 조각 경계에 걸려도 안전)"""
+    def __init__(self):
+        self._dec = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._buf = ""
+
+    def feed(self, chunk: bytes):
+        self._buf += self._dec.decode(chunk)
+        out = []
+        while "\n\n" in self._buf:
+            block, self._buf = self._buf.split("\n\n", 1)
+            event, data = "message", []
+            for line in block.splitlines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data.append(line[5:].strip())
+            try:
+                out.append((event, json.loads("\n".join(data) or "{}")))
+            except ValueError:
+                continue
+        return out
+
+
+def proxy_chat_stream(payload, uid):
+    """FastAPI(/rag/chat/stream) SSE를 그대로 중계하면서 토큰을 모아 끝나면 BOT 답변 저장"""
+    try:
+        res = requests.post(f"{FASTAPI_BASE}/rag/chat/stream", json=payload, stream=True, timeout=(5, 60))
+    except Exception as e:
+        return jsonify(ok=False, msg=f"RAG 서버 연결 실패: {e}"), 500
+    if res.status_code != 200:
+        try:
+            return jsonify(res.json()), res.status_code
+        finally:
+            res.close()
+
+    def relay():
+        parser, parts, final = _SseParser(), [], None
+        try:
+            for chunk in res.iter_content(chunk_size=None):
+                yield chunk  # 받은 바이트를 바로 전달(버퍼링 없음)
+                for event, data in parser.feed(chunk):
+                    if event == "token":
+                        parts.append(data.get("text", ""))
+                    elif event == "done":
+                        final = data
+                        print(f"[chat][stream] uid={uid} ttft_ms={data.get('ttft_ms')} latency_ms={data.get('latency_ms')}")
+        finally:
+            res.close()
+            # 스트림이 끝나면(중간에 끊겨도) 모인 답변 저장
+            bot_answer = ((final or {}).get("answer") or "".join(parts)).strip()
+            if bot_answer:
+                save_chat(uid, "BOT", bot_answer)
+
+    return Response(stream_with_context(relay()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.post("/chat")
 def proxy_chat():
-    """프론트에서 /chat 로 주면 FastAPI(/rag/chat)로 포워딩 + 대화 저장"""
+    """
+    프론트에서 /chat 로 주면 FastAPI(/rag/chat)로 포워딩 + 대화 저장
+    {"stream": true} 또는 Accept: text/event-stream이면 /rag/chat/stream을 SSE로 중계
+    """
     payload = request.get_json(silent=True) or {}
+    stream = bool(payload.pop("stream", False)) or "text/event-stream" in (request.headers.get("Accept") or "")
     if "text" in payload:
         payload = {"query": (payload.get("text") or "").strip()}
 
@@ -288,6 +352,9 @@ def proxy_chat():
     if user_text:
         save_chat(uid, "USER", user_text)
 
+    if stream:
+        return proxy_chat_stream(payload, uid)
+
     try:
         res = requests.post(f"{FASTAPI_BASE}/rag/chat", json=payload, timeout=60)
         data = res.json()